@@ -4,7 +4,9 @@ A tool for constructing first-principles-derived tight-binding models.
 
 __version__ = '0.1.0'
 
+from . import data
 from . import calculate_tb
+from . import calculate_bands
 from . import model_evaluation
 from . import fp_run
 from . import energy_windows
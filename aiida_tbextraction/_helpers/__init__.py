@@ -0,0 +1,3 @@
+"""
+Helper functions which are shared between the different workflows.
+"""
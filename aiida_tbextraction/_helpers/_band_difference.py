@@ -0,0 +1,54 @@
+"""
+Defines a helper function for calculating the difference between two sets of eigenvalues, given in blocks of k-points.
+"""
+
+import numpy as np
+
+
+def calculate_chunked_difference(
+    chunk_pairs, band_weights=None, reference_energy=None, energy_width=1.
+):
+    """
+    Calculate the weighted average absolute difference between two sets of eigenvalues. The eigenvalues are given in blocks of k-points, and the sums are accumulated block by block. Only the bands which are present in both sets are compared.
+
+    :param chunk_pairs: Pairs ``(reference_eigenvals, calculated_eigenvals)`` of blocks with the same k-points. The k-point index is the second-to-last axis.
+    :type chunk_pairs: iterable
+
+    :param band_weights: Weight for each band. If ``None``, all bands have the same weight.
+    :type band_weights: list
+
+    :param reference_energy: Center of the Gaussian energy weight. If ``None``, no energy weight is applied.
+    :type reference_energy: float
+
+    :param energy_width: Width of the Gaussian energy weight.
+    :type energy_width: float
+    """
+    total_weight = 0.
+    total_difference = 0.
+    for reference_chunk, calculated_chunk in chunk_pairs:
+        reference_chunk = np.asarray(reference_chunk, dtype=float)
+        calculated_chunk = np.asarray(calculated_chunk, dtype=float)
+        num_bands = min(reference_chunk.shape[-1], calculated_chunk.shape[-1])
+        reference_chunk = reference_chunk[..., :num_bands]
+        calculated_chunk = calculated_chunk[..., :num_bands]
+
+        weights = np.ones_like(reference_chunk)
+        if band_weights is not None:
+            chunk_band_weights = np.array(
+                band_weights, dtype=float
+            )[:num_bands]
+            weights *= np.pad(
+                chunk_band_weights, (0, num_bands - len(chunk_band_weights)),
+                'constant'
+            )
+        if reference_energy is not None:
+            weights *= np.exp(
+                -0.5 * ((reference_chunk - reference_energy) / energy_width)**2
+            )
+        total_weight += np.sum(weights)
+        total_difference += np.sum(
+            weights * np.abs(calculated_chunk - reference_chunk)
+        )
+    if total_weight == 0:
+        raise ValueError('The sum of all weights is zero.')
+    return float(total_difference / total_weight)
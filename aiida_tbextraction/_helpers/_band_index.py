@@ -0,0 +1,162 @@
+"""
+Defines an index for quickly counting the number of bands inside energy windows.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from ._mapped_array import get_mapped_bands
+
+
+class BandCountIndex(object):
+    """
+    Index of sorted eigenvalues, which counts the number of bands inside given energy ranges at every k-point. The eigenvalues of all k-points are stored in a single sorted array (shifted by a different offset for each k-point), such that each count is a binary search. Only this array is kept in memory.
+
+    :param bands: Eigenvalues, with the last axis corresponding to the bands.
+    :type bands: array
+    """
+
+    def __init__(self, bands):
+        bands = np.asarray(bands, dtype=float)
+        # np.sort creates the only copy, which is shifted in-place
+        flat = np.sort(bands.reshape(-1, bands.shape[-1]), axis=-1)
+        self.num_kpoints, self.num_bands = flat.shape
+        self._min = np.min(flat[:, 0])
+        self._span = np.max(flat[:, -1]) - self._min + 1.
+        self._offsets = np.arange(self.num_kpoints) * self._span
+        flat -= self._min
+        flat += self._offsets[:, np.newaxis]
+        self._flat = flat.ravel()
+        self._row_start = np.arange(self.num_kpoints) * self.num_bands
+
+    @property
+    def nbytes(self):
+        """
+        Size of the index array, in bytes.
+        """
+        return self._flat.nbytes
+
+    def _get_sorted(self, kpt_idx, band_idx):
+        """
+        Get the ``band_idx``-th lowest eigenvalue at the k-points ``kpt_idx``.
+        """
+        return self._flat[self._row_start[kpt_idx]
+                          + band_idx] - self._offsets[kpt_idx] + self._min
+
+    def _count_below(self, values, side):
+        shifted = np.clip(
+            np.asarray(values, dtype=float) - self._min, -0.5, self._span - 0.5
+        )
+        queries = shifted[..., np.newaxis] + self._offsets
+        return np.searchsorted(
+            self._flat, queries, side=side
+        ) - self._row_start
+
+    def count(self, lower, upper):
+        """
+        Count the number of bands with ``lower <= E <= upper`` at each k-point. The limits can be scalars or arrays of the same shape, in which case the k-point index is the last axis of the result.
+        """
+        return np.maximum(
+            self._count_below(upper, side='right') -
+            self._count_below(lower, side='left'), 0
+        )
+
+    def check_windows(self, windows, num_wann):
+        """
+        Check the validity of energy windows. For each window, returns ``None`` if the window is valid, or a string giving the reason why it is not.
+
+        :param windows: Energy windows ``[dis_win_min, dis_froz_min, dis_froz_max, dis_win_max]``, given as an array of shape ``(num_windows, 4)``.
+
+        :param num_wann: Number of Wannier functions.
+        :type num_wann: int
+        """
+        windows = np.array(windows, dtype=float).reshape(-1, 4)
+        win_min, froz_min, froz_max, win_max = windows.T
+        unsorted = np.any(np.diff(windows, axis=-1) < 0, axis=-1)
+        inner_count = np.max(self.count(froz_min, froz_max), axis=-1)
+        outer_count = np.min(self.count(win_min, win_max), axis=-1)
+        result = []
+        for is_unsorted, num_inner, num_outer in zip(
+            unsorted, inner_count, outer_count
+        ):
+            if is_unsorted:
+                result.append('Window values not sorted.')
+            elif num_inner > num_wann:
+                result.append('Too many bands in inner window.')
+            elif num_outer < num_wann:
+                result.append('Too few bands in outer window.')
+            else:
+                result.append(None)
+        return result
+
+    def project_window(self, window, num_wann, margin=1e-4):
+        """
+        Project an energy window onto the region of valid windows. The window values are sorted, the inner window is shrunk from above until it contains at most ``num_wann`` bands, and the outer window is enlarged until it contains at least ``num_wann`` bands at every k-point.
+
+        :param window: Energy window ``[dis_win_min, dis_froz_min, dis_froz_max, dis_win_max]``.
+        :type window: list
+
+        :param num_wann: Number of Wannier functions.
+        :type num_wann: int
+
+        :param margin: Distance which is kept between the window limits and the eigenvalues they exclude or include.
+        :type margin: float
+        """
+        if num_wann > self.num_bands:
+            raise ValueError(
+                'Cannot project window: num_wann={} is larger than the number of bands ({}).'.
+                format(num_wann, self.num_bands)
+            )
+        win_min, froz_min, froz_max, win_max = sorted(window)
+        kpt_idx = np.arange(self.num_kpoints)
+
+        # shrink the inner window by lowering its upper limit
+        num_below = self._count_below(froz_min, side='left')
+        has_limit = num_below + num_wann < self.num_bands
+        if np.any(has_limit):
+            froz_max_limit = np.min(
+                self._get_sorted(
+                    kpt_idx[has_limit], (num_below + num_wann)[has_limit]
+                )
+            ) - margin
+            froz_max = max(froz_min, min(froz_max, froz_max_limit))
+
+        # lower the outer window minimum if there are not enough bands above it
+        win_min = min(
+            win_min,
+            np.min(self._get_sorted(kpt_idx, self.num_bands - num_wann))
+        )
+        # raise the outer window maximum until it includes enough bands
+        num_below = self._count_below(win_min, side='left')
+        win_max = max(
+            win_max,
+            np.max(self._get_sorted(kpt_idx, num_below + num_wann - 1)) +
+            margin
+        )
+        return [
+            float(win_min),
+            float(froz_min),
+            float(froz_max),
+            float(win_max)
+        ]
+
+
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_MAX_BYTES = 2**24
+
+
+def get_band_index(bands_node):
+    """
+    Get the :class:`.BandCountIndex` for the given ``BandsData`` node. The eigenvalues are read from the memory-mapped array. Indices are cached per node and process, up to a total size of 16 MiB. Larger indices are not cached, such that their memory is released once they are no longer used.
+    """
+    try:
+        index = _INDEX_CACHE.pop(bands_node.uuid)
+    except KeyError:
+        index = BandCountIndex(get_mapped_bands(bands_node))
+    if index.nbytes <= _INDEX_CACHE_MAX_BYTES:
+        _INDEX_CACHE[bands_node.uuid] = index
+        while sum(cached.nbytes for cached in _INDEX_CACHE.values()
+                  ) > _INDEX_CACHE_MAX_BYTES:
+            _INDEX_CACHE.popitem(last=False)
+    return index
@@ -0,0 +1,250 @@
+"""
+Defines helpers to look up the results of previously finished processes with identical inputs.
+"""
+
+import json
+import time
+import hashlib
+from functools import wraps
+from collections import OrderedDict
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from aiida.orm import load_node
+from aiida.orm.node import Node
+from aiida.orm.querybuilder import QueryBuilder
+from aiida.orm.calculation.work import WorkCalculation
+from aiida.orm.calculation.inline import InlineCalculation
+from aiida.common.exceptions import NotExistent
+from aiida.common.links import LinkType
+
+
+def get_node_hash(node):
+    """
+    Get the content hash of a node, falling back to its UUID if the hash cannot be computed.
+    """
+    node_hash = node.get_hash(ignore_errors=True)
+    if node_hash is None:
+        return node.uuid
+    return node_hash
+
+
+def get_cache_key(nodes, extra_values=()):
+    """
+    Create a key from the content hashes of the given nodes and additional (string-convertible) values.
+
+    :param nodes: Nodes which identify the result, given as a mapping from labels to nodes. Entries with value ``None`` are ignored.
+    :type nodes: dict
+
+    :param extra_values: Additional values which are included in the key.
+    :type extra_values: list
+    """
+    hasher = hashlib.sha256()
+    for label, node in sorted(nodes.items()):
+        if node is None:
+            continue
+        hasher.update('{}:{};'.format(label, get_node_hash(node)).encode())
+    for value in extra_values:
+        hasher.update('{};'.format(value).encode())
+    return hasher.hexdigest()
+
+
+def _flatten_inputs(inputs, prefix=''):
+    """
+    Flatten nested input namespaces into a list of ``(label, value)`` pairs, where the labels of nested values are joined with a dot.
+    """
+    result = []
+    for key, value in inputs.items():
+        label = prefix + key
+        if isinstance(value, Mapping):
+            result.extend(_flatten_inputs(value, prefix=label + '.'))
+        else:
+            result.append((label, value))
+    return result
+
+
+def get_inputs_cache_key(inputs):
+    """
+    Create a key from the inputs of a process. Nested namespaces are flattened, nodes are identified by their content hash and other values by their JSON representation.
+
+    :param inputs: Inputs of the process.
+    :type inputs: dict
+    """
+    flat_inputs = _flatten_inputs(inputs)
+    nodes = {
+        label: value
+        for label, value in flat_inputs if isinstance(value, Node)
+    }
+    extra_values = [
+        '{}={}'.format(label, json.dumps(value, sort_keys=True, default=str))
+        for label, value in sorted(flat_inputs, key=lambda item: item[0])
+        if not isinstance(value, Node)
+    ]
+    return get_cache_key(nodes=nodes, extra_values=extra_values)
+
+
+class ProcessCache(object):
+    """
+    Cache which maps keys to finished processes. The key of a process is stored in its extras, such that the cache is persistent. The time at which an entry was last used is stored in a second extra. If ``max_entries`` is given, the least recently used entries are evicted from the persistent cache by deleting these extras. Recently used entries are also kept in an in-memory LRU index, which avoids repeated database queries.
+
+    The hit and miss statistics are counted separately in each process (e.g. each daemon worker) using the cache.
+
+    :param extra_key: Name of the extra in which the cache key is stored.
+    :type extra_key: str
+
+    :param max_size: Maximum number of entries in the in-memory index.
+    :type max_size: int
+
+    :param max_entries: Maximum number of entries in the persistent cache. If ``None``, the number of entries is not limited.
+    :type max_entries: int
+    """
+
+    _node_class = WorkCalculation
+
+    def __init__(self, extra_key, max_size=1000, max_entries=None):
+        self.extra_key = extra_key
+        self.last_used_key = extra_key + '_last_used'
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._index = OrderedDict()
+
+    def set_key(self, calc, key):
+        """
+        Store the cache key on the given calculation node, and evict the least recently used entries if the cache is full.
+        """
+        calc.set_extra(self.extra_key, key)
+        calc.set_extra(self.last_used_key, time.time())
+        self._evict()
+
+    def get(self, key, process_class):
+        """
+        Get a finished calculation of the given workflow class with the given key, or ``None`` if there is no such calculation.
+        """
+        calc = self._get_from_index(key)
+        if calc is None:
+            calc = self._get_from_database(key, process_class)
+        if calc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        calc.set_extra(self.last_used_key, time.time())
+        self._add_to_index(key, calc)
+        return calc
+
+    def _get_from_index(self, key):
+        try:
+            uuid = self._index.pop(key)
+        except KeyError:
+            return None
+        try:
+            return load_node(uuid)
+        except NotExistent:
+            return None
+
+    def _get_from_database(self, key, process_class):
+        query = QueryBuilder()
+        query.append(
+            WorkCalculation,
+            filters={
+                'extras.{}'.format(self.extra_key): key,
+                'attributes._process_label': process_class.__name__
+            },
+            project='*'
+        )
+        query.order_by({WorkCalculation: {'ctime': 'desc'}})
+        for calc, in query.iterall():
+            if calc.is_finished_ok:
+                return calc
+        return None
+
+    def _add_to_index(self, key, calc):
+        self._index[key] = calc.uuid
+        while len(self._index) > self.max_size:
+            self._index.popitem(last=False)
+
+    def _evict(self):
+        """
+        Delete the cache extras from the least recently used nodes, such that at most ``max_entries`` entries remain.
+        """
+        if self.max_entries is None:
+            return
+        query = QueryBuilder()
+        query.append(
+            self._node_class,
+            filters={'extras': {
+                'has_key': self.extra_key
+            }},
+            project=['*', 'extras.{}'.format(self.last_used_key)]
+        )
+        num_evicted = query.count() - self.max_entries
+        if num_evicted <= 0:
+            return
+        entries = sorted(query.all(), key=lambda entry: entry[1] or 0.)
+        evicted_uuids = set()
+        for calc, _ in entries[:num_evicted]:
+            calc.del_extra(self.extra_key)
+            if self.last_used_key in calc.get_extras():
+                calc.del_extra(self.last_used_key)
+            evicted_uuids.add(calc.uuid)
+        for key, uuid in list(self._index.items()):
+            if uuid in evicted_uuids:
+                del self._index[key]
+
+    @property
+    def stats(self):
+        """
+        Returns the number of hits and misses of the cache.
+        """
+        return dict(hits=self.hits, misses=self.misses)
+
+
+class InlineCache(ProcessCache):
+    """
+    Cache which maps keys to stored InlineCalculations, identified by the name of the function they were created from.
+    """
+
+    _node_class = InlineCalculation
+
+    def _get_from_database(self, key, process_class):
+        query = QueryBuilder()
+        query.append(
+            InlineCalculation,
+            filters={
+                'extras.{}'.format(self.extra_key): key,
+                'attributes.function_name': process_class.__name__
+            },
+            project='*'
+        )
+        query.order_by({InlineCalculation: {'ctime': 'asc'}})
+        for calc, in query.iterall():
+            return calc
+        return None
+
+
+INLINE_CACHE = InlineCache(extra_key='tbextraction_inline_cache_key')
+
+
+def deduplicate_inline(inline_function):
+    """
+    Decorator for functions created with ``make_inline``, which looks up an existing InlineCalculation of the same function with identical (by content hash) inputs. If such a calculation exists, it is returned together with its outputs instead of creating new nodes.
+    """
+
+    @wraps(inline_function)
+    def inner(**kwargs):  # pylint: disable=missing-docstring
+        key = get_cache_key(
+            nodes=kwargs, extra_values=[inline_function.__name__]
+        )
+        calc = INLINE_CACHE.get(key, inline_function)
+        if calc is not None:
+            return calc, dict(
+                calc.get_outputs(also_labels=True, link_type=LinkType.CREATE)
+            )
+        calc, outputs = inline_function(**kwargs)
+        INLINE_CACHE.set_key(calc, key)
+        return calc, outputs
+
+    return inner
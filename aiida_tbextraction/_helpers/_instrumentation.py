@@ -0,0 +1,143 @@
+"""
+Defines a decorator which records the wall time, queue wait time and retrieved bytes of workchain steps in the extras of the workchain.
+"""
+
+import os
+import time
+from functools import wraps
+
+from aiida.orm import load_node
+from aiida.orm.calculation.job import JobCalculation
+from aiida.common.links import LinkType
+
+from aiida_tools import check_workchain_step
+
+INSTRUMENTATION_EXTRA = 'tbextraction_instrumentation'
+_CHILDREN_CTX_KEY = 'instrumentation_children'
+
+
+def instrumented_step(step):
+    """
+    Decorator for workchain steps, which adds the behaviour of ``check_workchain_step`` and records statistics for each step in the ``tbextraction_instrumentation`` extra. For each step name, the following values are stored:
+
+    * ``count``: number of times the step was executed.
+    * ``wall_time``: total wall time (in seconds) spent in the step itself.
+    * ``num_submitted``: number of processes submitted by the step.
+    * ``num_reused``: number of existing processes (e.g. cached results) which the step added to the context instead of submitting a new process.
+    * ``queue_wait_time``: total time (in seconds) that the calculations submitted by the step spent waiting in the scheduler queue.
+    * ``retrieved_bytes``: total size of the files retrieved by the calculations submitted by the step.
+
+    The queue wait time and retrieved bytes include all calculations which were called (directly or through sub-workflows) by the submitted processes. They are added when the next instrumented step is executed, since the processes are finished at that point.
+    """
+    checked_step = check_workchain_step(step)
+
+    @wraps(step)
+    def inner(self, *args, **kwargs):  # pylint: disable=missing-docstring
+        _record_finished_children(self)
+        start_time = time.time()
+        result = checked_step(self, *args, **kwargs)
+        step_stats = dict(count=1, wall_time=time.time() - start_time)
+        if isinstance(result, dict):
+            children = [
+                value for value in result.values() if hasattr(value, 'pk')
+            ]
+            submitted = [
+                child.pk for child in children if _is_called_by(child, self)
+            ]
+            step_stats['num_submitted'] = len(submitted)
+            step_stats['num_reused'] = len(children) - len(submitted)
+            self.ctx[_CHILDREN_CTX_KEY] = dict(
+                step_name=step.__name__, pks=submitted
+            )
+        _update_statistics(self, step.__name__, step_stats)
+        return result
+
+    return inner
+
+
+def _record_finished_children(workchain):
+    """
+    Record the queue wait time and retrieved bytes of the calculations which were submitted by the previous step.
+    """
+    if _CHILDREN_CTX_KEY not in workchain.ctx:
+        return
+    children = workchain.ctx[_CHILDREN_CTX_KEY]
+    del workchain.ctx[_CHILDREN_CTX_KEY]
+    queue_wait_time = 0.
+    retrieved_bytes = 0
+    for calc in _iter_job_descendants(children['pks']):
+        queue_wait_time += _get_queue_wait_time(calc)
+        retrieved_bytes += _get_retrieved_bytes(calc)
+    _update_statistics(
+        workchain, children['step_name'],
+        dict(queue_wait_time=queue_wait_time, retrieved_bytes=retrieved_bytes)
+    )
+
+
+def _is_called_by(node, workchain):
+    """
+    Check whether the given process node was called by the workchain.
+    """
+    return any(
+        caller.pk == workchain.calc.pk
+        for caller in node.get_inputs(link_type=LinkType.CALL)
+    )
+
+
+def _iter_job_descendants(pks):
+    """
+    Iterate over the job calculations among the given processes and all processes they called.
+    """
+    visited = set()
+    pending = list(pks)
+    while pending:
+        pk = pending.pop()
+        if pk in visited:
+            continue
+        visited.add(pk)
+        node = load_node(pk)
+        if isinstance(node, JobCalculation):
+            yield node
+        else:
+            pending.extend(
+                child.pk
+                for child in node.get_outputs(link_type=LinkType.CALL)
+            )
+
+
+def _get_queue_wait_time(calc):
+    """
+    Get the time between submission to the scheduler and the start of the job.
+    """
+    job_info = calc.get_last_jobinfo()
+    submission_time = getattr(job_info, 'submission_time', None)
+    dispatch_time = getattr(job_info, 'dispatch_time', None)
+    if submission_time is None or dispatch_time is None:
+        return 0.
+    return max((dispatch_time - submission_time).total_seconds(), 0.)
+
+
+def _get_retrieved_bytes(calc):
+    """
+    Get the total size of the retrieved files of a calculation.
+    """
+    retrieved = calc.get_retrieved_node()
+    if retrieved is None:
+        return 0
+    total_size = 0
+    for dirpath, _, filenames in os.walk(retrieved.get_abs_path('.')):
+        for filename in filenames:
+            total_size += os.path.getsize(os.path.join(dirpath, filename))
+    return total_size
+
+
+def _update_statistics(workchain, step_name, values):
+    """
+    Add the given values to the statistics of a step.
+    """
+    extras = workchain.calc.get_extras()
+    statistics = extras.get(INSTRUMENTATION_EXTRA, {})
+    step_stats = statistics.setdefault(step_name, {})
+    for key, value in values.items():
+        step_stats[key] = step_stats.get(key, 0) + value
+    workchain.calc.set_extra(INSTRUMENTATION_EXTRA, statistics)
@@ -0,0 +1,61 @@
+"""
+Defines helpers to access the arrays stored in ``ArrayData`` nodes through read-only memory maps, such that only the parts of the array which are used are loaded into memory.
+"""
+
+import numpy as np
+
+KPOINT_CHUNK_SIZE = 2**12
+
+
+def get_mapped_array(node, name):
+    """
+    Get a read-only memory-mapped array from the given node. Nodes which define a ``get_mapped_array`` method (such as :class:`.BandsViewData`) are delegated to. If the array is not stored as a ``.npy`` file, it is loaded into memory instead.
+
+    :param node: Node containing the array.
+    :type node: ArrayData
+
+    :param name: Name of the array.
+    :type name: str
+    """
+    mapped_getter = getattr(node, 'get_mapped_array', None)
+    if mapped_getter is not None:
+        return mapped_getter(name)
+    return load_mapped_array(node, name)
+
+
+def load_mapped_array(node, name):
+    """
+    Load the ``.npy`` file of an array as read-only memory map, falling back to ``get_array`` if the file does not exist.
+    """
+    filename = '{}.npy'.format(name)
+    if filename in node.get_folder_list():
+        return np.load(node.get_abs_path(filename), mmap_mode='r')
+    return node.get_array(name)
+
+
+def get_mapped_bands(bands_node):
+    """
+    Get the eigenvalues of a ``BandsData`` node as read-only memory-mapped array.
+    """
+    return get_mapped_array(bands_node, 'bands')
+
+
+def iter_mapped_bands_chunks(bands_node, chunk_size=KPOINT_CHUNK_SIZE):
+    """
+    Iterate over the eigenvalues of a ``BandsData`` node in blocks of at most ``chunk_size`` k-points. Each block is loaded into memory, but only the corresponding part of the memory-mapped eigenvalues is read. Nodes which define a ``get_mapped_bands_chunk`` method (such as :class:`.BandsViewData`) are delegated to.
+
+    :param bands_node: Node containing the eigenvalues.
+    :type bands_node: BandsData
+
+    :param chunk_size: Maximum number of k-points in each block.
+    :type chunk_size: int
+    """
+    chunk_getter = getattr(bands_node, 'get_mapped_bands_chunk', None)
+    if chunk_getter is None:
+        bands = get_mapped_bands(bands_node)
+        num_kpoints = bands.shape[-2]
+        chunk_getter = lambda start, stop: bands[..., start:stop, :]
+    else:
+        num_kpoints = bands_node.get_shape('kpoints')[0]
+    for start in range(0, num_kpoints, chunk_size):
+        yield np.array(chunk_getter(start, start + chunk_size), dtype=float)
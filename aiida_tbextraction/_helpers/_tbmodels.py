@@ -0,0 +1,131 @@
+"""
+Defines helper functions which use the TBmodels library directly (in-process) instead of submitting calculations with the TBmodels CLI.
+"""
+
+import os
+import shutil
+import tempfile
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+try:
+    from functools import singledispatch
+except ImportError:
+    from singledispatch import singledispatch
+
+import numpy as np
+import tbmodels
+import symmetry_representation as sr
+
+from aiida.orm import DataFactory
+
+_HAMILTONIAN_CHUNK_BYTES = 2**26
+
+
+def get_wannier_prefix(wannier_folder):
+    """
+    Get the Wannier90 seedname from the ``*_hr.dat`` file in the given folder.
+    """
+    suffix = '_hr.dat'
+    hr_files = [
+        filename for filename in wannier_folder.get_folder_list()
+        if filename.endswith(suffix)
+    ]
+    if len(hr_files) != 1:
+        raise ValueError(
+            "Could not determine the Wannier90 seedname: found {} '*{}' files.".
+            format(len(hr_files), suffix)
+        )
+    return hr_files[0][:-len(suffix)]
+
+
+def create_model(
+    wannier_folder, pos_kind='nearest_atom', slice_idx=None, symmetries=None
+):
+    """
+    Parse the Wannier90 output in the given folder, and optionally slice and symmetrize the resulting tight-binding model.
+    """
+    model = tbmodels.Model.from_wannier_folder(
+        folder=wannier_folder.get_abs_path('.'),
+        prefix=get_wannier_prefix(wannier_folder),
+        pos_kind=pos_kind
+    )
+    if slice_idx is not None:
+        model = model.slice_orbitals(slice_idx.get_attr('list'))
+    if symmetries is not None:
+        model = _symmetrize(
+            sr.io.load(symmetries.get_file_abs_path()),
+            model,
+            full_group=False
+        )
+    return model
+
+
+@singledispatch
+def _symmetrize(sym, model, full_group):
+    """
+    Symmetrize the model with the given symmetries, in the same way as the TBmodels CLI.
+    """
+    raise ValueError("Invalid type '{}' for _symmetrize".format(type(sym)))
+
+
+@_symmetrize.register(Iterable)
+def _(sym, model, full_group):
+    for sym_part in sym:
+        model = _symmetrize(sym_part, model, full_group)
+    return model
+
+
+@_symmetrize.register(sr.SymmetryGroup)
+def _(sym, model, full_group):  # pylint: disable=unused-argument
+    return model.symmetrize(sym.symmetries, full_group=sym.full_group)
+
+
+@_symmetrize.register(sr.SymmetryOperation)
+def _(sym, model, full_group):
+    sym_group = sr.SymmetryGroup(symmetries=[sym], full_group=full_group)
+    return _symmetrize(sym_group, model, full_group)
+
+
+def model_to_singlefile(model):
+    """
+    Create a ``SinglefileData`` containing the given model, in TBmodels HDF5 format.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'model.hdf5')
+        tbmodels.io.save(model, filename)
+        return DataFactory('singlefile')(file=filename)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def model_from_singlefile(tb_model):
+    """
+    Load the tight-binding model from a ``SinglefileData`` in TBmodels HDF5 format.
+    """
+    return tbmodels.io.load(tb_model.get_file_abs_path())
+
+
+def calculate_eigenvals(model, kpoints, chunk_size=None):
+    """
+    Calculate the eigenvalues of the model at the given k-points. The Hamiltonians are constructed and diagonalized in batches of k-points, and the eigenvalues are written into a preallocated array.
+
+    :param chunk_size: Number of k-points which are diagonalized at once. By default, the chunk size is chosen such that the Hamiltonians of one batch take up about 64 MiB.
+    :type chunk_size: int
+    """
+    kpoints = np.asarray(kpoints, dtype=float).reshape(-1, model.dim)
+    if chunk_size is None:
+        chunk_size = max(
+            1, _HAMILTONIAN_CHUNK_BYTES // (16 * model.size * model.size)
+        )
+    result = np.empty((len(kpoints), model.size))
+    for start in range(0, len(kpoints), chunk_size):
+        kpoints_chunk = kpoints[start:start + chunk_size]
+        hamiltonians = np.array(model.hamilton(kpoints_chunk)).reshape(
+            len(kpoints_chunk), model.size, model.size
+        )
+        result[start:start + len(kpoints_chunk)
+               ] = np.linalg.eigvalsh(hamiltonians)
+    return result
@@ -0,0 +1,101 @@
+"""
+Defines helper functions for reading Wannier90 input files.
+"""
+
+from itertools import islice
+
+import numpy as np
+
+
+def read_eig(filename, chunk_size=2**12):
+    """
+    Read the eigenvalues from a Wannier90 ``.eig`` file. Returns an array of shape ``(num_kpts, num_bands)``.
+
+    The file is parsed in chunks of lines which are written into a preallocated array, such that the peak memory is close to the size of the result. The band and k-point indices are checked to be consecutive.
+
+    :param filename: Path of the ``.eig`` file.
+    :type filename: str
+
+    :param chunk_size: Number of lines which are parsed at once.
+    :type chunk_size: int
+    """
+    num_lines, num_bands = _get_eig_shape(filename)
+    result = np.empty(num_lines)
+    offset = 0
+    with open(filename, 'r') as in_file:
+        while True:
+            lines = list(islice(in_file, chunk_size))
+            if not lines:
+                break
+            values = np.fromstring(''.join(lines), sep=' ')
+            if values.size % 3 != 0:
+                raise ValueError(
+                    "Invalid line in '{}': each line must contain a band index, k-point index and eigenvalue.".
+                    format(filename)
+                )
+            values = values.reshape(-1, 3)
+            if offset + len(values) > num_lines:
+                raise ValueError(
+                    "Found more eigenvalues than lines in '{}'.".
+                    format(filename)
+                )
+            position = np.arange(offset, offset + len(values))
+            invalid = np.logical_or(
+                values[:, 0] != position % num_bands + 1,
+                values[:, 1] != position // num_bands + 1
+            )
+            if np.any(invalid):
+                raise ValueError(
+                    "Invalid band or k-point index in '{}', entry {}.".format(
+                        filename, offset + np.argmax(invalid) + 1
+                    )
+                )
+            result[offset:offset + len(values)] = values[:, 2]
+            offset += len(values)
+    if offset != num_lines:
+        raise ValueError(
+            "Found {} eigenvalues in '{}', expected {}.".format(
+                offset, filename, num_lines
+            )
+        )
+    return result.reshape(-1, num_bands)
+
+
+def _get_eig_shape(filename):
+    """
+    Determine the number of non-empty lines and the number of bands (the length of the first k-point block) of an ``.eig`` file.
+    """
+    num_lines = 0
+    num_bands = None
+    first_kpt = None
+    with open(filename, 'r') as in_file:
+        for line in in_file:
+            if not line.strip():
+                continue
+            if num_bands is None:
+                kpt = line.split()[1]
+                if first_kpt is None:
+                    first_kpt = kpt
+                elif kpt != first_kpt:
+                    num_bands = num_lines
+            num_lines += 1
+    if num_lines == 0:
+        raise ValueError("File '{}' is empty.".format(filename))
+    if num_bands is None:
+        num_bands = num_lines
+    if num_lines % num_bands != 0:
+        raise ValueError(
+            'The number of lines ({}) is not a multiple of the number of bands ({}).'.
+            format(num_lines, num_bands)
+        )
+    return num_lines, num_bands
+
+
+def parse_kpoint_lines(lines):
+    """
+    Convert the lines of the ``kpoints`` block of a ``.win`` file to an array of shape ``(num_kpts, 3)``.
+    """
+    kpoints = np.fromstring(' '.join(lines), sep=' ')
+    if kpoints.size != 3 * len(lines):
+        raise ValueError('Each k-point must have exactly three coordinates.')
+    return kpoints.reshape(-1, 3)
@@ -0,0 +1,113 @@
+"""
+Defines helper functions to create Wannier90 initial projections from the unitary matrices of a previous Wannier90 run.
+"""
+
+import numpy as np
+
+
+def _read_matrix_file(filename):
+    """
+    Read a Wannier90 ``_u.mat`` or ``_u_dis.mat`` file. Returns an array of shape ``(num_kpts, num_rows, num_cols)``.
+    """
+    with open(filename, 'r') as in_file:
+        in_file.readline()  # header
+        num_kpts, num_cols, num_rows = [
+            int(x) for x in in_file.readline().split()
+        ]
+        values = np.fromstring(in_file.read(), sep=' ')
+    values = values.reshape(num_kpts, 3 + 2 * num_rows * num_cols)
+    matrix = values[:, 3::2] + 1j * values[:, 4::2]
+    # The matrices are written in column-major order
+    return matrix.reshape(num_kpts, num_cols, num_rows).transpose(0, 2, 1)
+
+
+def read_amn(filename):
+    """
+    Read a Wannier90 ``.amn`` file. Returns the header line and an array of shape ``(num_kpts, num_bands, num_wann)``.
+    """
+    with open(filename, 'r') as in_file:
+        header = in_file.readline().strip()
+        num_bands, num_kpts, num_wann = [
+            int(x) for x in in_file.readline().split()
+        ]
+        values = np.fromstring(in_file.read(), sep=' ').reshape(-1, 5)
+    amn = np.zeros((num_kpts, num_bands, num_wann), dtype=complex)
+    band_idx, wann_idx, kpt_idx = values[:, :3].astype(int).T - 1
+    amn[kpt_idx, band_idx, wann_idx] = values[:, 3] + 1j * values[:, 4]
+    return header, amn
+
+
+def write_amn(filename, amn, header):
+    """
+    Write a Wannier90 ``.amn`` file from an array of shape ``(num_kpts, num_bands, num_wann)``.
+    """
+    num_kpts, num_bands, num_wann = amn.shape
+    kpt_idx, wann_idx, band_idx = np.meshgrid(
+        np.arange(num_kpts),
+        np.arange(num_wann),
+        np.arange(num_bands),
+        indexing='ij'
+    )
+    values = amn[kpt_idx, band_idx, wann_idx].ravel()
+    with open(filename, 'w') as out_file:
+        out_file.write(header + '\n')
+        out_file.write(
+            '{:12d}{:12d}{:12d}\n'.format(num_bands, num_kpts, num_wann)
+        )
+        np.savetxt(
+            out_file,
+            np.column_stack([
+                band_idx.ravel() + 1,
+                wann_idx.ravel() + 1,
+                kpt_idx.ravel() + 1, values.real, values.imag
+            ]),
+            fmt='%5d%5d%5d%18.12f%18.12f'
+        )
+
+
+def create_restart_amn(
+    amn, eigenvals, u_matrix, u_matrix_opt=None, outer_window=None
+):
+    """
+    Create initial projections from the unitary matrices of a previous Wannier90 run. The projection onto bands which were inside the outer window of the previous run is given by the product of the disentanglement and Wannierization matrices. For the other bands, the original projections are used.
+
+    :param amn: Original projections, of shape ``(num_kpts, num_bands, num_wann)``.
+    :type amn: array
+
+    :param eigenvals: Eigenvalues, of shape ``(num_kpts, num_bands)``.
+    :type eigenvals: array
+
+    :param u_matrix: Unitary matrices from the ``_u.mat`` file.
+    :type u_matrix: array
+
+    :param u_matrix_opt: Disentanglement matrices from the ``_u_dis.mat`` file. These are given in the basis of the bands inside the outer window.
+    :type u_matrix_opt: array
+
+    :param outer_window: Outer energy window ``(dis_win_min, dis_win_max)`` of the previous run.
+    :type outer_window: tuple
+    """
+    if u_matrix_opt is None:
+        return np.array(u_matrix)
+    win_min, win_max = outer_window
+    result = np.array(amn)
+    projections = np.einsum('kbm,kmn->kbn', u_matrix_opt, u_matrix)
+    for kpt_idx, kpt_eigenvals in enumerate(eigenvals):
+        band_idx = np.flatnonzero(
+            np.logical_and(win_min <= kpt_eigenvals, kpt_eigenvals <= win_max)
+        )
+        result[kpt_idx, band_idx] = projections[kpt_idx, :len(band_idx)]
+    return result
+
+
+def read_u_matrices(folder, prefix):
+    """
+    Read the unitary matrices from the given folder. Returns ``u_matrix`` and ``u_matrix_opt``, where the latter is ``None`` if there is no ``_u_dis.mat`` file.
+    """
+    u_matrix = _read_matrix_file(folder.get_abs_path(prefix + '_u.mat'))
+    if prefix + '_u_dis.mat' in folder.get_folder_list():
+        u_matrix_opt = _read_matrix_file(
+            folder.get_abs_path(prefix + '_u_dis.mat')
+        )
+    else:
+        u_matrix_opt = None
+    return u_matrix, u_matrix_opt
@@ -0,0 +1,75 @@
+"""
+Defines a workflow for calculating the bandstructures of multiple tight-binding models in a single step.
+"""
+
+from fsc.export import export
+
+from aiida.orm import DataFactory
+from aiida.orm.calculation.inline import make_inline
+from aiida.work.workchain import WorkChain
+
+from ._helpers._instrumentation import instrumented_step
+from ._helpers._tbmodels import model_from_singlefile, calculate_eigenvals
+
+
+@export
+class BatchedEigenvals(WorkChain):
+    """
+    Calculates the eigenvalues of multiple tight-binding models at the same k-points. All models are diagonalized in a single in-process calculation, instead of submitting one TBmodels calculation per model.
+
+    The calculation runs in the daemon, in the same way as the ``postprocess_inline`` option of :class:`.TightBindingCalculation`. This is intended for models which are small compared to the first-principles calculations, where the diagonalization takes less time than the queue wait of a separate job. The k-points are diagonalized in batches, such that the memory used for the Hamiltonians does not grow with the number of k-points.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super(BatchedEigenvals, cls).define(spec)
+        spec.input_namespace(
+            'tb_models',
+            dynamic=True,
+            help=
+            'Tight-binding models in TBmodels HDF5 format. The bandstructure of each model is returned with the same label.'
+        )
+        spec.input(
+            'kpoints',
+            valid_type=DataFactory('array.kpoints'),
+            help=
+            'K-points at which the eigenvalues are calculated. This can also be a ``BandsData``, e.g. the reference bands.'
+        )
+        spec.outputs.dynamic = True
+
+        spec.outline(cls.calculate_eigenvals)
+
+    @instrumented_step
+    def calculate_eigenvals(self):
+        """
+        Calculate the eigenvalues of all tight-binding models.
+        """
+        self.report(
+            'Calculating eigenvalues for {} tight-binding models.'.format(
+                len(self.inputs.tb_models)
+            )
+        )
+        result = batched_eigenvals_inline(
+            kpoints=self.inputs.kpoints, **self.inputs.tb_models
+        )[1]
+        for label, bands in result.items():
+            self.out(label, bands)
+
+
+@make_inline
+def batched_eigenvals_inline(kpoints, **tb_models):
+    """
+    Calculates the eigenvalues of the given tight-binding models.
+    """
+    kpoints_array = kpoints.get_kpoints()
+    result = {}
+    for label, tb_model in tb_models.items():
+        bands = DataFactory('array.bands')()
+        bands.set_kpointsdata(kpoints)
+        bands.set_bands(
+            calculate_eigenvals(
+                model_from_singlefile(tb_model), kpoints_array
+            )
+        )
+        result[label] = bands
+    return result
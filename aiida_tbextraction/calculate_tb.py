@@ -2,6 +2,9 @@
 Defines a workflow for calculating a tight-binding model for a given Wannier90 input and symmetries.
 """
 
+import os
+import shutil
+import tempfile
 try:
     from collections import ChainMap
 except ImportError:
@@ -10,11 +13,19 @@ except ImportError:
 from fsc.export import export
 
 from aiida.work.workchain import WorkChain, if_, ToContext
-from aiida.orm.data.base import List, Str
+from aiida.orm.data.base import List, Str, Bool
 from aiida.orm.data.parameter import ParameterData
 from aiida.orm import Code, DataFactory, CalculationFactory
+from aiida.orm.calculation.inline import make_inline
+from aiida.common.links import LinkType
 
-from aiida_tools import check_workchain_step
+from ._helpers._instrumentation import instrumented_step
+from ._helpers._caching import ProcessCache, get_inputs_cache_key
+from ._helpers._tbmodels import create_model, model_to_singlefile
+from ._helpers._wannier_io import read_eig
+from ._helpers._wannier_restart import read_amn, write_amn, read_u_matrices, create_restart_amn
+
+TIGHT_BINDING_CACHE = ProcessCache(extra_key='tbextraction_tb_cache_key')
 
 
 @export
@@ -101,61 +112,63 @@ class TightBindingCalculation(WorkChain):
             help=
             'File containing the symmetries which will be applied to the tight-binding model. The file must be in ``symmetry-representation`` HDF5 format.'  # pylint: disable=line-too-long
         )
+        spec.input(
+            'wannier_restart_folder',
+            valid_type=DataFactory('folder'),
+            required=False,
+            help=
+            'Retrieved folder of a previous Wannier90 calculation with the same input files, but possibly different energy windows. The unitary matrices (``_u.mat`` and ``_u_dis.mat``) in this folder are used to create the initial projections (``.amn`` file) for the Wannier90 calculation. The other input files are copied from the remote folder of the previous calculation, which must still exist on the same computer.'  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'postprocess_inline',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the Wannier90 output is parsed, sliced and symmetrized in a single in-process step using the TBmodels library, instead of submitting separate TBmodels calculations. Only the final tight-binding model is stored.'  # pylint: disable=line-too-long
+        )
         spec.output(
             'tb_model',
             valid_type=DataFactory('singlefile'),
             help='The calculated tight-binding model, in TBmodels HDF5 format.'
         )
+        spec.output(
+            'wannier_folder',
+            valid_type=DataFactory('folder'),
+            required=False,
+            help=
+            'Retrieved folder of the Wannier90 calculation. This can be used as ``wannier_restart_folder`` for subsequent calculations.'  # pylint: disable=line-too-long
+        )
 
         spec.outline(
-            cls.run_wannier, cls.parse,
-            if_(cls.has_slice)(cls.slice),
-            if_(cls.has_symmetries)(cls.symmetrize), cls.finalize
+            cls.run_wannier,
+            if_(cls.has_inline_postprocessing)(cls.postprocess_inline).else_(
+                cls.parse,
+                if_(cls.has_slice)(cls.slice),
+                if_(cls.has_symmetries)(cls.symmetrize)
+            ), cls.finalize
         )
 
+    def has_inline_postprocessing(self):
+        return self.inputs.postprocess_inline.value
+
     def has_slice(self):
         return 'slice_idx' in self.inputs
 
     def has_symmetries(self):
         return 'symmetries' in self.inputs
 
-    @check_workchain_step
+    @instrumented_step
     def run_wannier(self):
         """
         Run the Wannier90 calculation.
         """
-        wannier_parameters = self.inputs.wannier_parameters.get_dict()
-        wannier_parameters.setdefault('write_hr', True)
-        wannier_parameters.setdefault('write_xyz', True)
-        wannier_parameters.setdefault('use_ws_distance', True)
         self.report("Running Wannier90 calculation.")
-
-        # optional inputs
-        inputs = dict(
-            projections=self.inputs.get('wannier_projections', None),
-            structure=self.inputs.get('structure', None),
-        )
-        inputs = {k: v for k, v in inputs.items() if v is not None}
-
-        inputs.update(self.inputs.wannier_calculation_kwargs)
-
-        return ToContext(wannier_calc=self.submit(
-            CalculationFactory('wannier90.wannier90').process(),
-            code=self.inputs.wannier_code,
-            local_input_folder=self.inputs.wannier_input_folder,
-            parameters=ParameterData(dict=wannier_parameters),
-            kpoints=self.inputs.wannier_kpoints,
-            settings=ParameterData(
-                dict=ChainMap( # yapf: disable
-                    self.inputs.get('wannier_settings', ParameterData()).get_dict(),
-                    dict(
-                        retrieve_hoppings=True,
-                        additional_retrieve_list=['*_centres.xyz', '*.win']
-                    )
-                )
-            ),
-            **inputs
-        ))
+        return ToContext(
+            wannier_calc=self.submit(
+                CalculationFactory('wannier90.wannier90').process(),
+                **get_wannier_calculation_inputs(self.inputs)
+            )
+        )
 
     def setup_tbmodels(self, calc_string):
         """
@@ -168,9 +181,30 @@ class TightBindingCalculation(WorkChain):
 
     @property
     def tb_model(self):
+        if 'tb_model' in self.ctx:
+            return self.ctx.tb_model
         return self.ctx.tbmodels_calc.out.tb_model
 
-    @check_workchain_step
+    @instrumented_step
+    def postprocess_inline(self):
+        """
+        Parse, slice and symmetrize the tight-binding model in a single in-process step.
+        """
+        self.report(
+            "Parsing Wannier90 output and post-processing the tight-binding model in-process."
+        )
+        inline_inputs = dict(
+            wannier_folder=self.ctx.wannier_calc.out.retrieved,
+            pos_kind=Str('nearest_atom'),
+            slice_idx=self.inputs.get('slice_idx', None),
+            symmetries=self.inputs.get('symmetries', None),
+        )
+        self.ctx.tb_model = postprocess_model_inline(
+            **{k: v
+               for k, v in inline_inputs.items() if v is not None}
+        )[1]['tb_model']
+
+    @instrumented_step
     def parse(self):
         """
         Runs the calculation to parse the Wannier90 output.
@@ -181,7 +215,7 @@ class TightBindingCalculation(WorkChain):
         self.report("Parsing Wannier90 output to tbmodels format.")
         return ToContext(tbmodels_calc=self.submit(builder))
 
-    @check_workchain_step
+    @instrumented_step
     def slice(self):
         """
         Runs the calculation that slices (re-orders) the orbitals.
@@ -192,7 +226,7 @@ class TightBindingCalculation(WorkChain):
         self.report("Slicing tight-binding model.")
         return ToContext(tbmodels_calc=self.submit(builder))
 
-    @check_workchain_step
+    @instrumented_step
     def symmetrize(self):
         """
         Runs the symmetrization calculation.
@@ -203,10 +237,134 @@ class TightBindingCalculation(WorkChain):
         self.report("Symmetrizing tight-binding model.")
         return ToContext(tbmodels_calc=self.submit(builder))
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         """
         Adds the final tight-binding model to the output.
         """
         self.out("tb_model", self.tb_model)
         self.report('Adding tight-binding model to results.')
+        self.out("wannier_folder", self.ctx.wannier_calc.out.retrieved)
+
+
+def get_tight_binding_cache_key(inputs):
+    """
+    Create the key which identifies a :class:`.TightBindingCalculation` with the given inputs in the ``TIGHT_BINDING_CACHE``.
+    """
+    return get_inputs_cache_key(inputs)
+
+
+def get_wannier_calculation_inputs(inputs):
+    """
+    Create the inputs for the ``wannier90.wannier90`` calculation from the inputs of a :class:`.TightBindingCalculation`.
+    """
+    wannier_parameters = inputs['wannier_parameters'].get_dict()
+    wannier_parameters.setdefault('write_hr', True)
+    wannier_parameters.setdefault('write_xyz', True)
+    wannier_parameters.setdefault('use_ws_distance', True)
+
+    # optional inputs
+    res = dict(
+        projections=inputs.get('wannier_projections', None),
+        structure=inputs.get('structure', None),
+    )
+    res = {k: v for k, v in res.items() if v is not None}
+
+    additional_retrieve_list = ['*_centres.xyz', '*.win']
+    if wannier_parameters.get('write_u_matrices', False):
+        additional_retrieve_list.extend(['*_u.mat', '*_u_dis.mat'])
+
+    restart_folder = inputs.get('wannier_restart_folder', None)
+    if restart_folder is None:
+        input_folder = inputs['wannier_input_folder']
+    else:
+        # Only the new '.amn' file is stored locally. The other input files
+        # are copied from the remote folder of the previous calculation,
+        # since local files take precedence over remote ones.
+        restart_calc = restart_folder.get_inputs(link_type=LinkType.CREATE)[0]
+        input_folder = create_restart_amn_inline(
+            wannier_input_folder=inputs['wannier_input_folder'],
+            wannier_restart_folder=restart_folder,
+            restart_parameters=restart_calc.inp.parameters
+        )[1]['wannier_input_folder']
+        res['remote_input_folder'] = restart_calc.out.remote_folder
+
+    res.update(inputs['wannier_calculation_kwargs'])
+    res.update(
+        code=inputs['wannier_code'],
+        local_input_folder=input_folder,
+        parameters=ParameterData(dict=wannier_parameters),
+        kpoints=inputs['wannier_kpoints'],
+        settings=ParameterData(
+            dict=ChainMap( # yapf: disable
+                inputs.get('wannier_settings', ParameterData()).get_dict(),
+                dict(
+                    retrieve_hoppings=True,
+                    additional_retrieve_list=additional_retrieve_list
+                )
+            )
+        ),
+    )
+    return res
+
+
+@make_inline
+def create_restart_amn_inline(
+    wannier_input_folder, wannier_restart_folder, restart_parameters
+):
+    """
+    Creates a folder containing only the ``.amn`` file, with the initial projections obtained from the unitary matrices of a previous Wannier90 run.
+    """
+    input_files = wannier_input_folder.get_folder_list()
+    amn_file = [name for name in input_files if name.endswith('.amn')][0]
+    prefix = amn_file[:-len('.amn')]
+    restart_prefix = [
+        name for name in wannier_restart_folder.get_folder_list()
+        if name.endswith('_u.mat')
+    ][0][:-len('_u.mat')]
+
+    _, amn = read_amn(wannier_input_folder.get_abs_path(amn_file))
+    u_matrix, u_matrix_opt = read_u_matrices(
+        wannier_restart_folder, restart_prefix
+    )
+    restart_dict = restart_parameters.get_dict()
+    restart_amn = create_restart_amn(
+        amn=amn,
+        eigenvals=read_eig(wannier_input_folder.get_abs_path(prefix + '.eig')),
+        u_matrix=u_matrix,
+        u_matrix_opt=u_matrix_opt,
+        outer_window=(
+            restart_dict.get('dis_win_min', -float('inf')),
+            restart_dict.get('dis_win_max', float('inf'))
+        )
+    )
+
+    folder = DataFactory('folder')()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        tmp_amn_file = os.path.join(tmp_dir, amn_file)
+        write_amn(
+            tmp_amn_file,
+            restart_amn,
+            header='Initial projections from previous Wannier90 run.'
+        )
+        folder.add_path(tmp_amn_file, amn_file)
+    finally:
+        shutil.rmtree(tmp_dir)
+    return {'wannier_input_folder': folder}
+
+
+@make_inline
+def postprocess_model_inline(
+    wannier_folder, pos_kind, slice_idx=None, symmetries=None
+):
+    """
+    Parses the Wannier90 output to a tight-binding model, and optionally slices and symmetrizes it.
+    """
+    model = create_model(
+        wannier_folder,
+        pos_kind=pos_kind.value,
+        slice_idx=slice_idx,
+        symmetries=symmetries
+    )
+    return {'tb_model': model_to_singlefile(model)}
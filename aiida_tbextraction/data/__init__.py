@@ -0,0 +1,7 @@
+"""
+Defines data classes used by the tight-binding extraction workflows.
+"""
+
+from ._bands_view import BandsViewData
+
+__all__ = _bands_view.__all__  # pylint: disable=undefined-variable
@@ -0,0 +1,132 @@
+"""
+Defines a bands data class which stores a view onto the eigenvalues of a parent bands node instead of a copy.
+"""
+
+import numpy as np
+from fsc.export import export
+
+from aiida.orm import load_node
+from aiida.orm.data.array.bands import BandsData
+
+from .._helpers._mapped_array import get_mapped_bands, load_mapped_array
+
+_PARENT_KEY = 'view_parent_uuid'
+_OPERATIONS_KEY = 'view_operations'
+
+
+@export
+class BandsViewData(BandsData):
+    """
+    Bands data which is defined by a parent ``BandsData`` node and a list of operations (slicing the bands, flattening, cropping k-points) applied to its eigenvalues. Only the parent UUID and the operation descriptors are stored, the eigenvalues are computed each time they are accessed. The k-points are stored explicitly.
+    """
+
+    @classmethod
+    def from_parent(cls, parent, kpoints=None):
+        """
+        Create a view onto the bands of the given parent node, without any operations.
+
+        :param parent: The node containing the eigenvalues.
+        :type parent: BandsData
+
+        :param kpoints: K-points of the view. If not given, the k-points of the parent are used.
+        :type kpoints: KpointsData
+        """
+        if isinstance(parent, BandsViewData):
+            view = cls()
+            view._set_attr(_PARENT_KEY, parent.get_attr(_PARENT_KEY))  # pylint: disable=protected-access
+            view._set_attr(  # pylint: disable=protected-access
+                _OPERATIONS_KEY, list(parent.get_attr(_OPERATIONS_KEY))
+            )
+        else:
+            view = cls()
+            view._set_attr(_PARENT_KEY, parent.uuid)  # pylint: disable=protected-access
+            view._set_attr(_OPERATIONS_KEY, [])  # pylint: disable=protected-access
+        view.set_kpointsdata(parent if kpoints is None else kpoints)
+        units = parent.get_attr('units', None)
+        if units is not None:
+            view.units = units
+        return view
+
+    def _add_operation(self, **operation):
+        self._set_attr(
+            _OPERATIONS_KEY,
+            list(self.get_attr(_OPERATIONS_KEY)) + [operation]
+        )
+
+    def slice_bands(self, band_indices):
+        """
+        Select the bands with the given indices.
+        """
+        self._add_operation(
+            type='slice_bands', band_indices=[int(i) for i in band_indices]
+        )
+
+    def flatten(self):
+        """
+        Reshape the eigenvalues to dimension 2, dropping the leading (spin) axis.
+        """
+        self._add_operation(type='flatten')
+
+    def crop_kpoints(self, num_kpoints):
+        """
+        Keep only the last ``num_kpoints`` k-points.
+        """
+        self._add_operation(type='crop_kpoints', num_kpoints=int(num_kpoints))
+
+    @property
+    def parent(self):
+        """
+        The node containing the eigenvalues of which this is a view.
+        """
+        return load_node(self.get_attr(_PARENT_KEY))
+
+    def get_mapped_array(self, name):
+        """
+        Get a read-only array, where the eigenvalues are computed from the memory-mapped eigenvalues of the parent. Slicing the bands creates a copy of the selected bands, the other operations do not copy any data.
+        """
+        if name != 'bands':
+            return load_mapped_array(self, name)
+        return self.get_mapped_bands_chunk(0, None)
+
+    def get_mapped_bands_chunk(self, start, stop):
+        """
+        Get the eigenvalues of the k-points ``start:stop`` of the view. Slicing the bands only acts on the band axis, so it is applied after selecting the k-points. As a result, only the eigenvalues of the selected k-points are copied.
+        """
+        bands = get_mapped_bands(self.parent)
+        band_operations = []
+        for operation in self.get_attr(_OPERATIONS_KEY):
+            if operation['type'] == 'slice_bands':
+                band_operations.append(operation)
+            else:
+                bands = _apply_operation(bands, operation)
+        bands = bands[..., start:stop, :]
+        for operation in band_operations:
+            bands = _apply_operation(bands, operation)
+        return bands
+
+    def get_arraynames(self):
+        return sorted(
+            set(super(BandsViewData, self).get_arraynames()) | {'bands'}
+        )
+
+    def get_array(self, name):
+        if name == 'bands':
+            return np.array(self.get_mapped_array('bands'))
+        return super(BandsViewData, self).get_array(name)
+
+    def set_bands(self, *args, **kwargs):  # pylint: disable=unused-argument
+        raise TypeError('Cannot set the bands of a BandsViewData.')
+
+
+def _apply_operation(bands, operation):
+    """
+    Apply an operation descriptor to the given eigenvalues.
+    """
+    operation_type = operation['type']
+    if operation_type == 'slice_bands':
+        return np.take(bands, operation['band_indices'], axis=-1)
+    elif operation_type == 'flatten':
+        return bands.reshape(bands.shape[-2:])
+    elif operation_type == 'crop_kpoints':
+        return bands[..., -operation['num_kpoints']:, :]
+    raise ValueError('Unknown operation type {}'.format(operation_type))
@@ -0,0 +1,581 @@
+"""
+Defines additional optimization engines which are used to search for the optimal energy windows.
+"""
+
+import math
+
+import numpy as np
+
+from aiida.orm.data.base import List
+from aiida_optimize.engines.base import OptimizationEngineImpl, OptimizationEngineWrapper
+
+
+class _EngineImplBase(OptimizationEngineImpl):
+    """
+    Base class for the engine implementations, which dispatches the submit and update steps to the methods given by ``next_submit`` and ``next_update``.
+    """
+
+    def __init__(self, input_key, result_key, logger, result_state=None):
+        super(_EngineImplBase, self).__init__(
+            logger=logger, result_state=result_state
+        )
+        self.input_key = input_key
+        self.result_key = result_key
+
+    def _create_inputs(self):
+        submit_method = getattr(self, self.next_submit)
+        self.next_submit = None
+        return submit_method()
+
+    def _update(self, outputs):
+        update_method = getattr(self, self.next_update)
+        self.next_update = None
+        update_method(outputs)
+
+    def _to_inputs(self, points):
+        return [{self.input_key: List(list=list(pt))} for pt in points]
+
+    def _get_values(self, outputs):
+        return [
+            float(out[self.result_key].value)
+            for _, out in sorted(outputs.items())
+        ]
+
+    def _get_optimal_result(self):
+        """
+        Return the index, input value and output of the best evaluation.
+        """
+        cost_values = {
+            k: v.output[self.result_key]
+            for k, v in self._result_mapping.items()
+        }
+        opt_index, opt_output = min(
+            cost_values.items(), key=lambda item: item[1].value
+        )
+        opt_input = self._result_mapping[opt_index].input[self.input_key]
+        return (opt_index, opt_input, opt_output)
+
+    @property
+    def result_index(self):
+        return self._get_optimal_result()[0]
+
+    @property
+    def result_value(self):
+        return self._get_optimal_result()[2]
+
+
+class _ParallelNelderMeadImpl(_EngineImplBase):
+    """
+    Implementation class for the parallel Nelder-Mead optimization engine.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        simplex,
+        fun_simplex,
+        xtol,
+        ftol,
+        max_iter,
+        input_key,
+        result_key,
+        logger,
+        num_iter=0,
+        candidates=None,
+        next_submit='submit_initialize',
+        next_update=None,
+        finished=False,
+        exceeded_max_iters=False,
+        result_state=None
+    ):
+        super(_ParallelNelderMeadImpl, self).__init__(
+            input_key=input_key,
+            result_key=result_key,
+            logger=logger,
+            result_state=result_state
+        )
+        self.simplex = np.array(simplex, dtype=float)
+        self.fun_simplex = None if fun_simplex is None else np.array(
+            fun_simplex, dtype=float
+        )
+        self.xtol = xtol
+        self.ftol = ftol
+        self.max_iter = max_iter
+        self.num_iter = num_iter
+        self.candidates = candidates
+        self.next_submit = next_submit
+        self.next_update = next_update
+        self.finished = finished
+        self.exceeded_max_iters = exceeded_max_iters
+
+    @property
+    def _state(self):
+        return dict(
+            simplex=self.simplex.tolist(),
+            fun_simplex=None
+            if self.fun_simplex is None else self.fun_simplex.tolist(),
+            xtol=self.xtol,
+            ftol=self.ftol,
+            max_iter=self.max_iter,
+            input_key=self.input_key,
+            result_key=self.result_key,
+            num_iter=self.num_iter,
+            candidates=self.candidates,
+            next_submit=self.next_submit,
+            next_update=self.next_update,
+            finished=self.finished,
+            exceeded_max_iters=self.exceeded_max_iters
+        )
+
+    @property
+    def is_finished(self):
+        return self.finished
+
+    def submit_initialize(self):
+        self._logger.report('Submitting initial simplex.')
+        self.next_update = 'update_initialize'
+        return self._to_inputs(self.simplex)
+
+    def update_initialize(self, outputs):
+        self.fun_simplex = np.array(self._get_values(outputs))
+        self._check_finished()
+        self.next_submit = 'submit_candidates'
+
+    def submit_candidates(self):
+        """
+        Submit the reflection, expansion and contraction points of the current simplex at the same time.
+        """
+        self._sort_simplex()
+        centroid = np.average(self.simplex[:-1], axis=0)
+        worst = self.simplex[-1]
+        self.candidates = [(centroid + coeff * (centroid - worst)).tolist()
+                           for coeff in [1., 2., 0.5, -0.5]]
+        self._logger.report(
+            'Submitting reflection, expansion and contraction points.'
+        )
+        self.next_update = 'update_candidates'
+        return self._to_inputs(self.candidates)
+
+    def update_candidates(self, outputs):
+        """
+        Choose the new simplex point from the evaluated candidates, or shrink the simplex.
+        """
+        x_r, x_e, x_oc, x_ic = [np.array(x) for x in self.candidates]
+        f_r, f_e, f_oc, f_ic = self._get_values(outputs)
+        self.candidates = None
+        f_best = self.fun_simplex[0]
+        f_second_worst = self.fun_simplex[-2]
+        f_worst = self.fun_simplex[-1]
+        new_point = None
+        if f_r < f_best:
+            if f_e < f_r:
+                self._logger.report('Accepting expansion point.')
+                new_point = (x_e, f_e)
+            else:
+                self._logger.report('Accepting reflection point.')
+                new_point = (x_r, f_r)
+        elif f_r < f_second_worst:
+            self._logger.report('Accepting reflection point.')
+            new_point = (x_r, f_r)
+        elif f_r < f_worst:
+            if f_oc <= f_r:
+                self._logger.report('Accepting outside contraction point.')
+                new_point = (x_oc, f_oc)
+        elif f_ic < f_worst:
+            self._logger.report('Accepting inside contraction point.')
+            new_point = (x_ic, f_ic)
+
+        self.num_iter += 1
+        if new_point is None:
+            self.next_submit = 'submit_shrink'
+        else:
+            self.simplex[-1], self.fun_simplex[-1] = new_point
+            self._check_finished()
+            self.next_submit = 'submit_candidates'
+
+    def submit_shrink(self):
+        """
+        Shrink the simplex towards its best point, and submit the new points.
+        """
+        self._logger.report('Submitting shrink points.')
+        self.simplex[
+            1:
+        ] = self.simplex[0] + 0.5 * (self.simplex[1:] - self.simplex[0])
+        self.next_update = 'update_shrink'
+        return self._to_inputs(self.simplex[1:])
+
+    def update_shrink(self, outputs):
+        self.fun_simplex[1:] = self._get_values(outputs)
+        self._check_finished()
+        self.next_submit = 'submit_candidates'
+
+    def _sort_simplex(self):
+        idx = np.argsort(self.fun_simplex, kind='mergesort')
+        self.simplex = self.simplex[idx]
+        self.fun_simplex = self.fun_simplex[idx]
+
+    def _check_finished(self):
+        """
+        Check whether the optimization is converged or has exceeded the maximum number of iterations.
+        """
+        self._sort_simplex()
+        x_dist = np.max(np.abs(self.simplex[1:] - self.simplex[0]))
+        f_diff = np.max(np.abs(self.fun_simplex[1:] - self.fun_simplex[0]))
+        if x_dist < self.xtol and f_diff < self.ftol:
+            self._logger.report('Simplex converged.')
+            self.finished = True
+        elif self.num_iter >= self.max_iter:
+            self._logger.report('Maximum number of iterations exceeded.')
+            self.finished = True
+            self.exceeded_max_iters = True
+
+
+class ParallelNelderMead(OptimizationEngineWrapper):
+    """
+    Variant of the Nelder-Mead optimization engine which evaluates the reflection, expansion, and (outside and inside) contraction points of each iteration concurrently. Compared to the sequential Nelder-Mead algorithm, this evaluates more points in total, but reduces the number of sequential steps needed to converge.
+
+    :param simplex: The initial simplex.
+    :type simplex: list
+
+    :param xtol: Tolerance in the input value.
+    :type xtol: float
+
+    :param ftol: Tolerance in the function value.
+    :type ftol: float
+
+    :param max_iter: Maximum number of iteration steps.
+    :type max_iter: int
+
+    :param input_key: Name of the input argument in the evaluation process.
+    :type input_key: str
+
+    :param result_key: Name of the output argument in the evaluation process.
+    :type result_key: str
+    """
+    _IMPL_CLASS = _ParallelNelderMeadImpl
+
+    def __new__(  # pylint: disable=arguments-differ,too-many-arguments
+        cls,
+        simplex,
+        xtol=1e-4,
+        ftol=1e-4,
+        max_iter=1000,
+        input_key='x',
+        result_key='result',
+        logger=None
+    ):
+        return cls._IMPL_CLASS(
+            simplex=simplex,
+            fun_simplex=None,
+            xtol=xtol,
+            ftol=ftol,
+            max_iter=max_iter,
+            input_key=input_key,
+            result_key=result_key,
+            logger=logger
+        )
+
+
+def _normal_cdf(values):
+    return 0.5 * (1. + np.vectorize(math.erf)(values / math.sqrt(2.)))
+
+
+def _normal_pdf(values):
+    return np.exp(-0.5 * values**2) / math.sqrt(2. * math.pi)
+
+
+class _GaussianProcessImpl(_EngineImplBase):
+    """
+    Implementation class for the Gaussian process optimization engine.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        initial_points,
+        lower_bounds,
+        upper_bounds,
+        batch_size,
+        length_scale,
+        num_candidates,
+        xtol,
+        ftol,
+        max_iter,
+        seed,
+        input_key,
+        result_key,
+        logger,
+        points=None,
+        values=None,
+        pending_points=None,
+        num_iter=0,
+        next_submit='submit_initialize',
+        next_update=None,
+        finished=False,
+        exceeded_max_iters=False,
+        result_state=None
+    ):
+        super(_GaussianProcessImpl, self).__init__(
+            input_key=input_key,
+            result_key=result_key,
+            logger=logger,
+            result_state=result_state
+        )
+        self.initial_points = initial_points
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+        self.batch_size = batch_size
+        self.length_scale = length_scale
+        self.num_candidates = num_candidates
+        self.xtol = xtol
+        self.ftol = ftol
+        self.max_iter = max_iter
+        self.seed = seed
+        self.points = [] if points is None else points
+        self.values = [] if values is None else values
+        self.pending_points = pending_points
+        self.num_iter = num_iter
+        self.next_submit = next_submit
+        self.next_update = next_update
+        self.finished = finished
+        self.exceeded_max_iters = exceeded_max_iters
+
+    @property
+    def _state(self):
+        return dict(
+            initial_points=self.initial_points,
+            lower_bounds=self.lower_bounds,
+            upper_bounds=self.upper_bounds,
+            batch_size=self.batch_size,
+            length_scale=self.length_scale,
+            num_candidates=self.num_candidates,
+            xtol=self.xtol,
+            ftol=self.ftol,
+            max_iter=self.max_iter,
+            seed=self.seed,
+            input_key=self.input_key,
+            result_key=self.result_key,
+            points=self.points,
+            values=self.values,
+            pending_points=self.pending_points,
+            num_iter=self.num_iter,
+            next_submit=self.next_submit,
+            next_update=self.next_update,
+            finished=self.finished,
+            exceeded_max_iters=self.exceeded_max_iters
+        )
+
+    @property
+    def is_finished(self):
+        return self.finished
+
+    def submit_initialize(self):
+        self._logger.report('Submitting initial points.')
+        self.pending_points = [list(pt) for pt in self.initial_points]
+        self.next_update = 'update_points'
+        return self._to_inputs(self.pending_points)
+
+    def update_points(self, outputs):
+        """
+        Add the evaluated points to the data of the Gaussian process, and propose the next batch.
+        """
+        self.points.extend(self.pending_points)
+        self.values.extend(self._get_values(outputs))
+        self.pending_points = None
+        if self.num_iter >= self.max_iter:
+            self._logger.report('Maximum number of iterations exceeded.')
+            self.finished = True
+            self.exceeded_max_iters = True
+            return
+        batch = self._propose_batch()
+        if not batch:
+            self._logger.report(
+                'No point with sufficient expected improvement found.'
+            )
+            self.finished = True
+            return
+        self.pending_points = batch
+        self.next_submit = 'submit_batch'
+
+    def submit_batch(self):
+        """
+        Submit the next batch of points, chosen by maximizing the expected improvement.
+        """
+        self.num_iter += 1
+        self._logger.report(
+            'Submitting batch of {} points.'.format(len(self.pending_points))
+        )
+        self.next_update = 'update_points'
+        return self._to_inputs(self.pending_points)
+
+    def _get_training_data(self):
+        """
+        Get the evaluated points and normalized values. Infinite values (invalid windows) are replaced by a penalty which is larger than all finite values.
+        """
+        points = np.array(self.points, dtype=float)
+        values = np.array(self.values, dtype=float)
+        finite = np.isfinite(values)
+        if np.any(finite):
+            finite_values = values[finite]
+            penalty = np.max(finite_values) + max(np.ptp(finite_values), 1.)
+        else:
+            penalty = 1.
+        values[~finite] = penalty
+        offset = np.mean(values)
+        scale = np.std(values)
+        if scale == 0:
+            scale = 1.
+        return points, (values - offset) / scale, scale
+
+    def _kernel(self, points1, points2):
+        dist_sq = np.sum(
+            (points1[:, np.newaxis, :] - points2[np.newaxis, :, :])**2,
+            axis=-1
+        )
+        return np.exp(-0.5 * dist_sq / self.length_scale**2)
+
+    def _predict(self, points, values, candidates):
+        """
+        Calculate the posterior mean and standard deviation of the Gaussian process at the candidate points.
+        """
+        kernel_matrix = self._kernel(points, points
+                                     ) + 1e-6 * np.eye(len(points))
+        chol = np.linalg.cholesky(kernel_matrix)
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, values))
+        kernel_cross = self._kernel(points, candidates)
+        mean = np.dot(kernel_cross.T, alpha)
+        tmp = np.linalg.solve(chol, kernel_cross)
+        var = np.maximum(1. - np.sum(tmp**2, axis=0), 1e-12)
+        return mean, np.sqrt(var)
+
+    def _create_candidates(self, best_point):
+        """
+        Create random candidate points, uniformly within the bounds and concentrated around the current best point.
+        """
+        random_state = np.random.RandomState(self.seed + self.num_iter)
+        lower = np.array(self.lower_bounds, dtype=float)
+        upper = np.array(self.upper_bounds, dtype=float)
+        num_uniform = self.num_candidates // 2
+        uniform = random_state.uniform(
+            lower, upper, size=(num_uniform, len(lower))
+        )
+        local = best_point + random_state.normal(
+            scale=self.length_scale / 2.,
+            size=(self.num_candidates - num_uniform, len(lower))
+        )
+        candidates = np.clip(np.vstack([uniform, local]), lower, upper)
+        # the window values are always sorted
+        return np.sort(candidates, axis=-1)
+
+    def _remove_close_candidates(self, candidates, points):
+        """
+        Remove the candidates which are closer than ``xtol`` (in maximum norm) to any of the given points.
+        """
+        distances = np.max(
+            np.abs(candidates[:, np.newaxis, :] - points[np.newaxis, :, :]),
+            axis=-1
+        )
+        return candidates[np.min(distances, axis=-1) >= self.xtol]
+
+    def _propose_batch(self):
+        """
+        Propose a batch of points, using the 'kriging believer' heuristic: After each chosen point, the Gaussian process is updated with its predicted mean value. Candidates which are closer than ``xtol`` to an evaluated or chosen point are excluded.
+        """
+        points, values, scale = self._get_training_data()
+        candidates = self._remove_close_candidates(
+            self._create_candidates(points[np.argmin(values)]), points
+        )
+        batch = []
+        for _ in range(self.batch_size):
+            if len(candidates) == 0:
+                break
+            mean, std = self._predict(points, values, candidates)
+            improvement = np.min(values) - mean
+            z_value = improvement / std
+            expected_improvement = improvement * _normal_cdf(
+                z_value
+            ) + std * _normal_pdf(z_value)
+            idx = np.argmax(expected_improvement)
+            if expected_improvement[idx] * scale < self.ftol:
+                break
+            new_point = candidates[idx]
+            batch.append(new_point.tolist())
+            points = np.vstack([points, new_point])
+            values = np.append(values, mean[idx])
+            candidates = self._remove_close_candidates(
+                candidates, new_point[np.newaxis, :]
+            )
+        return batch
+
+
+class GaussianProcess(OptimizationEngineWrapper):
+    """
+    Optimization engine which models the cost function with a Gaussian process, and evaluates batches of points chosen by their expected improvement. All previously evaluated points are used to construct the model, making this engine suitable for cost functions which are expensive to evaluate.
+
+    :param initial_points: Points which are evaluated in the first step.
+    :type initial_points: list
+
+    :param lower_bounds: Lower bounds of the search region.
+    :type lower_bounds: list
+
+    :param upper_bounds: Upper bounds of the search region.
+    :type upper_bounds: list
+
+    :param batch_size: Number of points which are evaluated concurrently in each step.
+    :type batch_size: int
+
+    :param length_scale: Length scale of the squared exponential kernel.
+    :type length_scale: float
+
+    :param num_candidates: Number of random candidate points from which each batch is selected.
+    :type num_candidates: int
+
+    :param xtol: Minimum distance of a new point to the already evaluated points.
+    :type xtol: float
+
+    :param ftol: Minimum expected improvement for a new point.
+    :type ftol: float
+
+    :param max_iter: Maximum number of iteration steps.
+    :type max_iter: int
+
+    :param seed: Seed for creating the random candidate points.
+    :type seed: int
+
+    :param input_key: Name of the input argument in the evaluation process.
+    :type input_key: str
+
+    :param result_key: Name of the output argument in the evaluation process.
+    :type result_key: str
+    """
+    _IMPL_CLASS = _GaussianProcessImpl
+
+    def __new__(  # pylint: disable=arguments-differ,too-many-arguments
+        cls,
+        initial_points,
+        lower_bounds,
+        upper_bounds,
+        batch_size=4,
+        length_scale=1.,
+        num_candidates=2000,
+        xtol=1e-4,
+        ftol=1e-4,
+        max_iter=20,
+        seed=0,
+        input_key='x',
+        result_key='result',
+        logger=None
+    ):
+        return cls._IMPL_CLASS(
+            initial_points=initial_points,
+            lower_bounds=lower_bounds,
+            upper_bounds=upper_bounds,
+            batch_size=batch_size,
+            length_scale=length_scale,
+            num_candidates=num_candidates,
+            xtol=xtol,
+            ftol=ftol,
+            max_iter=max_iter,
+            seed=seed,
+            input_key=input_key,
+            result_key=result_key,
+            logger=logger
+        )
@@ -7,20 +7,61 @@ try:
 except ImportError:
     from chainmap import ChainMap
 
-import numpy as np
 from fsc.export import export
 
-from aiida.orm import DataFactory
-from aiida.orm.data.base import List, Float
+from aiida.orm import DataFactory, CalculationFactory, load_node
+from aiida.orm.data.base import List, Float, Bool
 from aiida.orm.calculation.inline import make_inline
+from aiida.orm.calculation.work import WorkCalculation
+from aiida.orm.querybuilder import QueryBuilder
 from aiida.work.workchain import WorkChain, ToContext, if_
 from aiida.common.links import LinkType
 
 from aiida_tools import check_workchain_step
 from aiida_tools.workchain_inputs import WORKCHAIN_INPUT_KWARGS, load_object
 
+from .._helpers._instrumentation import instrumented_step
+from .._helpers._band_index import get_band_index
+from .._helpers._mapped_array import iter_mapped_bands_chunks, KPOINT_CHUNK_SIZE
+from .._helpers._band_difference import calculate_chunked_difference
+from .._helpers._caching import ProcessCache, get_cache_key, get_inputs_cache_key, deduplicate_inline
+from .._helpers._tbmodels import create_model, model_to_singlefile, calculate_eigenvals
 from ..model_evaluation import ModelEvaluationBase
-from ..calculate_tb import TightBindingCalculation
+from ..calculate_tb import TightBindingCalculation, TIGHT_BINDING_CACHE, get_tight_binding_cache_key, get_wannier_calculation_inputs
+
+_WINDOW_CACHE = ProcessCache(
+    extra_key='tbextraction_window_cache_key', max_entries=10000
+)
+
+_RESTART_INPUT_KEY = 'tbextraction_wannier_input_key'
+_RESTART_WINDOW_KEY = 'tbextraction_window'
+_RESTART_FOLDER_KEY = 'tbextraction_wannier_folder_uuid'
+
+
+def _find_closest_restart_folder(input_key, window):
+    """
+    Find the retrieved Wannier90 folder of the previous RunWindow workflow with the given Wannier90 input key whose window is closest (in maximum norm) to the given window.
+    """
+    query = QueryBuilder()
+    query.append(
+        WorkCalculation,
+        filters={
+            'extras.{}'.format(_RESTART_INPUT_KEY): input_key,
+            'extras': {
+                'has_key': _RESTART_FOLDER_KEY
+            },
+            'attributes._process_label': 'RunWindow'
+        },
+        project=[
+            'extras.{}'.format(_RESTART_WINDOW_KEY),
+            'extras.{}'.format(_RESTART_FOLDER_KEY)
+        ]
+    )
+    candidates = [(max(abs(a - b) for a, b in zip(prev_window, window)), uuid)
+                  for prev_window, uuid in query.iterall()]
+    if not candidates:
+        return None
+    return load_node(min(candidates)[1])
 
 
 @export
@@ -32,7 +73,9 @@ class RunWindow(WorkChain):
     @classmethod
     def define(cls, spec):
         super(RunWindow, cls).define(spec)
-        spec.expose_inputs(TightBindingCalculation)
+        spec.expose_inputs(
+            TightBindingCalculation, exclude=['wannier_restart_folder']
+        )
         spec.expose_inputs(ModelEvaluationBase, exclude=['tb_model'])
         spec.input_namespace(
             'model_evaluation',
@@ -59,15 +102,103 @@ class RunWindow(WorkChain):
             'AiiDA workflow that will be used to evaluate the tight-binding model.',
             **WORKCHAIN_INPUT_KWARGS
         )
+        spec.input(
+            'evaluate_inline',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, only the Wannier90 calculation is submitted. Parsing, slicing and symmetrizing the tight-binding model, and calculating the band difference to the reference bands are done in a single in-process step using the TBmodels and bands_inspect libraries. In this case, the ``model_evaluation_workflow`` is not used, and no plot is created.'  # pylint: disable=line-too-long
+        )
+
+        spec.input(
+            'use_cache',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the result of a previous RunWindow workflow with the same (rounded) window and otherwise identical inputs is re-used instead of running the calculations again.'  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'cache_resolution',
+            valid_type=Float,
+            default=Float(1e-3),
+            help=
+            'Resolution to which the window values are rounded when looking up cached results.'
+        )
+
+        spec.input(
+            'project_window',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the window is projected onto the region of valid windows (sorted values, at most ``num_wann`` bands in the inner window and at least ``num_wann`` bands in the outer window at every k-point) before it is evaluated.'  # pylint: disable=line-too-long
+        )
+
+        spec.input(
+            'restart_from_closest',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the Wannier90 calculation is started from the unitary matrices of the previous RunWindow workflow with identical Wannier90 input whose window is closest to the current one. The unitary matrices are written by all RunWindow workflows with this option set.'  # pylint: disable=line-too-long
+        )
+
+        spec.input(
+            'reuse_tb_models',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, a finished TightBindingCalculation with identical inputs (for example pre-computed while the reference bands are still running) is re-used instead of calculating the tight-binding model again. Newly submitted TightBindingCalculations are registered for re-use.'  # pylint: disable=line-too-long
+        )
 
         spec.expose_outputs(ModelEvaluationBase)
+        spec.output(
+            'window',
+            valid_type=List,
+            required=False,
+            help=
+            'The projected energy window which was evaluated. This is only returned if ``project_window`` is True.'
+        )
         spec.outline(
+            cls.setup_window,
             if_(cls.window_valid)(
-                cls.calculate_model, cls.evaluate_bands, cls.finalize
+                cls.check_cache,
+                if_(cls.has_cached_result)(cls.add_cached_outputs).else_(
+                    if_(cls.has_inline_evaluation)(
+                        cls.run_wannier, cls.evaluate_model_inline
+                    ).else_(
+                        cls.calculate_model, cls.evaluate_bands, cls.finalize
+                    )
+                )
             ),
             if_(cls.window_invalid)(cls.abort_invalid)
         )
 
+    def has_inline_evaluation(self):
+        return self.inputs.evaluate_inline.value
+
+    def has_cached_result(self):
+        return self.ctx.cached_calc is not None
+
+    @instrumented_step
+    def setup_window(self):
+        """
+        Set the window which is evaluated, projecting it onto the valid windows if needed.
+        """
+        if self.inputs.project_window:
+            self.ctx.window = project_window_inline(
+                window=self.inputs.window,
+                wannier_bands=self.inputs.wannier_bands,
+                wannier_parameters=self.inputs.wannier_parameters
+            )[1]['window']
+            self.report(
+                'Projected window {} to {}.'.format(
+                    self.inputs.window.get_attr('list'),
+                    self.ctx.window.get_attr('list')
+                )
+            )
+            self.out('window', self.ctx.window)
+        else:
+            self.ctx.window = self.inputs.window
+
     @check_workchain_step
     def window_invalid(self):
         """
@@ -80,75 +211,188 @@ class RunWindow(WorkChain):
         """
         Check if a window is valid.
         """
-        window_list = self.inputs.window.get_attr('list')
-        win_min, froz_min, froz_max, win_max = window_list
-        num_wann = int(self.inputs.wannier_parameters.get_attr('num_wann'))
+        if 'window_invalid_reason' not in self.ctx:
+            self.ctx.window_invalid_reason = get_band_index(
+                self.inputs.wannier_bands
+            ).check_windows(
+                [self.ctx.window.get_attr('list')],
+                num_wann=int(
+                    self.inputs.wannier_parameters.get_attr('num_wann')
+                )
+            )[0]
+        reason = self.ctx.window_invalid_reason
+        if reason is None:
+            return True
+        if show_msg:
+            self.report(
+                'Window [{}, ({}, {}), {}] is invalid: {}'.format(
+                    *(self.ctx.window.get_attr('list') + [reason])
+                )
+            )
+        return False
 
-        window_invalid_str = 'Window [{}, ({}, {}), {}] is invalid'.format(
-            *window_list
+    @instrumented_step
+    def check_cache(self):
+        """
+        Look up the result of a previous RunWindow workflow with the same inputs, and register the cache key of the current workflow.
+        """
+        self.ctx.cached_calc = None
+        if not self.inputs.use_cache:
+            return
+        resolution = self.inputs.cache_resolution.value
+        rounded_window = [
+            round(value / resolution) * resolution
+            for value in self.ctx.window.get_attr('list')
+        ]
+        cache_inputs = {
+            label: value
+            for label, value in self.inputs.items() if label != 'use_cache'
+        }
+        cache_inputs['window'] = [
+            '{:.10g}'.format(value) for value in rounded_window
+        ]
+        key = get_inputs_cache_key(cache_inputs)
+        self.ctx.cached_calc = _WINDOW_CACHE.get(key, RunWindow)
+        self.report(
+            'Window cache {}: {hits} hits, {misses} misses.'.format(
+                'miss' if self.ctx.cached_calc is None else 'hit',
+                **_WINDOW_CACHE.stats
+            )
+        )
+        self.calc.set_extra(
+            'tbextraction_window_cache_hit', self.ctx.cached_calc is not None
         )
+        _WINDOW_CACHE.set_key(self.calc, key)
 
-        # window values must be sorted
-        if sorted(window_list) != window_list:
-            if show_msg:
-                self.report(
-                    '{}: windows values not sorted.'.
-                    format(window_invalid_str)
-                )
-            return False
+    @instrumented_step
+    def add_cached_outputs(self):
+        """
+        Add the outputs of the cached RunWindow workflow.
+        """
+        self.report(
+            'Using cached result from RunWindow<{}>.'.format(
+                self.ctx.cached_calc.pk
+            )
+        )
+        for label, node in self.ctx.cached_calc.get_outputs(
+            also_labels=True, link_type=LinkType.RETURN
+        ):
+            # the (projected) window is already set in 'setup_window'
+            if label == 'window':
+                continue
+            self.report("Adding {} to outputs.".format(label))
+            self.out(label, node)
 
-        # check number of bands in inner window <= num_wann
-        if np.max(self._count_bands(limits=(froz_min, froz_max))) > num_wann:
-            if show_msg:
-                self.report(
-                    '{}: Too many bands in inner window.'.
-                    format(window_invalid_str)
-                )
-            return False
-        # check number of bands in outer window >= num_wann
-        if np.min(self._count_bands(limits=(win_min, win_max))) < num_wann:
-            if show_msg:
+    def _get_tb_inputs(self):
+        """
+        Get the inputs for the tight-binding calculation, with the energy window set. When restarting from the closest previous window, the ``wannier_restart_folder`` is added and the unitary matrices are written.
+        """
+        inputs = self.exposed_inputs(TightBindingCalculation)
+        window_kwargs = dict(
+            wannier_parameters=inputs.pop('wannier_parameters'),
+            window=self.ctx.window
+        )
+        if self.inputs.restart_from_closest:
+            window_kwargs['write_u_matrices'] = Bool(True)
+            input_key = get_cache_key(
+                nodes={
+                    label: self.inputs.get(label, None)
+                    for label in [
+                        'wannier_input_folder', 'wannier_parameters',
+                        'wannier_projections'
+                    ]
+                }
+            )
+            restart_folder = _find_closest_restart_folder(
+                input_key=input_key, window=self.ctx.window.get_attr('list')
+            )
+            if restart_folder is None:
+                self.report('No previous Wannier90 run found for restart.')
+            else:
                 self.report(
-                    '{}: Too few bands in outer window.'.
-                    format(window_invalid_str)
+                    'Restarting Wannier90 from FolderData<{}>.'.format(
+                        restart_folder.pk
+                    )
                 )
-            return False
-        return True
+                inputs['wannier_restart_folder'] = restart_folder
+            self.calc.set_extra(_RESTART_INPUT_KEY, input_key)
+            self.calc.set_extra(
+                _RESTART_WINDOW_KEY, self.ctx.window.get_attr('list')
+            )
+        inputs.update(add_window_parameters_inline(**window_kwargs)[1])
+        return inputs
 
-    def _count_bands(self, limits):
+    def _register_restart_folder(self, folder):
         """
-        Count the number of bands within the given limits.
+        Store the UUID of the retrieved Wannier90 folder, such that it can be used to restart subsequent RunWindow workflows.
         """
-        lower, upper = sorted(limits)
-        bands = self.inputs.wannier_bands.get_bands()
-        band_count = np.sum(
-            np.logical_and(lower <= bands, bands <= upper), axis=-1
-        )
-        return band_count
+        if self.inputs.restart_from_closest:
+            self.calc.set_extra(_RESTART_FOLDER_KEY, folder.uuid)
 
-    @check_workchain_step
+    @instrumented_step
     def calculate_model(self):
         """
         Run the tight-binding calculation workflow.
         """
-        inputs = self.exposed_inputs(TightBindingCalculation)
-        # set the energy window
-        inputs.update(
-            add_window_parameters_inline(
-                wannier_parameters=inputs.pop('wannier_parameters'),
-                window=self.inputs.window
-            )[1]
-        )
+        inputs = self._get_tb_inputs()
+        if self.inputs.reuse_tb_models:
+            key = get_tight_binding_cache_key(inputs)
+            cached_calc = TIGHT_BINDING_CACHE.get(key, TightBindingCalculation)
+            if cached_calc is not None:
+                self.report(
+                    'Using tight-binding model from TightBindingCalculation<{}>.'.
+                    format(cached_calc.pk)
+                )
+                return ToContext(tbextraction_calc=cached_calc)
         self.report("Calculating tight-binding model.")
+        tbextraction_calc = self.submit(TightBindingCalculation, **inputs)
+        if self.inputs.reuse_tb_models:
+            TIGHT_BINDING_CACHE.set_key(tbextraction_calc, key)
+        return ToContext(tbextraction_calc=tbextraction_calc)
+
+    @instrumented_step
+    def run_wannier(self):
+        """
+        Run only the Wannier90 calculation, for the in-process model evaluation.
+        """
+        inputs = self._get_tb_inputs()
+        self.report("Running Wannier90 calculation.")
         return ToContext(
-            tbextraction_calc=self.submit(TightBindingCalculation, **inputs)
+            wannier_calc=self.submit(
+                CalculationFactory('wannier90.wannier90').process(),
+                **get_wannier_calculation_inputs(inputs)
+            )
         )
 
-    @check_workchain_step
+    @instrumented_step
+    def evaluate_model_inline(self):
+        """
+        Create and evaluate the tight-binding model in-process.
+        """
+        self._register_restart_folder(self.ctx.wannier_calc.out.retrieved)
+        self.report("Creating and evaluating tight-binding model in-process.")
+        inline_inputs = dict(
+            wannier_folder=self.ctx.wannier_calc.out.retrieved,
+            reference_bands=self.inputs.reference_bands,
+            slice_idx=self.inputs.get('slice_idx', None),
+            symmetries=self.inputs.get('symmetries', None),
+        )
+        result = evaluate_model_inline(
+            **{k: v
+               for k, v in inline_inputs.items() if v is not None}
+        )[1]
+        self.report("Adding tight-binding model and cost value to outputs.")
+        self.out('tb_model', result['tb_model'])
+        self.out('cost_value', result['cost_value'])
+
+    @instrumented_step
     def evaluate_bands(self):
         """
         Add the tight-binding model to the outputs and run the evaluation workflow.
         """
+        self._register_restart_folder(
+            self.ctx.tbextraction_calc.out.wannier_folder
+        )
         tb_model = self.ctx.tbextraction_calc.out.tb_model
         self.report("Adding tight-binding model to output.")
         self.out('tb_model', tb_model)
@@ -164,7 +408,7 @@ class RunWindow(WorkChain):
             )
         )
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         """
         Add the evaluation outputs.
@@ -175,7 +419,7 @@ class RunWindow(WorkChain):
             self.report("Adding {} to outputs.".format(label))
             self.out(label, node)
 
-    @check_workchain_step
+    @instrumented_step
     def abort_invalid(self):
         """
         Abort when an invalid window is found. The 'cost_value' is set to infinity.
@@ -184,12 +428,17 @@ class RunWindow(WorkChain):
         self.out('cost_value', Float('inf'))
 
 
+@deduplicate_inline
 @make_inline
-def add_window_parameters_inline(wannier_parameters, window):
+def add_window_parameters_inline(
+    wannier_parameters, window, write_u_matrices=None
+):
     """
     Adds the window values to the given Wannier90 input parameters.
     """
     param_dict = wannier_parameters.get_dict()
+    if write_u_matrices is not None:
+        param_dict['write_u_matrices'] = write_u_matrices.value
     win_min, froz_min, froz_max, win_max = window.get_attr('list')
     param_dict.update(
         dict(
@@ -200,3 +449,44 @@ def add_window_parameters_inline(wannier_parameters, window):
         )
     )
     return {'wannier_parameters': DataFactory('parameter')(dict=param_dict)}
+
+
+@make_inline
+def project_window_inline(window, wannier_bands, wannier_parameters):
+    """
+    Projects the window onto the region of valid windows for the given Wannier90 input bands.
+    """
+    return {
+        'window':
+        List(
+            list=get_band_index(wannier_bands).project_window(
+                window.get_attr('list'),
+                num_wann=int(wannier_parameters.get_attr('num_wann'))
+            )
+        )
+    }
+
+
+@make_inline
+def evaluate_model_inline(
+    wannier_folder, reference_bands, slice_idx=None, symmetries=None
+):
+    """
+    Creates the tight-binding model from the Wannier90 output, and calculates the average difference of its bandstructure to the reference bands.
+    """
+    model = create_model(
+        wannier_folder, slice_idx=slice_idx, symmetries=symmetries
+    )
+    kpoints = reference_bands.get_kpoints()
+    # the eigenvalues are calculated and compared in blocks of k-points
+    chunk_starts = range(0, len(kpoints), KPOINT_CHUNK_SIZE)
+    cost_value = calculate_chunked_difference((
+        reference_chunk,
+        calculate_eigenvals(model, kpoints[start:start + KPOINT_CHUNK_SIZE])
+    ) for start, reference_chunk in zip(
+        chunk_starts, iter_mapped_bands_chunks(reference_bands)
+    ))
+    return {
+        'tb_model': model_to_singlefile(model),
+        'cost_value': Float(cost_value)
+    }
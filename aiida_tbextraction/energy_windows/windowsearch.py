@@ -8,16 +8,25 @@ import numpy as np
 from fsc.export import export
 
 from aiida.orm import load_node
-from aiida.orm.data.base import List, Float
+from aiida.orm.data.base import List, Float, Str, Bool
 from aiida.orm.data.parameter import ParameterData
-from aiida.work.workchain import WorkChain, ToContext
+from aiida.work.workchain import WorkChain, ToContext, if_
 from aiida.common.links import LinkType
 
-from aiida_tools import check_workchain_step
+from aiida_tools.workchain_inputs import load_object
 from aiida_optimize.engines import NelderMead
 from aiida_optimize.workchain import OptimizationWorkChain
 
+from .._helpers._instrumentation import instrumented_step
+from .._helpers._band_index import get_band_index
 from .runwindow import RunWindow
+from ._engines import ParallelNelderMead, GaussianProcess
+
+_ENGINES = {
+    'nelder_mead': NelderMead,
+    'parallel_nelder_mead': ParallelNelderMead,
+    'gaussian_process': GaussianProcess,
+}
 
 
 @export
@@ -37,6 +46,20 @@ class WindowSearch(WorkChain):
             help=
             'Initial value for the disentanglement energy windows, given as a list ``[dis_win_min, dis_froz_min, dis_froz_max, dis_win_max]``.'
         )
+        spec.input(
+            'initial_simplex',
+            valid_type=List,
+            required=False,
+            help=
+            'Initial simplex of energy windows, given as a list of windows. If given, this takes precedence over the simplex created from ``initial_window`` and ``simplex_dist``. This can be used to continue from the result of a previous optimization.'  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'simplex_dist',
+            valid_type=Float,
+            default=Float(0.5),
+            help=
+            'Distance by which the window values are displaced from the initial window to create the initial simplex.'
+        )
         spec.input(
             'window_tol',
             valid_type=Float,
@@ -49,58 +72,237 @@ class WindowSearch(WorkChain):
             default=Float(0.02),
             help="Tolerance in the 'cost_value' for the window optimization."
         )
+        spec.input(
+            'engine',
+            valid_type=Str,
+            default=Str('nelder_mead'),
+            help=
+            "Optimization engine used for the window search. Can be 'nelder_mead', 'parallel_nelder_mead' to evaluate the reflection, expansion and contraction points of each Nelder-Mead step concurrently, or 'gaussian_process' to evaluate batches of windows proposed by a Gaussian process model of the cost function."  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'engine_parameters',
+            valid_type=ParameterData,
+            required=False,
+            help=
+            "Additional keyword arguments passed to the optimization engine. For the 'gaussian_process' engine, the 'search_radius' (default 3) determines the bounds of the search region around the initial window."  # pylint: disable=line-too-long
+        )
+
+        spec.input(
+            'defer_plot',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            "If True, the windows tried during the optimization are evaluated without creating a plot (by passing ``plot=False`` to the ``model_evaluation_workflow``). The ``model_evaluation_workflow`` is then run once more for the optimal tight-binding model to create the plot, repeating its full evaluation (the cost value from the optimization is kept). This requires a ``model_evaluation_workflow`` with a ``plot`` input."  # pylint: disable=line-too-long
+        )
+
+        spec.outline(
+            cls.create_optimization,
+            if_(cls.has_deferred_plot)(cls.evaluate_optimal_model),
+            cls.finalize
+        )
 
-        spec.outline(cls.create_optimization, cls.finalize)
+    def has_deferred_plot(self):
+        return self.inputs.defer_plot.value
 
-    @check_workchain_step
+    @instrumented_step
     def create_optimization(self):
         """
         Run the optimization workchain.
         """
-        self.report('Launching Window optimization.')
-        initial_window_list = self.inputs.initial_window.get_attr('list')
-        window_simplex = [initial_window_list]
-        simplex_dist = 0.5
-        for i in range(len(initial_window_list)):
-            window = copy.deepcopy(initial_window_list)
-            window[i] += simplex_dist
-            window_simplex.append(window)
+        if self.inputs.defer_plot:
+            evaluation_workflow = load_object(
+                self.inputs.model_evaluation_workflow
+            )
+            if 'plot' not in evaluation_workflow.spec().inputs:
+                raise ValueError(
+                    "The model evaluation workflow '{}' has no 'plot' input, and cannot be used with 'defer_plot'.".
+                    format(evaluation_workflow.__name__)
+                )
+        engine_name = self.inputs.engine.value
+        try:
+            engine = _ENGINES[engine_name]
+        except KeyError:
+            raise ValueError(
+                "Invalid engine '{}', must be one of {}.".format(
+                    engine_name, sorted(_ENGINES.keys())
+                )
+            )
+        self.report(
+            "Launching Window optimization with engine '{}'.".
+            format(engine_name)
+        )
+        if 'initial_simplex' in self.inputs:
+            self.report('Using the given initial simplex.')
+            window_simplex = self.inputs.initial_simplex.get_attr('list')
+        else:
+            window_simplex = self._create_simplex(
+                self.inputs.initial_window.get_attr('list'),
+                simplex_dist=self.inputs.simplex_dist.value
+            )
 
         return ToContext(
             optimization=self.submit(
                 OptimizationWorkChain,
-                engine=NelderMead,
+                engine=engine,
                 engine_kwargs=ParameterData(
-                    dict=dict(
-                        result_key='cost_value',
-                        xtol=self.inputs.window_tol.value,
-                        ftol=np.inf,
-                        input_key='window',
-                        simplex=window_simplex
-                    )
+                    dict=self._get_engine_kwargs(engine_name, window_simplex)
                 ),
                 calculation_workchain=RunWindow,
-                calculation_inputs=dict(
-                    wannier_kpoints=self.inputs.wannier_bands,
-                    **self.exposed_inputs(RunWindow)
-                )
+                calculation_inputs=self._get_calculation_inputs()
+            )
+        )
+
+    def _get_calculation_inputs(self):
+        """
+        Create the inputs for the RunWindow workflows.
+        """
+        inputs = self.exposed_inputs(RunWindow)
+        if self.inputs.defer_plot:
+            inputs['model_evaluation'] = dict(
+                inputs.get('model_evaluation', {}), plot=Bool(False)
+            )
+        return dict(wannier_kpoints=self.inputs.wannier_bands, **inputs)
+
+    def _get_engine_kwargs(self, engine_name, window_simplex):
+        """
+        Create the keyword arguments for the optimization engine.
+        """
+        engine_parameters = self.inputs.get(
+            'engine_parameters', ParameterData()
+        ).get_dict()
+        engine_kwargs = dict(result_key='cost_value', input_key='window')
+        if engine_name == 'gaussian_process':
+            search_radius = engine_parameters.pop('search_radius', 3.)
+            initial_window = np.array(window_simplex[0])
+            engine_kwargs.update(
+                initial_points=window_simplex,
+                lower_bounds=(initial_window - search_radius).tolist(),
+                upper_bounds=(initial_window + search_radius).tolist(),
+                xtol=self.inputs.window_tol.value,
+                ftol=self.inputs.cost_tol.value
             )
+        else:
+            engine_kwargs.update(
+                xtol=self.inputs.window_tol.value,
+                ftol=np.inf,
+                simplex=window_simplex
+            )
+        engine_kwargs.update(engine_parameters)
+        return engine_kwargs
+
+    def _create_simplex(self, initial_window_list, simplex_dist):
+        """
+        Create the initial simplex by displacing each window value of the initial window.
+        """
+        return create_window_simplex(
+            initial_window_list,
+            simplex_dist=simplex_dist,
+            wannier_bands=self.inputs.wannier_bands,
+            num_wann=int(self.inputs.wannier_parameters.get_attr('num_wann')),
+            report=self.report
         )
 
-    @check_workchain_step
+    @property
+    def optimal_calc(self):
+        return load_node(self.ctx.optimization.out.calculation_uuid.value)
+
+    @instrumented_step
+    def evaluate_optimal_model(self):
+        """
+        Run the model evaluation workflow with plotting for the optimal tight-binding model. This repeats the full evaluation, including the bandstructure calculation, since the model evaluation workflow creates the plot from its own calculated bands.
+        """
+        self.report('Running model evaluation for the optimal model.')
+        return ToContext(
+            optimal_evaluation=self.submit(
+                load_object(self.inputs.model_evaluation_workflow),
+                tb_model=self.optimal_calc.out.tb_model,
+                reference_bands=self.inputs.reference_bands,
+                tbmodels_code=self.inputs.tbmodels_code,
+                **self.inputs.get('model_evaluation', {})
+            )
+        )
+
+    @instrumented_step
     def finalize(self):
         """
         Add the optimization results to the outputs.
         """
+        if self.inputs.use_cache:
+            cache_hits = [
+                calc.get_extras()['tbextraction_window_cache_hit'] for calc in
+                self.ctx.optimization.get_outputs(link_type=LinkType.CALL)
+                if 'tbextraction_window_cache_hit' in calc.get_extras()
+            ]
+            self.report(
+                'Window cache statistics: {} hits, {} misses.'.format(
+                    sum(cache_hits),
+                    len(cache_hits) - sum(cache_hits)
+                )
+            )
         self.report('Add optimization results to outputs.')
-        optimal_calc = load_node(
-            self.ctx.optimization.out.calculation_uuid.value
-        )
+        optimal_calc = self.optimal_calc
         self.report('Adding optimal window to outputs.')
-        self.out('window', optimal_calc.inp.window)
-        for label, node in optimal_calc.get_outputs(
-            also_labels=True, link_type=LinkType.RETURN
-        ):
+        optimal_outputs = dict(
+            optimal_calc.get_outputs(
+                also_labels=True, link_type=LinkType.RETURN
+            )
+        )
+        # use the projected window if it exists
+        self.out(
+            'window', optimal_outputs.pop('window', optimal_calc.inp.window)
+        )
+        for label, node in optimal_outputs.items():
             self.report("Adding {} to outputs.".format(label))
             self.out(label, node)
+        if self.inputs.defer_plot:
+            # the cost value is kept from the optimization
+            for label, node in self.ctx.optimal_evaluation.get_outputs(
+                also_labels=True, link_type=LinkType.RETURN
+            ):
+                if label not in optimal_outputs:
+                    self.report("Adding {} to outputs.".format(label))
+                    self.out(label, node)
         self.report('Finished!')
+
+
+def create_window_simplex(
+    initial_window_list, simplex_dist, wannier_bands, num_wann, report
+):
+    """
+    Create the initial simplex by displacing each window value of the initial window. Displacements which lead to an invalid window are done in the opposite direction instead.
+
+    :param initial_window_list: The initial window.
+    :type initial_window_list: list
+
+    :param simplex_dist: Distance by which the window values are displaced.
+    :type simplex_dist: float
+
+    :param wannier_bands: Input bandstructure for Wannier90.
+    :type wannier_bands: BandsData
+
+    :param num_wann: Number of Wannier functions.
+    :type num_wann: int
+
+    :param report: Function which is used to report messages.
+    """
+    band_index = get_band_index(wannier_bands)
+    if band_index.check_windows([initial_window_list], num_wann)[0]:
+        report('Warning: The initial window is invalid.')
+    window_simplex = [initial_window_list]
+    for i in range(len(initial_window_list)):
+        candidates = []
+        for displacement in [simplex_dist, -simplex_dist]:
+            window = copy.deepcopy(initial_window_list)
+            window[i] += displacement
+            candidates.append(window)
+        reasons = band_index.check_windows(candidates, num_wann)
+        if reasons[0] is not None and reasons[1] is None:
+            report(
+                'Displacing window value {} in negative direction: {}'.format(
+                    i, reasons[0]
+                )
+            )
+            window_simplex.append(candidates[1])
+        else:
+            window_simplex.append(candidates[0])
+    return window_simplex
@@ -5,5 +5,6 @@ Workflows for running the first-principles calculations needed as input for the
 from ._base import FirstPrinciplesRunBase
 from ._split_runs import SplitFirstPrinciplesRun
 from ._vasp_run import VaspFirstPrinciplesRun
+from ._qe_run import QEFirstPrinciplesRun
 
-__all__ = _base.__all__ + _split_runs.__all__ + _vasp_run.__all__  # pylint: disable=undefined-variable
+__all__ = _base.__all__ + _split_runs.__all__ + _vasp_run.__all__ + _qe_run.__all__  # pylint: disable=undefined-variable
@@ -12,6 +12,9 @@ import numpy as np
 from aiida.orm import DataFactory
 from aiida.orm.calculation.inline import make_inline
 
+from ..._helpers._caching import deduplicate_inline
+from ...data import BandsViewData
+
 
 @make_inline
 def merge_parameters_inline(param_main, param_fallback):
@@ -24,6 +27,150 @@ def merge_parameters_inline(param_main, param_fallback):
     return {'parameters': DataFactory('parameter')(dict=res_dict)}
 
 
+def resolve_parameter_dicts(
+    parameters, namespace_parameters, force_parameters, nested=False
+):
+    """
+    Resolve the parameters for each namespace. The values explicitly given for a namespace take priority over the top-level parameters, and the forced parameters take priority over both. Namespaces whose parameters are identical to the top-level parameters are omitted from the result.
+
+    :param parameters: Top-level parameters.
+    :type parameters: dict
+
+    :param namespace_parameters: Parameters given in each namespace.
+    :type namespace_parameters: dict
+
+    :param force_parameters: Parameters which are forced in each namespace.
+    :type force_parameters: dict
+
+    :param nested: Merge nested dictionaries (such as the namelists of Quantum ESPRESSO inputs) recursively.
+    :type nested: bool
+    """
+    result = {}
+    for namespace in set(namespace_parameters) | set(force_parameters):
+        if nested:
+            resolved = merge_nested_dicts(
+                force_parameters.get(namespace, {}),
+                merge_nested_dicts(
+                    namespace_parameters.get(namespace, {}), parameters
+                )
+            )
+        else:
+            resolved = dict(
+                ChainMap(
+                    force_parameters.get(namespace, {}),
+                    namespace_parameters.get(namespace, {}), parameters
+                )
+            )
+        if resolved != parameters:
+            result[namespace] = resolved
+    return result
+
+
+def group_namespaces(resolved_parameters):
+    """
+    Group the namespaces with identical resolved parameters. Returns a dictionary mapping each namespace to the (alphabetically) first namespace in its group.
+    """
+    result = {}
+    for namespace in sorted(resolved_parameters):
+        for representative in sorted(set(result.values())):
+            if resolved_parameters[representative
+                                   ] == resolved_parameters[namespace]:
+                result[namespace] = representative
+                break
+        else:
+            result[namespace] = namespace
+    return result
+
+
+def _resolve_parameter_nodes(
+    parameters, force_parameters, namespace_parameters, nested
+):
+    """
+    Helper to create the outputs of the inline calculations resolving the parameters.
+    """
+    resolved = resolve_parameter_dicts(
+        parameters.get_dict(),
+        namespace_parameters={
+            key: value.get_dict()
+            for key, value in namespace_parameters.items()
+        },
+        force_parameters=force_parameters.get_dict(),
+        nested=nested
+    )
+    return {
+        representative:
+        DataFactory('parameter')(dict=resolved[representative])
+        for representative in set(group_namespaces(resolved).values())
+    }
+
+
+@make_inline
+def resolve_parameters_inline(
+    parameters, force_parameters, **namespace_parameters
+):
+    """
+    Resolves the parameters for multiple namespaces in a single step. For each group of namespaces with identical parameters, one ``ParameterData`` is returned, labelled with the first namespace of the group.
+    """
+    return _resolve_parameter_nodes(
+        parameters, force_parameters, namespace_parameters, nested=False
+    )
+
+
+@make_inline
+def resolve_nested_parameters_inline(
+    parameters, force_parameters, **namespace_parameters
+):
+    """
+    Like :func:`resolve_parameters_inline`, but merges nested dictionaries (such as the namelists of Quantum ESPRESSO inputs) recursively.
+    """
+    return _resolve_parameter_nodes(
+        parameters, force_parameters, namespace_parameters, nested=True
+    )
+
+
+def merge_nested_dicts(main, fallback):
+    """
+    Recursively merge two dictionaries. The values of ``main`` take priority over those of ``fallback``, except where both values are dictionaries, in which case they are merged.
+    """
+    result = dict(fallback)
+    for key, value in main.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_nested_dicts(value, result[key])
+        else:
+            result[key] = value
+    return result
+
+
+@deduplicate_inline
+@make_inline
+def merge_nested_parameters_inline(param_main, param_fallback):
+    """
+    Merges two ParameterData objects with nested dictionaries (such as the namelists of Quantum ESPRESSO inputs). The values of ``param_main`` take priority over those of ``param_fallback``.
+    """
+    return {
+        'parameters':
+        DataFactory('parameter')(
+            dict=merge_nested_dicts(
+                param_main.get_dict(), param_fallback.get_dict()
+            )
+        )
+    }
+
+
+@deduplicate_inline
+@make_inline
+def explicit_kpoints_inline(kpoints_mesh):
+    """
+    Creates an explicit list of k-points with equal weights from a k-point mesh.
+    """
+    kpoints_array = kpoints_mesh.get_kpoints_mesh(print_list=True)
+    kpoints = DataFactory('array.kpoints')()
+    kpoints.set_kpoints(
+        kpoints_array, weights=[1. / len(kpoints_array)] * len(kpoints_array)
+    )
+    return {'kpoints': kpoints}
+
+
 @make_inline
 def merge_kpoints_inline(mesh_kpoints, band_kpoints):
     """
@@ -39,18 +186,18 @@ def merge_kpoints_inline(mesh_kpoints, band_kpoints):
     return {'kpoints': kpoints}
 
 
+@deduplicate_inline
 @make_inline
 def flatten_bands_inline(bands):
     """
     Flatten the bands such that they have dimension 2.
     """
-    flattened_bands = bands.copy()
-    bands_array = bands.get_bands()
-    flattened_bands.set_bands(bands_array.reshape(bands_array.shape[-2:]))
-
+    flattened_bands = BandsViewData.from_parent(bands)
+    flattened_bands.flatten()
     return {'bands': flattened_bands}
 
 
+@deduplicate_inline
 @make_inline
 def crop_bands_inline(bands, kpoints):
     """
@@ -62,8 +209,6 @@ def crop_bands_inline(bands, kpoints):
     cropped_bands_kpoints = bands.get_kpoints()[band_slice]
     assert np.allclose(cropped_bands_kpoints, kpoints_array)
 
-    cropped_bands = DataFactory('array.bands')()
-    cropped_bands.set_kpointsdata(kpoints)
-    cropped_bands_array = bands.get_bands()[band_slice]
-    cropped_bands.set_bands(cropped_bands_array)
+    cropped_bands = BandsViewData.from_parent(bands, kpoints=kpoints)
+    cropped_bands.crop_kpoints(len(kpoints_array))
     return {'bands': cropped_bands}
@@ -0,0 +1,33 @@
+"""
+Defines helper functions to check the output of VASP calculations.
+"""
+
+_READ_WAVECAR_EXTRA = 'tbextraction_read_wavecar'
+
+
+def _scan_read_wavecar(stdout_file):
+    """
+    Scan the VASP standard output line by line. Returns ``True`` if the WAVECAR was read, and ``False`` otherwise.
+    """
+    read_wavecar = False
+    with open(stdout_file, 'r') as in_file:
+        for line in in_file:
+            if 'WAVECAR not read' in line:
+                return False
+            if 'reading WAVECAR' in line:
+                read_wavecar = True
+    return read_wavecar
+
+
+def check_read_wavecar(calc):
+    """
+    Check whether the given VASP calculation has read the WAVECAR file. The result is stored in the extras of the calculation, such that the output is only scanned once.
+    """
+    extras = calc.get_extras()
+    if _READ_WAVECAR_EXTRA in extras:
+        return extras[_READ_WAVECAR_EXTRA]
+    result = _scan_read_wavecar(
+        calc.get_retrieved_node().get_abs_path('_scheduler-stdout.txt')
+    )
+    calc.set_extra(_READ_WAVECAR_EXTRA, result)
+    return result
@@ -10,25 +10,24 @@ except ImportError:
 
 from fsc.export import export
 
+from aiida.orm import CalculationFactory
 from aiida.work.workchain import ToContext
 from aiida.orm.code import Code
-from aiida.orm.data.base import Bool
 from aiida.orm.data.parameter import ParameterData
 
-# from aiida_vasp.calcs.vasp import VaspCalculation
-
-from aiida_tools import check_workchain_step
-
-# from .wannier_input import VaspWannierInput
-# from .reference_bands import VaspReferenceBands
+from .._helpers._instrumentation import instrumented_step
+from .wannier_input import QEWannierInput
+from .reference_bands import QEReferenceBands
 from ._base import FirstPrinciplesRunBase
-from ._helpers._inline_calcs import merge_parameters_inline
+from ._helpers._inline_calcs import resolve_parameter_dicts, group_namespaces, resolve_nested_parameters_inline
+
+_SUB_CALCULATIONS = ['scf', 'bands', 'to_wannier']
 
 
 @export
 class QEFirstPrinciplesRun(FirstPrinciplesRunBase):
     """
-    Workflow for calculating the inputs needed for tight-binding calculation and evaluation with Quantum ESPRESSO.
+    Workflow for calculating the inputs needed for tight-binding calculation and evaluation with Quantum ESPRESSO. The workflow first performs an SCF step. The bandstructure and Wannier90 input calculations are started from the remote folder of the SCF calculation, such that the charge density and wavefunctions are not retrieved. This requires all calculations to run on the same computer.
     """
 
     @classmethod
@@ -36,64 +35,113 @@ class QEFirstPrinciplesRun(FirstPrinciplesRunBase):
         super(QEFirstPrinciplesRun, cls).define(spec)
 
         # Top-level parameters
-        spec.input('code', valid_type=Code)
-        spec.input('parameters', valid_type=ParameterData)
+        spec.input('code', valid_type=Code, help='Code that runs pw.x.')
+        spec.input(
+            'parameters',
+            valid_type=ParameterData,
+            help=
+            'Parameters passed to all pw.x calculations, unless explicitly overwritten. Values in the namespaces are merged with the top-level parameters.'
+        )
         spec.input_namespace(
-            'calculation_kwargs', required=False, dynamic=True
+            'calculation_kwargs',
+            required=False,
+            dynamic=True,
+            help=
+            'Keyword arguments passed to all calculations, unless explicitly overwritten.'
         )
 
         # Optional parameters to override for specific calculations.
-        # TODO: Use expose for the sub-workflows.
-        for sub_calc in ['scf', 'bands', 'to_wannier']:
-            spec.input_namespace(sub_calc, required=False, dynamic=True)
-
-        spec.input('bands.merge_kpoints', valid_type=Bool, default=Bool(False))
-
-        # spec.expose_outputs(VaspReferenceBands)
-        # spec.expose_outputs(VaspWannierInput)
-
-        spec.outline(cls.run_scf, cls.run_bands_and_wannier, cls.finalize)
-
-    # def _collect_common_inputs(
-    #     self, namespace, expand_kwargs=False, force_parameters=None
-    # ):
-    #     """
-    #     Join the top-level inputs and inputs set in a specific namespace.
-    #     """
-    #     ns_inputs = self.inputs.get(namespace, {})
-    #     ns_parameters = ns_inputs.get('parameters')
-    #     if ns_parameters is None:
-    #         parameters = self.inputs.parameters
-    #     else:
-    #         parameters = merge_parameters_inline(
-    #             param_main=ns_parameters,
-    #             param_fallback=self.inputs.parameters
-    #         )[1]['parameters']
-    #         if force_parameters:
-    #             parameters = merge_parameters_inline(
-    #                 param_main=ParameterData(dict=force_parameters),
-    #                 param_fallback=parameters
-    #             )[1]['parameters']
-    #     calculation_kwargs = copy.deepcopy(
-    #         dict(
-    #             ChainMap(
-    #                 ns_inputs.get('calculation_kwargs', {}),
-    #                 self.inputs.calculation_kwargs
-    #             )
-    #         )
-    #     )
-    #     res = dict(
-    #         code=self.inputs.code,
-    #         structure=self.inputs.structure,
-    #         parameters=parameters,
-    #     )
-    #     if expand_kwargs:
-    #         res.update(calculation_kwargs)
-    #     else:
-    #         res['calculation_kwargs'] = calculation_kwargs
-    #     return res
-
-    @check_workchain_step
+        for sub_calc in _SUB_CALCULATIONS:
+            spec.input_namespace(
+                sub_calc,
+                required=False,
+                dynamic=True,
+                help="Inputs passed to the '{}' sub-workflow / calculation".
+                format(sub_calc)
+            )
+
+        spec.input(
+            'to_wannier.wannier_code',
+            valid_type=Code,
+            help='Code that runs Wannier90, used to create the ``.nnkp`` file.'
+        )
+        spec.input(
+            'to_wannier.pw2wannier_code',
+            valid_type=Code,
+            help='Code that runs pw2wannier90.x.'
+        )
+
+        spec.expose_outputs(QEReferenceBands)
+        spec.expose_outputs(QEWannierInput)
+
+        spec.outline(
+            cls.resolve_parameters, cls.run_scf, cls.run_bands_and_wannier,
+            cls.finalize
+        )
+
+    @instrumented_step
+    def resolve_parameters(self):
+        """
+        Resolve the parameters of the 'scf', 'bands' and 'to_wannier' calculations in a single step.
+        """
+        namespace_parameters = {
+            namespace: self.inputs[namespace]['parameters']
+            for namespace in _SUB_CALCULATIONS
+            if 'parameters' in self.inputs.get(namespace, {})
+        }
+        force_parameters = {'scf': {'CONTROL': {'calculation': 'scf'}}}
+        resolved = resolve_parameter_dicts(
+            self.inputs.parameters.get_dict(),
+            namespace_parameters={
+                key: value.get_dict()
+                for key, value in namespace_parameters.items()
+            },
+            force_parameters=force_parameters,
+            nested=True
+        )
+        self.ctx.parameters = {
+            namespace: self.inputs.parameters
+            for namespace in _SUB_CALCULATIONS
+        }
+        if resolved:
+            self.report(
+                'Resolving parameters for {}.'.format(sorted(resolved.keys()))
+            )
+            resolved_nodes = resolve_nested_parameters_inline(
+                parameters=self.inputs.parameters,
+                force_parameters=ParameterData(dict=force_parameters),
+                **namespace_parameters
+            )[1]
+            for namespace, representative in group_namespaces(resolved
+                                                              ).items():
+                self.ctx.parameters[namespace] = resolved_nodes[representative]
+
+    def _collect_common_inputs(self, namespace, expand_kwargs=False):
+        """
+        Join the top-level inputs and inputs set in a specific namespace.
+        """
+        ns_inputs = self.inputs.get(namespace, {})
+        parameters = self.ctx.parameters[namespace]
+        calculation_kwargs = copy.deepcopy(
+            dict(
+                ChainMap(
+                    ns_inputs.get('calculation_kwargs', {}),
+                    self.inputs.get('calculation_kwargs', {})
+                )
+            )
+        )
+        res = dict(
+            code=self.inputs.code,
+            structure=self.inputs.structure,
+            parameters=parameters,
+        )
+        if expand_kwargs:
+            res.update(calculation_kwargs)
+        else:
+            res['calculation_kwargs'] = calculation_kwargs
+        return res
+
+    @instrumented_step
     def run_scf(self):
         """
         Run the SCF calculation step.
@@ -101,73 +149,56 @@ class QEFirstPrinciplesRun(FirstPrinciplesRunBase):
         self.report('Launching SCF calculation.')
         return ToContext(
             scf=self.submit(
-                VaspCalculation.process(),
-                paw=self.inputs.potentials,
+                CalculationFactory('quantumespresso.pw').process(),
+                pseudo=self.inputs.potentials,
                 kpoints=self.inputs.kpoints_mesh,
-                settings=ParameterData(
-                    dict={
-                        # 'ADDITIONAL_RETRIEVE_LIST': ['WAVECAR']
-                    }
-                ),
-                **self._collect_common_inputs(
-                    'scf',
-                    # force_parameters={'lwave': True},
-                    expand_kwargs=True
-                )
+                **self._collect_common_inputs('scf', expand_kwargs=True)
             )
         )
 
-    # def _collect_workchain_inputs(self, namespace):
-    #     """
-    #     Helper to collect the inputs for the reference bands and wannier input workflows.
-    #     """
-    #     scf_wavefun = self.ctx.scf.out.wavefunctions
-    #     res = self._collect_common_inputs(namespace)
-    #     res['potentials'] = self.inputs.potentials
-    #     res['calculation_kwargs']['wavefunctions'] = scf_wavefun
-    #     self.report(res['calculation_kwargs'])
-    #     return res
-
-    @check_workchain_step
+    def _collect_workchain_inputs(self, namespace):
+        """
+        Helper to collect the inputs for the reference bands and wannier input workflows.
+        """
+        res = self._collect_common_inputs(namespace)
+        for key, value in self.inputs.get(namespace, {}).items():
+            if key not in ['parameters', 'calculation_kwargs']:
+                res[key] = value
+        res['potentials'] = self.inputs.potentials
+        # the charge density and wavefunctions are copied on the remote computer
+        res['parent_folder'] = self.ctx.scf.out.remote_folder
+        return res
+
+    @instrumented_step
     def run_bands_and_wannier(self):
         """
         Run the reference bands and wannier input workflows.
         """
         self.report('Launching bands and to_wannier workchains.')
-        # return ToContext(
-        #     bands=self.submit(
-        #         VaspReferenceBands,
-        #         kpoints=self.inputs.kpoints,
-        #         kpoints_mesh=self.inputs.kpoints_mesh,
-        #         merge_kpoints=self.inputs.bands['merge_kpoints'],
-        #         **self._collect_workchain_inputs('bands')
-        #     ),
-        #     to_wannier=self.submit(
-        #         VaspWannierInput,
-        #         kpoints_mesh=self.inputs.kpoints_mesh,
-        #         wannier_parameters=self.inputs.get('wannier_parameters', None),
-        #         wannier_projections=self.inputs.get(
-        #             'wannier_projections', None
-        #         ),
-        #         **self._collect_workchain_inputs('to_wannier')
-        #     )
-        # )
-
-    @check_workchain_step
+        return ToContext(
+            bands=self.submit(
+                QEReferenceBands,
+                kpoints=self.inputs.kpoints,
+                **self._collect_workchain_inputs('bands')
+            ),
+            to_wannier=self.submit(
+                QEWannierInput,
+                kpoints_mesh=self.inputs.kpoints_mesh,
+                wannier_parameters=self.inputs.get('wannier_parameters', None),
+                wannier_projections=self.inputs.get(
+                    'wannier_projections', None
+                ),
+                **self._collect_workchain_inputs('to_wannier')
+            )
+        )
+
+    @instrumented_step
     def finalize(self):
         """
         Add outputs of the bandstructure and wannier input calculations.
         """
-        # self.report('Checking that the bands calculation used WAVECAR.')
-        # self.check_read_wavecar(self.ctx.bands)
-
-        # self.report(
-        #     'Checking that the wannier input calculation used WAVECAR.'
-        # )
-        # self.check_read_wavecar(self.ctx.to_wannier)
-
         self.report('Retrieving outputs.')
-        # self.out_many(self.exposed_outputs(self.ctx.bands, VaspReferenceBands))
-        # self.out_many(
-        #     self.exposed_outputs(self.ctx.to_wannier, VaspWannierInput)
-        # )
+        self.out_many(self.exposed_outputs(self.ctx.bands, QEReferenceBands))
+        self.out_many(
+            self.exposed_outputs(self.ctx.to_wannier, QEWannierInput)
+        )
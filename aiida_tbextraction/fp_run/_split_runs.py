@@ -11,9 +11,9 @@ from fsc.export import export
 
 from aiida.work.workchain import ToContext
 
-from aiida_tools import check_workchain_step
 from aiida_tools.workchain_inputs import WORKCHAIN_INPUT_KWARGS, load_object
 
+from .._helpers._instrumentation import instrumented_step
 from ._base import FirstPrinciplesRunBase
 from .reference_bands import ReferenceBandsBase
 from .wannier_input import WannierInputBase
@@ -38,7 +38,7 @@ class SplitFirstPrinciplesRun(FirstPrinciplesRunBase):
 
         spec.outline(cls.fp_run, cls.finalize)
 
-    @check_workchain_step
+    @instrumented_step
     def fp_run(self):
         """
         Run the first-principles calculation workflows.
@@ -67,7 +67,7 @@ class SplitFirstPrinciplesRun(FirstPrinciplesRunBase):
             reference_bands=reference_bands, wannier_input=wannier_input
         )
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         """
         Add the outputs of the first-principles workflows.
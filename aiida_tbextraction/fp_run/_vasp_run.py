@@ -17,18 +17,20 @@ from aiida.orm.data.parameter import ParameterData
 
 from aiida_vasp.calcs.vasp import VaspCalculation
 
-from aiida_tools import check_workchain_step
-
+from .._helpers._instrumentation import instrumented_step
 from .wannier_input import VaspWannierInput
 from .reference_bands import VaspReferenceBands
 from ._base import FirstPrinciplesRunBase
-from ._helpers._inline_calcs import merge_parameters_inline
+from ._helpers._inline_calcs import resolve_parameter_dicts, group_namespaces, resolve_parameters_inline
+from ._helpers._vasp_output import check_read_wavecar
+
+_SUB_CALCULATIONS = ['scf', 'bands', 'to_wannier']
 
 
 @export
 class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
     """
-    Workflow for calculating the inputs needed for tight-binding calculation and evaluation with VASP. The workflow first performs an SCF step, and then passes the WAVECAR file to the bandstructure and Wannier90 input calculations.
+    Workflow for calculating the inputs needed for tight-binding calculation and evaluation with VASP. The workflow first performs an SCF step, and then passes the WAVECAR file to the bandstructure and Wannier90 input calculations, either through the AiiDA repository or by copying it on the remote computer.
     """
 
     @classmethod
@@ -53,7 +55,7 @@ class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
 
         # Optional parameters to override for specific calculations.
         # TODO: Use expose for the sub-workflows.
-        for sub_calc in ['scf', 'bands', 'to_wannier']:
+        for sub_calc in _SUB_CALCULATIONS:
             spec.input_namespace(
                 sub_calc,
                 required=False,
@@ -70,31 +72,64 @@ class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
             'Determines whether the k-point mesh needs to be added for the bandstructure calculation. This is needed for hybrid functional calculations.'
         )
 
+        spec.input(
+            'keep_wavecar_remote',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the WAVECAR of the SCF calculation is not retrieved. Instead, the bandstructure and Wannier90 input calculations copy it from the remote folder of the SCF calculation on the computer where it was run. This requires all VASP calculations to run on the same computer.'  # pylint: disable=line-too-long
+        )
+
         spec.expose_outputs(VaspReferenceBands)
         spec.expose_outputs(VaspWannierInput)
 
-        spec.outline(cls.run_scf, cls.run_bands_and_wannier, cls.finalize)
+        spec.outline(
+            cls.resolve_parameters, cls.run_scf, cls.run_bands_and_wannier,
+            cls.finalize
+        )
 
-    def _collect_common_inputs(
-        self, namespace, expand_kwargs=False, force_parameters=None
-    ):
+    @instrumented_step
+    def resolve_parameters(self):
+        """
+        Resolve the parameters of the 'scf', 'bands' and 'to_wannier' calculations in a single step.
+        """
+        namespace_parameters = {
+            namespace: self.inputs[namespace]['parameters']
+            for namespace in _SUB_CALCULATIONS
+            if 'parameters' in self.inputs.get(namespace, {})
+        }
+        force_parameters = {'scf': {'lwave': True}}
+        resolved = resolve_parameter_dicts(
+            self.inputs.parameters.get_dict(),
+            namespace_parameters={
+                key: value.get_dict()
+                for key, value in namespace_parameters.items()
+            },
+            force_parameters=force_parameters
+        )
+        self.ctx.parameters = {
+            namespace: self.inputs.parameters
+            for namespace in _SUB_CALCULATIONS
+        }
+        if resolved:
+            self.report(
+                'Resolving parameters for {}.'.format(sorted(resolved.keys()))
+            )
+            resolved_nodes = resolve_parameters_inline(
+                parameters=self.inputs.parameters,
+                force_parameters=ParameterData(dict=force_parameters),
+                **namespace_parameters
+            )[1]
+            for namespace, representative in group_namespaces(resolved
+                                                              ).items():
+                self.ctx.parameters[namespace] = resolved_nodes[representative]
+
+    def _collect_common_inputs(self, namespace, expand_kwargs=False):
         """
         Join the top-level inputs and inputs set in a specific namespace.
         """
         ns_inputs = self.inputs.get(namespace, {})
-        ns_parameters = ns_inputs.get('parameters')
-        if ns_parameters is None:
-            parameters = self.inputs.parameters
-        else:
-            parameters = merge_parameters_inline(
-                param_main=ns_parameters,
-                param_fallback=self.inputs.parameters
-            )[1]['parameters']
-            if force_parameters:
-                parameters = merge_parameters_inline(
-                    param_main=ParameterData(dict=force_parameters),
-                    param_fallback=parameters
-                )[1]['parameters']
+        parameters = self.ctx.parameters[namespace]
         calculation_kwargs = copy.deepcopy(
             dict(
                 ChainMap(
@@ -114,27 +149,25 @@ class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
             res['calculation_kwargs'] = calculation_kwargs
         return res
 
-    @check_workchain_step
+    @instrumented_step
     def run_scf(self):
         """
         Run the SCF calculation step.
         """
         self.report('Launching SCF calculation.')
+        if self.inputs.keep_wavecar_remote:
+            retrieve_list = []
+        else:
+            retrieve_list = ['WAVECAR']
         return ToContext(
             scf=self.submit(
                 VaspCalculation.process(),
                 paw=self.inputs.potentials,
                 kpoints=self.inputs.kpoints_mesh,
                 settings=ParameterData(
-                    dict={
-                        'ADDITIONAL_RETRIEVE_LIST': ['WAVECAR']
-                    }
+                    dict={'ADDITIONAL_RETRIEVE_LIST': retrieve_list}
                 ),
-                **self._collect_common_inputs(
-                    'scf',
-                    force_parameters={'lwave': True},
-                    expand_kwargs=True
-                )
+                **self._collect_common_inputs('scf', expand_kwargs=True)
             )
         )
 
@@ -142,14 +175,19 @@ class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
         """
         Helper to collect the inputs for the reference bands and wannier input workflows.
         """
-        scf_wavefun = self.ctx.scf.out.wavefunctions
         res = self._collect_common_inputs(namespace)
         res['potentials'] = self.inputs.potentials
-        res['calculation_kwargs']['wavefunctions'] = scf_wavefun
+        if self.inputs.keep_wavecar_remote:
+            # the WAVECAR is copied on the remote computer
+            res['calculation_kwargs']['restart_folder'
+                                      ] = self.ctx.scf.out.remote_folder
+        else:
+            res['calculation_kwargs']['wavefunctions'
+                                      ] = self.ctx.scf.out.wavefunctions
         self.report(res['calculation_kwargs'])
         return res
 
-    @check_workchain_step
+    @instrumented_step
     def run_bands_and_wannier(self):
         """
         Run the reference bands and wannier input workflows.
@@ -174,7 +212,7 @@ class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
             )
         )
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         """
         Add outputs of the bandstructure and wannier input calculations.
@@ -197,10 +235,4 @@ class VaspFirstPrinciplesRun(FirstPrinciplesRunBase):
     def check_read_wavecar(sub_workflow):
         for label, node in sub_workflow.get_outputs(also_labels=True):
             if label == 'CALL' and isinstance(node, VaspCalculation):
-                retrieved_folder = node.get_retrieved_node()
-                with open(
-                    retrieved_folder.get_abs_path('_scheduler-stdout.txt')
-                ) as f:
-                    stdout = f.read()
-                    assert 'WAVECAR not read' not in stdout
-                    assert 'reading WAVECAR' in stdout
+                assert check_read_wavecar(node)
@@ -4,5 +4,6 @@ Contains workflows for calculating the reference bandstructure with first-princi
 
 from ._base import ReferenceBandsBase
 from ._vasp import VaspReferenceBands
+from ._qe import QEReferenceBands
 
-__all__ = _base.__all__ + _vasp.__all__  # pylint: disable=undefined-variable
+__all__ = _base.__all__ + _vasp.__all__ + _qe.__all__  # pylint: disable=undefined-variable
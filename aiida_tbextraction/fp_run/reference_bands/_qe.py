@@ -0,0 +1,82 @@
+"""
+Defines a workflow that calculates the reference bandstructure using Quantum ESPRESSO.
+"""
+
+from fsc.export import export
+
+from aiida.orm import Code, DataFactory, CalculationFactory
+from aiida.work.workchain import ToContext
+
+from ..._helpers._instrumentation import instrumented_step
+from . import ReferenceBandsBase
+from .._helpers._inline_calcs import merge_nested_parameters_inline
+
+
+@export
+class QEReferenceBands(ReferenceBandsBase):
+    """
+    The WorkChain to calculate reference bands with Quantum ESPRESSO. The bands calculation is started from the remote folder of a previous SCF calculation.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super(QEReferenceBands, cls).define(spec)
+        ParameterData = DataFactory('parameter')
+        spec.input('code', valid_type=Code, help='Code that runs pw.x.')
+        spec.input(
+            'parameters',
+            valid_type=ParameterData,
+            help=
+            "Parameters of the pw.x calculation. The 'calculation' parameter is set to 'bands'."
+        )
+        spec.input(
+            'parent_folder',
+            valid_type=DataFactory('remote'),
+            help=
+            'Remote folder of the SCF calculation, from which the charge density is read.'
+        )
+        spec.input_namespace(
+            'calculation_kwargs',
+            required=False,
+            dynamic=True,
+            help='Additional keyword arguments passed to the pw.x calculation.'
+        )
+
+        spec.outline(cls.run_calc, cls.get_bands)
+
+    @instrumented_step
+    def run_calc(self):
+        """
+        Run the pw.x bands calculation.
+        """
+        parameters = merge_nested_parameters_inline(
+            param_main=DataFactory('parameter')(
+                dict={
+                    'CONTROL': {
+                        'calculation': 'bands'
+                    }
+                }
+            ),
+            param_fallback=self.inputs.parameters
+        )[1]['parameters']
+
+        self.report("Submitting pw.x bands calculation.")
+        return ToContext(
+            pw_calc=self.submit(
+                CalculationFactory('quantumespresso.pw').process(),
+                structure=self.inputs.structure,
+                pseudo=self.inputs.potentials,
+                kpoints=self.inputs.kpoints,
+                parameters=parameters,
+                parent_folder=self.inputs.parent_folder,
+                code=self.inputs.code,
+                **self.inputs.get('calculation_kwargs', {})
+            )
+        )
+
+    @instrumented_step
+    def get_bands(self):
+        """
+        Get the bands from the pw.x calculation.
+        """
+        self.out('bands', self.ctx.pw_calc.out.output_band)
@@ -8,8 +8,7 @@ from aiida.orm.data.base import Bool
 from aiida.orm import Code, DataFactory, CalculationFactory
 from aiida.work.workchain import ToContext
 
-from aiida_tools import check_workchain_step
-
+from ..._helpers._instrumentation import instrumented_step
 from . import ReferenceBandsBase
 from .._helpers._inline_calcs import flatten_bands_inline, crop_bands_inline, merge_kpoints_inline
 
@@ -46,7 +45,7 @@ class VaspReferenceBands(ReferenceBandsBase):
 
         spec.outline(cls.run_calc, cls.get_bands)
 
-    @check_workchain_step
+    @instrumented_step
     def run_calc(self):
         """
         Run the VASP calculation.
@@ -74,7 +73,7 @@ class VaspReferenceBands(ReferenceBandsBase):
             )
         )
 
-    @check_workchain_step
+    @instrumented_step
     def get_bands(self):
         """
         Get the bands from the VASP calculation and crop the 'mesh' k-points if necessary.
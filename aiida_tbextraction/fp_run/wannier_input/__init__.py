@@ -4,5 +4,6 @@ Contains workflows for calculating the Wannier90 input files with first-principl
 
 from ._base import WannierInputBase
 from ._vasp import VaspWannierInput
+from ._qe import QEWannierInput
 
-__all__ = _base.__all__ + _vasp.__all__  # pylint: disable=undefined-variable
+__all__ = _base.__all__ + _vasp.__all__ + _qe.__all__  # pylint: disable=undefined-variable
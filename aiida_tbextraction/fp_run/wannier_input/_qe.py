@@ -0,0 +1,216 @@
+"""
+Defines a workflow that calculates the Wannier90 input files using Quantum ESPRESSO.
+"""
+
+from fsc.export import export
+
+from aiida.orm import Code, DataFactory, CalculationFactory
+from aiida.orm.data.base import List
+from aiida.orm.data.array.bands import BandsData
+from aiida.work.workchain import ToContext
+
+from ..._helpers._instrumentation import instrumented_step
+from ..._helpers._wannier_io import read_eig
+from . import WannierInputBase
+from .._helpers._inline_calcs import merge_nested_parameters_inline, explicit_kpoints_inline
+
+_SEEDNAME = 'aiida'
+
+
+@export
+class QEWannierInput(WannierInputBase):
+    """
+    Calculates the Wannier90 input files using Quantum ESPRESSO. A non-selfconsistent pw.x calculation is started from the remote folder of a previous SCF calculation, and pw2wannier90.x runs in the remote folder of the NSCF calculation. The ``.nnkp`` file needed by pw2wannier90.x is created by a Wannier90 calculation in post-processing setup mode, which runs concurrently to the NSCF calculation.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super(QEWannierInput, cls).define(spec)
+
+        ParameterData = DataFactory('parameter')
+        spec.input('code', valid_type=Code, help='Code that runs pw.x.')
+        spec.input(
+            'parameters',
+            valid_type=ParameterData,
+            help=
+            "Parameters for the NSCF pw.x calculation. The 'calculation' parameter is set to 'nscf', and symmetries are turned off."
+        )
+        spec.input(
+            'parent_folder',
+            valid_type=DataFactory('remote'),
+            help=
+            'Remote folder of the SCF calculation, from which the charge density is read.'
+        )
+        spec.input_namespace(
+            'calculation_kwargs',
+            required=False,
+            dynamic=True,
+            help='Keyword arguments passed to the pw.x calculation.'
+        )
+        spec.input(
+            'wannier_code',
+            valid_type=Code,
+            help='Code that runs Wannier90, used to create the ``.nnkp`` file.'
+        )
+        spec.input_namespace(
+            'wannier_calculation_kwargs',
+            required=False,
+            dynamic=True,
+            help=
+            "Keyword arguments passed to the Wannier90 calculation. Defaults to 'calculation_kwargs'."
+        )
+        spec.input(
+            'pw2wannier_code',
+            valid_type=Code,
+            help='Code that runs pw2wannier90.x.'
+        )
+        spec.input_namespace(
+            'pw2wannier_calculation_kwargs',
+            required=False,
+            dynamic=True,
+            help=
+            "Keyword arguments passed to the pw2wannier90.x calculation. Defaults to 'calculation_kwargs'."
+        )
+
+        spec.outline(
+            cls.run_nscf_and_setup, cls.run_pw2wannier, cls.get_result
+        )
+
+    def _get_calculation_kwargs(self, name):
+        return self.inputs.get(name, self.inputs.get('calculation_kwargs', {}))
+
+    @instrumented_step
+    def run_nscf_and_setup(self):
+        """
+        Run the NSCF pw.x calculation and the Wannier90 post-processing setup.
+        """
+        ParameterData = DataFactory('parameter')
+        if 'wannier_parameters' not in self.inputs:
+            raise ValueError(
+                "The 'wannier_parameters' input is required for QEWannierInput."
+            )
+        self.ctx.kpoints = explicit_kpoints_inline(
+            kpoints_mesh=self.inputs.kpoints_mesh
+        )[1]['kpoints']
+
+        self.ctx.wannier_parameters = merge_nested_parameters_inline(
+            param_main=ParameterData(
+                dict={
+                    'mp_grid': self.inputs.kpoints_mesh.get_kpoints_mesh()[0]
+                }
+            ),
+            param_fallback=self.inputs.wannier_parameters
+        )[1]['parameters']
+
+        system_parameters = {'nosym': True, 'noinv': True}
+        num_bands = self.inputs.wannier_parameters.get_dict().get('num_bands')
+        if num_bands is not None:
+            system_parameters['nbnd'] = num_bands
+        nscf_parameters = merge_nested_parameters_inline(
+            param_main=ParameterData(
+                dict={
+                    'CONTROL': {
+                        'calculation': 'nscf'
+                    },
+                    'SYSTEM': system_parameters
+                }
+            ),
+            param_fallback=self.inputs.parameters
+        )[1]['parameters']
+
+        wannier_inputs = dict(
+            code=self.inputs.wannier_code,
+            structure=self.inputs.structure,
+            kpoints=self.ctx.kpoints,
+            parameters=self.ctx.wannier_parameters,
+            settings=ParameterData(dict={'postproc_setup': True}),
+            **self._get_calculation_kwargs('wannier_calculation_kwargs')
+        )
+        if 'wannier_projections' in self.inputs:
+            wannier_inputs['projections'] = self.inputs.wannier_projections
+
+        self.report("Submitting NSCF and Wannier90 setup calculations.")
+        return ToContext(
+            nscf_calc=self.submit(
+                CalculationFactory('quantumespresso.pw').process(),
+                structure=self.inputs.structure,
+                pseudo=self.inputs.potentials,
+                kpoints=self.ctx.kpoints,
+                parameters=nscf_parameters,
+                parent_folder=self.inputs.parent_folder,
+                code=self.inputs.code,
+                **self.inputs.get('calculation_kwargs', {})
+            ),
+            wannier_setup_calc=self.submit(
+                CalculationFactory('wannier90.wannier90').process(),
+                **wannier_inputs
+            )
+        )
+
+    @instrumented_step
+    def run_pw2wannier(self):
+        """
+        Run pw2wannier90.x in the remote folder of the NSCF calculation.
+        """
+        ParameterData = DataFactory('parameter')
+        self.report("Submitting pw2wannier90 calculation.")
+        return ToContext(
+            pw2wannier_calc=self.submit(
+                CalculationFactory('quantumespresso.pw2wannier90').process(),
+                code=self.inputs.pw2wannier_code,
+                parent_folder=self.ctx.nscf_calc.out.remote_folder,
+                nnkp_file=self.ctx.wannier_setup_calc.out.nnkp_file,
+                parameters=ParameterData(
+                    dict={
+                        'INPUTPP': {
+                            'write_amn': True,
+                            'write_mmn': True,
+                            'write_unk': False
+                        }
+                    }
+                ),
+                settings=ParameterData(
+                    dict={
+                        'ADDITIONAL_RETRIEVE_LIST':
+                        [_SEEDNAME + ext for ext in ['.amn', '.mmn', '.eig']]
+                    }
+                ),
+                **
+                self._get_calculation_kwargs('pw2wannier_calculation_kwargs')
+            )
+        )
+
+    @instrumented_step
+    def get_result(self):
+        """
+        Get the pw2wannier90 result and create the necessary outputs.
+        """
+        self.out(
+            'wannier_settings',
+            DataFactory('parameter')(dict={
+                'seedname': _SEEDNAME
+            })
+        )
+        retrieved_folder = self.ctx.pw2wannier_calc.out.retrieved
+        folder_list = retrieved_folder.get_folder_list()
+        assert all(
+            _SEEDNAME + ext in folder_list for ext in ['.amn', '.mmn', '.eig']
+        )
+        self.report("Adding Wannier90 inputs to output.")
+        self.out('wannier_input_folder', retrieved_folder)
+        self.out('wannier_parameters', self.ctx.wannier_parameters)
+        self.out('wannier_bands', self.parse_wannier_bands(retrieved_folder))
+        projections = self.inputs.get('wannier_projections', None)
+        if isinstance(projections, List):
+            self.out('wannier_projections', projections)
+
+    def parse_wannier_bands(self, retrieved_folder):
+        """
+        Create the Wannier90 bands from the k-points of the NSCF calculation and the .eig file.
+        """
+        bands = BandsData()
+        bands.set_kpoints(self.ctx.kpoints.get_kpoints())
+        bands.set_bands(
+            read_eig(retrieved_folder.get_abs_path(_SEEDNAME + '.eig'))
+        )
+        return bands
@@ -3,16 +3,16 @@ Defines a workflow that calculates the Wannier90 input files using VASP.
 """
 
 from fsc.export import export
-import numpy as np
 
 from aiida.orm import Code, DataFactory, CalculationFactory
 from aiida.orm.data.array.bands import BandsData
 from aiida.work.workchain import ToContext
 
-from aiida_tools import check_workchain_step
 from aiida_vasp.io.win import WinParser
 
+from ..._helpers._instrumentation import instrumented_step
 from . import WannierInputBase
+from ..._helpers._wannier_io import read_eig, parse_kpoint_lines
 
 
 @export
@@ -41,7 +41,7 @@ class VaspWannierInput(WannierInputBase):
 
         spec.outline(cls.submit_calculation, cls.get_result)
 
-    @check_workchain_step
+    @instrumented_step
     def submit_calculation(self):
         """
         Run the Vasp2w90 calculation.
@@ -62,7 +62,7 @@ class VaspWannierInput(WannierInputBase):
             )
         )
 
-    @check_workchain_step
+    @instrumented_step
     def get_result(self):
         """
         Get the VASP result and create the necessary outputs.
@@ -106,10 +106,7 @@ class VaspWannierInput(WannierInputBase):
         """
         Parse the k-points used by Wannier90 from the .win file.
         """
-        kpoints = []
-        for line in WinParser(win_file).result['kpoints']:
-            kpoints.append([float(x) for x in line.split()])
-        return np.array(kpoints)
+        return parse_kpoint_lines(WinParser(win_file).result['kpoints'])
 
     # TODO: Replace with tools from aiida-wannier90, or integrate in vasp2w90
     @staticmethod
@@ -117,18 +114,4 @@ class VaspWannierInput(WannierInputBase):
         """
         Parse the eigenvalues used by Wannier90 from the .eig file.
         """
-        idx = 1
-        bands = []
-        bands_part = []
-        with open(eig_file, 'r') as in_file:
-            for line in in_file:
-                _, idx_new, val = line.split()
-                idx_new = int(idx_new)
-                val = float(val)
-                if idx_new > idx:
-                    idx = idx_new
-                    bands.append(bands_part)
-                    bands_part = []
-                bands_part.append(val)
-            bands.append(bands_part)
-            return np.array(bands)
+        return read_eig(eig_file)
@@ -4,5 +4,6 @@ Contains workflows for evaluating a tight-binding model.
 
 from ._base import ModelEvaluationBase
 from ._band_difference import BandDifferenceModelEvaluation
+from ._weighted_difference import WeightedBandDifferenceModelEvaluation
 
-__all__ = _base.__all__ + _band_difference.__all__  # pylint: disable=undefined-variable
+__all__ = _base.__all__ + _band_difference.__all__ + _weighted_difference.__all__  # pylint: disable=undefined-variable
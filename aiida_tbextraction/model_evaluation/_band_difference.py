@@ -6,10 +6,10 @@ from fsc.export import export
 
 from aiida.orm import DataFactory, CalculationFactory
 from aiida.orm.code import Code
-from aiida.orm.data.base import Float
+from aiida.orm.data.base import Float, Bool
 from aiida.work.workchain import ToContext
 
-from aiida_tools import check_workchain_step
+from .._helpers._instrumentation import instrumented_step
 
 from . import ModelEvaluationBase
 
@@ -28,9 +28,17 @@ class BandDifferenceModelEvaluation(ModelEvaluationBase):
             valid_type=Code,
             help='Code that runs the bands_inspect CLI.'
         )
+        spec.input(
+            'plot',
+            valid_type=Bool,
+            default=Bool(True),
+            help=
+            'If False, only the cost value is calculated, and no plot is created.'
+        )
         spec.output(
             'plot',
             valid_type=DataFactory('singlefile'),
+            required=False,
             help='Plot comparing the reference and evaluated bandstructure.'
         )
 
@@ -48,7 +56,7 @@ class BandDifferenceModelEvaluation(ModelEvaluationBase):
         builder.options = dict(resources={'num_machines': 1}, withmpi=False)
         return builder
 
-    @check_workchain_step
+    @instrumented_step
     def calculate_bands(self):
         """
         Calculate the bandstructure of the given tight-binding model.
@@ -59,34 +67,36 @@ class BandDifferenceModelEvaluation(ModelEvaluationBase):
         self.report("Running TBmodels eigenvals calculation.")
         return ToContext(calculated_bands=self.submit(builder))
 
-    @check_workchain_step
+    @instrumented_step
     def calculate_difference_and_plot(self):
         """
-        Calculate the difference between the tight-binding and reference bandstructures, and plot them.
+        Calculate the difference between the tight-binding and reference bandstructures, and plot them if requested.
         """
         diff_builder = self.setup_calc(
             'bands_inspect.difference', 'bands_inspect_code'
         )
-        plot_builder = self.setup_calc(
-            'bands_inspect.plot', 'bands_inspect_code'
-        )
-        # Inputs for the plot and difference calculations are the same
         diff_builder.bands1 = self.inputs.reference_bands
         diff_builder.bands2 = self.ctx.calculated_bands.out.bands
-        plot_builder.bands1 = self.inputs.reference_bands
-        plot_builder.bands2 = self.ctx.calculated_bands.out.bands
+        calcs = dict(difference=self.submit(diff_builder))
 
-        self.report('Running difference and plot calculations.')
-        self.report('Running plot calculation.')
-        return ToContext(
-            difference=self.submit(diff_builder),
-            plot=self.submit(plot_builder)
-        )
+        if self.inputs.plot:
+            plot_builder = self.setup_calc(
+                'bands_inspect.plot', 'bands_inspect_code'
+            )
+            # Inputs for the plot and difference calculations are the same
+            plot_builder.bands1 = self.inputs.reference_bands
+            plot_builder.bands2 = self.ctx.calculated_bands.out.bands
+            self.report('Running difference and plot calculations.')
+            calcs['plot'] = self.submit(plot_builder)
+        else:
+            self.report('Running difference calculation.')
+        return ToContext(**calcs)
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         """
         Return outputs of the difference and plot calculations.
         """
         self.out('cost_value', Float(self.ctx.difference.out.difference))
-        self.out('plot', self.ctx.plot.out.plot)
+        if self.inputs.plot:
+            self.out('plot', self.ctx.plot.out.plot)
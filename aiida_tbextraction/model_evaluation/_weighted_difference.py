@@ -0,0 +1,152 @@
+"""
+Defines a workflow which evaluates a tight-binding model by calculating the weighted difference of its bandstructure to a reference bandstructure.
+"""
+
+import numpy as np
+from fsc.export import export
+
+from aiida.orm import CalculationFactory
+from aiida.orm.data.base import Float, List
+from aiida.orm.calculation.inline import make_inline
+from aiida.work.workchain import ToContext
+
+from .._helpers._instrumentation import instrumented_step
+from .._helpers._mapped_array import iter_mapped_bands_chunks, KPOINT_CHUNK_SIZE
+from .._helpers._band_difference import calculate_chunked_difference
+
+from . import ModelEvaluationBase
+
+
+@export
+class WeightedBandDifferenceModelEvaluation(ModelEvaluationBase):
+    """
+    Evaluates a tight-binding model by calculating the weighted average difference between its bandstructure and the reference bandstructure. The difference is calculated in-process, such that only the bandstructure calculation is submitted.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super(WeightedBandDifferenceModelEvaluation, cls).define(spec)
+        spec.input(
+            'band_weights',
+            valid_type=List,
+            required=False,
+            help=
+            'Weight for each band. If the list is shorter than the number of bands, the remaining bands have zero weight.'
+        )
+        spec.input(
+            'reference_energy',
+            valid_type=Float,
+            required=False,
+            help=
+            'Energy (e.g. the Fermi level) around which the difference is emphasized. Each eigenvalue is weighted with a Gaussian of width ``energy_width`` centered at this energy.'  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'energy_width',
+            valid_type=Float,
+            default=Float(1.),
+            help='Width of the Gaussian energy weight.'
+        )
+
+        spec.outline(cls.calculate_bands, cls.calculate_difference)
+
+    @instrumented_step
+    def calculate_bands(self):
+        """
+        Calculate the bandstructure of the given tight-binding model.
+        """
+        builder = CalculationFactory('tbmodels.eigenvals').get_builder()
+        builder.code = self.inputs.tbmodels_code
+        builder.options = dict(resources={'num_machines': 1}, withmpi=False)
+        builder.tb_model = self.inputs.tb_model
+        builder.kpoints = self.inputs.reference_bands
+        self.report("Running TBmodels eigenvals calculation.")
+        return ToContext(calculated_bands=self.submit(builder))
+
+    @instrumented_step
+    def calculate_difference(self):
+        """
+        Calculate the weighted difference between the tight-binding and reference bandstructures.
+        """
+        self.report('Calculating weighted band difference.')
+        inline_inputs = dict(
+            reference_bands=self.inputs.reference_bands,
+            calculated_bands=self.ctx.calculated_bands.out.bands,
+            band_weights=self.inputs.get('band_weights', None),
+            reference_energy=self.inputs.get('reference_energy', None),
+            energy_width=self.inputs.energy_width
+        )
+        self.out(
+            'cost_value',
+            weighted_difference_inline(
+                **{k: v
+                   for k, v in inline_inputs.items() if v is not None}
+            )[1]['cost_value']
+        )
+
+
+def calculate_weighted_difference(
+    reference_eigenvals,
+    calculated_eigenvals,
+    band_weights=None,
+    reference_energy=None,
+    energy_width=1.
+):
+    """
+    Calculate the weighted average absolute difference between two sets of eigenvalues. Only the bands which are present in both sets are compared. The difference is accumulated in blocks of k-points, such that memory-mapped eigenvalues are not loaded into memory at once.
+
+    :param reference_eigenvals: Reference eigenvalues, of shape ``(num_kpts, num_bands)``.
+    :type reference_eigenvals: array
+
+    :param calculated_eigenvals: Eigenvalues which are compared to the reference, of shape ``(num_kpts, num_bands)``.
+    :type calculated_eigenvals: array
+
+    :param band_weights: Weight for each band.
+    :type band_weights: list
+
+    :param reference_energy: Center of the Gaussian energy weight. If ``None``, no energy weight is applied.
+    :type reference_energy: float
+
+    :param energy_width: Width of the Gaussian energy weight.
+    :type energy_width: float
+    """
+    reference_eigenvals = np.asarray(reference_eigenvals)
+    calculated_eigenvals = np.asarray(calculated_eigenvals)
+    chunk_pairs = [(
+        reference_eigenvals[..., start:start + KPOINT_CHUNK_SIZE, :],
+        calculated_eigenvals[..., start:start + KPOINT_CHUNK_SIZE, :]
+    ) for start in range(0, reference_eigenvals.shape[-2], KPOINT_CHUNK_SIZE)]
+    return calculate_chunked_difference(
+        chunk_pairs,
+        band_weights=band_weights,
+        reference_energy=reference_energy,
+        energy_width=energy_width
+    )
+
+
+@make_inline
+def weighted_difference_inline(
+    reference_bands,
+    calculated_bands,
+    energy_width,
+    band_weights=None,
+    reference_energy=None
+):
+    """
+    Calculates the weighted difference between the calculated and reference bands.
+    """
+    return {
+        'cost_value':
+        Float(
+            calculate_chunked_difference(
+                zip(
+                    iter_mapped_bands_chunks(reference_bands),
+                    iter_mapped_bands_chunks(calculated_bands)
+                ),
+                band_weights=None
+                if band_weights is None else band_weights.get_attr('list'),
+                reference_energy=None
+                if reference_energy is None else reference_energy.value,
+                energy_width=energy_width.value
+            )
+        )
+    }
@@ -9,17 +9,25 @@ except ImportError:
 
 from fsc.export import export
 
-from aiida.orm.data.base import List
+from aiida.orm import load_node
+from aiida.orm.data.base import List, Bool
 from aiida.orm.data.parameter import ParameterData
 from aiida.orm.calculation.inline import make_inline
-from aiida.work.workchain import WorkChain, ToContext
+from aiida.work.workchain import WorkChain, ToContext, if_
 from aiida.common.links import LinkType
 
-from aiida_tools import check_workchain_step
 from aiida_tools.workchain_inputs import WORKCHAIN_INPUT_KWARGS, load_object
 
-from .energy_windows.windowsearch import WindowSearch
+from ._helpers._instrumentation import instrumented_step
+from ._helpers._band_index import get_band_index
+from ._helpers._caching import deduplicate_inline
+from .data import BandsViewData
+from .calculate_tb import TightBindingCalculation, TIGHT_BINDING_CACHE, get_tight_binding_cache_key
+from .energy_windows.runwindow import add_window_parameters_inline
+from .energy_windows.windowsearch import WindowSearch, create_window_simplex
 from .fp_run import FirstPrinciplesRunBase
+from .fp_run.reference_bands import ReferenceBandsBase
+from .fp_run.wannier_input import WannierInputBase
 
 
 @export
@@ -72,11 +80,32 @@ class OptimizeFirstPrinciplesTightBinding(WorkChain):
             help='Indices for slicing (re-ordering) the tight-binding model.'
         )
 
+        spec.input(
+            'pipeline',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the reference bands and Wannier input workflows are run separately, and the tight-binding models for the (valid) initial windows are calculated as soon as the Wannier input is available, while the reference bands are still running. The window search then re-uses these models. This requires the ``fp_run`` inputs of a ``SplitFirstPrinciplesRun``, i.e. ``reference_bands_workflow`` and ``wannier_input_workflow``, and cannot be combined with ``restart_from_closest``.'  # pylint: disable=line-too-long
+        )
+
         spec.expose_outputs(WindowSearch)
 
-        spec.outline(cls.fp_run, cls.run_windowsearch, cls.finalize)
+        spec.outline(
+            if_(cls.has_pipeline)(cls.run_fp_branches,
+                                  cls.prerun_tb_models).else_(cls.fp_run),
+            cls.run_windowsearch, cls.finalize
+        )
+
+    def has_pipeline(self):
+        return self.inputs.pipeline.value
+
+    def _get_fp_run_inputs(self):
+        return ChainMap(
+            self.inputs.fp_run,
+            self.exposed_inputs(FirstPrinciplesRunBase, namespace='fp_run'),
+        )
 
-    @check_workchain_step
+    @instrumented_step
     def fp_run(self):
         """
         Runs the first-principles calculation workflow.
@@ -85,68 +114,205 @@ class OptimizeFirstPrinciplesTightBinding(WorkChain):
         return ToContext(
             fp_run=self.submit(
                 load_object(self.inputs.fp_run_workflow),
-                **ChainMap(
-                    self.inputs.fp_run,
-                    self.
-                    exposed_inputs(FirstPrinciplesRunBase, namespace='fp_run'),
-                )
+                **self._get_fp_run_inputs()
             )
         )
 
-    @check_workchain_step
-    def run_windowsearch(self):
+    @instrumented_step
+    def run_fp_branches(self):
         """
-        Runs the workflow which creates the optimized tight-binding model.
+        Runs the reference bands and Wannier input workflows separately, and waits only for the Wannier input.
         """
-        # check for wannier_settings from wannier_input workflow
-        inputs = self.exposed_inputs(WindowSearch)
-        self.report(
-            "Merging 'wannier_settings' from input and wannier_input workflow."
+        fp_run_inputs = self._get_fp_run_inputs()
+        for key in ['reference_bands_workflow', 'wannier_input_workflow']:
+            if key not in fp_run_inputs:
+                raise ValueError(
+                    "The 'pipeline' mode requires the '{}' input in the 'fp_run' namespace.".
+                    format(key)
+                )
+        if self.exposed_inputs(WindowSearch)['restart_from_closest']:
+            raise ValueError(
+                "The 'pipeline' mode cannot be used with 'restart_from_closest', since the restart inputs of the tight-binding calculations are not known before the window search."  # pylint: disable=line-too-long
+            )
+
+        def get_branch_inputs(namespace, base_class):
+            common_inputs = {
+                key: value
+                for key, value in fp_run_inputs.items()
+                if key in base_class.spec().inputs
+            }
+            return ChainMap(fp_run_inputs.get(namespace, {}), common_inputs)
+
+        self.report('Submitting reference_bands workflow.')
+        self.ctx.reference_bands_pk = self.submit(
+            load_object(fp_run_inputs['reference_bands_workflow']),
+            **get_branch_inputs('reference_bands', ReferenceBandsBase)
+        ).pk
+        self.report('Submitting wannier_input workflow.')
+        return ToContext(
+            wannier_input=self.submit(
+                load_object(fp_run_inputs['wannier_input_workflow']),
+                **get_branch_inputs('wannier_input', WannierInputBase)
+            )
         )
-        wannier_settings_explicit = inputs.pop(
-            'wannier_settings', ParameterData()
+
+    @instrumented_step
+    def prerun_tb_models(self):
+        """
+        Calculates the tight-binding models for the valid initial windows, and waits for them and the reference bands workflow.
+        """
+        fp_outputs = self._get_fp_outputs()
+        windowsearch_inputs = self.exposed_inputs(WindowSearch)
+        if 'initial_simplex' in windowsearch_inputs:
+            windows = windowsearch_inputs['initial_simplex'].get_attr('list')
+        else:
+            windows = create_window_simplex(
+                windowsearch_inputs['initial_window'].get_attr('list'),
+                simplex_dist=windowsearch_inputs['simplex_dist'].value,
+                wannier_bands=fp_outputs['wannier_bands'],
+                num_wann=int(
+                    fp_outputs['wannier_parameters'].get_attr('num_wann')
+                ),
+                report=self.report
+            )
+        invalid_reasons = get_band_index(
+            fp_outputs['wannier_bands']
+        ).check_windows(
+            windows,
+            num_wann=int(
+                fp_outputs['wannier_parameters'].get_attr('num_wann')
+            )
         )
-        wannier_settings_from_wf = self.ctx.fp_run.get_outputs_dict().get(
-            'wannier_settings', ParameterData()
+
+        tb_inputs = {
+            key: value
+            for key, value in windowsearch_inputs.items()
+            if key in TightBindingCalculation.spec().inputs
+        }
+        tb_inputs.update(self._get_wannier_inputs())
+        tb_inputs['wannier_kpoints'] = fp_outputs['wannier_bands']
+
+        if windowsearch_inputs['evaluate_inline']:
+            self.report(
+                'Tight-binding models are not re-used with in-process evaluation, skipping pre-calculation.'
+            )
+            windows = []
+
+        prerun_calcs = {}
+        for i, (window, reason) in enumerate(zip(windows, invalid_reasons)):
+            if reason is not None:
+                self.report(
+                    'Skipping invalid window {}: {}'.format(window, reason)
+                )
+                continue
+            inputs = dict(tb_inputs)
+            inputs.update(
+                add_window_parameters_inline(
+                    wannier_parameters=inputs.pop('wannier_parameters'),
+                    window=List(list=window)
+                )[1]
+            )
+            calc = self.submit(TightBindingCalculation, **inputs)
+            TIGHT_BINDING_CACHE.set_key(
+                calc, get_tight_binding_cache_key(inputs)
+            )
+            prerun_calcs['prerun_tb_{}'.format(i)] = calc
+        self.report(
+            'Calculating {} tight-binding models while waiting for the reference bands.'.
+            format(len(prerun_calcs))
         )
-        wannier_settings = merge_parameterdata_inline(
-            param_primary=wannier_settings_explicit,
-            param_secondary=wannier_settings_from_wf
-        )[1]
-
-        # prefer wannier_projections from wannier_input workflow if it exists
-        wannier_projections = self.ctx.fp_run.get_outputs_dict().get(
-            'wannier_projections', inputs.pop('wannier_projections', None)
+        return ToContext(
+            reference_bands=load_node(self.ctx.reference_bands_pk),
+            **prerun_calcs
         )
 
+    def _get_fp_outputs(self):
+        """
+        Get the outputs of the first-principles workflow, or of the separate reference bands and Wannier input workflows.
+        """
+        if self.inputs.pipeline:
+            outputs = {}
+            for key in ['reference_bands', 'wannier_input']:
+                if key in self.ctx:
+                    outputs.update(
+                        self.ctx[key].get_outputs_dict(
+                            link_type=LinkType.RETURN
+                        )
+                    )
+            return outputs
+        return self.ctx.fp_run.get_outputs_dict()
+
+    def _get_wannier_inputs(self):
+        """
+        Get the Wannier90 inputs for the window search, combining the explicit inputs with the outputs of the Wannier input workflow. The result is created only once.
+        """
+        if 'wannier_inputs' not in self.ctx:
+            fp_outputs = self._get_fp_outputs()
+            # check for wannier_settings from wannier_input workflow
+            self.report(
+                "Merging 'wannier_settings' from input and wannier_input workflow."
+            )
+            wannier_settings = merge_parameterdata_inline(
+                param_primary=self.inputs.get(
+                    'wannier_settings', ParameterData()
+                ),
+                param_secondary=fp_outputs.get(
+                    'wannier_settings', ParameterData()
+                )
+            )[1]['parameters']
+
+            # prefer wannier_projections from wannier_input workflow if it exists
+            wannier_projections = fp_outputs.get(
+                'wannier_projections',
+                self.inputs.get('wannier_projections', None)
+            )
+
+            self.ctx.wannier_inputs = dict(
+                wannier_parameters=fp_outputs['wannier_parameters'],
+                wannier_input_folder=fp_outputs['wannier_input_folder'],
+                wannier_settings=wannier_settings,
+            )
+            if wannier_projections is not None:
+                self.ctx.wannier_inputs['wannier_projections'
+                                        ] = wannier_projections
+            slice_idx = self.inputs.get('slice_tb_model', None)
+            if slice_idx is not None:
+                self.ctx.wannier_inputs['slice_idx'] = slice_idx
+        return dict(self.ctx.wannier_inputs)
+
+    @instrumented_step
+    def run_windowsearch(self):
+        """
+        Runs the workflow which creates the optimized tight-binding model.
+        """
+        inputs = self.exposed_inputs(WindowSearch)
+        inputs.pop('wannier_settings', None)
+        inputs.pop('wannier_projections', None)
+        inputs.update(self._get_wannier_inputs())
+        fp_outputs = self._get_fp_outputs()
+
         # slice reference bands if necessary
-        reference_bands = self.ctx.fp_run.out.bands
+        reference_bands = fp_outputs['bands']
         slice_reference_bands = self.inputs.get('slice_reference_bands', None)
         if slice_reference_bands is not None:
             reference_bands = slice_bands_inline(
                 bands=reference_bands, slice_idx=slice_reference_bands
-            )[1]
+            )[1]['bands']
 
-        # get slice_idx for windowsearch
-        slice_idx = self.inputs.get('slice_tb_model', None)
-        if slice_idx is not None:
-            inputs['slice_idx'] = slice_idx
+        if self.inputs.pipeline:
+            inputs['reuse_tb_models'] = Bool(True)
 
         self.report("Starting WindowSearch workflow.")
         return ToContext(
             windowsearch=self.submit(
                 WindowSearch,
                 reference_bands=reference_bands,
-                wannier_bands=self.ctx.fp_run.out.wannier_bands,
-                wannier_parameters=self.ctx.fp_run.out.wannier_parameters,
-                wannier_input_folder=self.ctx.fp_run.out.wannier_input_folder,
-                wannier_settings=wannier_settings,
-                wannier_projections=wannier_projections,
+                wannier_bands=fp_outputs['wannier_bands'],
                 **inputs
             )
         )
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         self.report("Adding outputs from WindowSearch workflow.")
         windowsearch = self.ctx.windowsearch
@@ -156,15 +322,22 @@ class OptimizeFirstPrinciplesTightBinding(WorkChain):
             self.out(label, node)
 
 
+@deduplicate_inline
 @make_inline
 def merge_parameterdata_inline(param_primary, param_secondary):
-    return ParameterData(
-        dict=ChainMap(param_primary.get_dict(), param_secondary.get_dict())
-    )
+    return {
+        'parameters':
+        ParameterData(
+            dict=ChainMap(
+                param_primary.get_dict(), param_secondary.get_dict()
+            )
+        )
+    }
 
 
+@deduplicate_inline
 @make_inline
 def slice_bands_inline(bands, slice_idx):
-    result = bands.copy()
-    result.set_bands(result.get_bands()[:, slice_idx.get_attr('list')])
-    return result
+    result = BandsViewData.from_parent(bands)
+    result.slice_bands(slice_idx.get_attr('list'))
+    return {'bands': result}
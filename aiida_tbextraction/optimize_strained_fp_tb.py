@@ -4,15 +4,21 @@ Defines the workflow to optimize tight-binding models from DFT inputs with diffe
 
 from fsc.export import export
 
-from aiida.work.workchain import WorkChain, ToContext
+from aiida.orm.data.base import Bool, Float, Int, Str
+from aiida.work.workchain import WorkChain, ToContext, while_
 from aiida.common.links import LinkType
 
-from aiida_tools import check_workchain_step
 from aiida_strain.work import ApplyStrainsWithSymmetry
 from aiida_strain.work.util import get_symmetries_key, get_structure_key, get_suffix
 
+from ._helpers._instrumentation import instrumented_step
+from ._helpers._caching import ProcessCache, get_inputs_cache_key
 from .optimize_fp_tb import OptimizeFirstPrinciplesTightBinding
 
+_OPTIMIZATION_CACHE = ProcessCache(
+    extra_key='tbextraction_optimization_cache_key'
+)
+
 
 @export
 class OptimizeStrainedFirstPrinciplesTightBinding(WorkChain):
@@ -29,10 +35,51 @@ class OptimizeStrainedFirstPrinciplesTightBinding(WorkChain):
             OptimizeFirstPrinciplesTightBinding,
             exclude=('structure', 'symmetries')
         )
+        spec.input(
+            'warm_start',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the strain value closest to zero is optimized first. The window search for each other strain value is then started from the optimal window of its neighbour which is closer to the center, such that the strain values are calculated from the center outwards. If the neighbouring optimization did not finish successfully, the input initial window is used instead.'  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'warm_start_simplex_dist',
+            valid_type=Float,
+            default=Float(0.25),
+            help=
+            'Distance between the initial window and the other initial simplex points, for window searches which are started from the optimal window of a neighbouring strain value.'  # pylint: disable=line-too-long
+        )
 
-        spec.outline(cls.run_strain, cls.run_optimize_dft_tb, cls.finalize)
+        spec.input(
+            'max_concurrent',
+            valid_type=Int,
+            default=Int(0),
+            help=
+            'Maximum number of tight-binding optimizations which run at the same time. The strain values are submitted in batches of at most this size, in the order given by ``strain_order``. If zero, there is no limit.'  # pylint: disable=line-too-long
+        )
+        spec.input(
+            'strain_order',
+            valid_type=Str,
+            default=Str('center'),
+            help=
+            "Order in which the strain values are submitted. With 'center', the strain value closest to zero is submitted first, followed by the other values from the center outwards. With 'input', the order of ``strain_strengths`` is used."  # pylint: disable=line-too-long
+        )
+
+        spec.input(
+            'reuse_results',
+            valid_type=Bool,
+            default=Bool(False),
+            help=
+            'If True, the result of a finished OptimizeFirstPrinciplesTightBinding workflow with identical inputs (strained structure, symmetries and all other parameters) is re-used instead of submitting a new one. This means that extending a strain series only calculates the new strain values.'  # pylint: disable=line-too-long
+        )
+
+        spec.outline(
+            cls.run_strain, cls.setup_schedule,
+            while_(cls.has_remaining_strains)(cls.run_next_strains),
+            cls.finalize
+        )
 
-    @check_workchain_step
+    @instrumented_step
     def run_strain(self):
         """
         Apply strain to the initial structure to get the strained structures.
@@ -44,33 +91,167 @@ class OptimizeStrainedFirstPrinciplesTightBinding(WorkChain):
             )
         )
 
-    @check_workchain_step
-    def run_optimize_dft_tb(self):
+    def _submit_optimization(self, strain, **kwargs):
         """
-        Run the tight-binding optimization for each strained structure.
+        Submit the tight-binding optimization for the given strain value.
         """
         apply_strains_outputs = self.ctx.apply_strains.get_outputs_dict()
+        inputs = self.exposed_inputs(OptimizeFirstPrinciplesTightBinding)
+        if 'initial_window' in kwargs:
+            inputs.pop('initial_simplex', None)
+        inputs.update(kwargs)
+        inputs['structure'] = apply_strains_outputs[get_structure_key(strain)]
+        inputs['symmetries'
+               ] = apply_strains_outputs[get_symmetries_key(strain)]
+        if not self.inputs.reuse_results:
+            return self.submit(OptimizeFirstPrinciplesTightBinding, **inputs)
+
+        key = get_inputs_cache_key(inputs)
+        cached_calc = _OPTIMIZATION_CACHE.get(
+            key, OptimizeFirstPrinciplesTightBinding
+        )
+        if cached_calc is not None:
+            self.report(
+                'Re-using OptimizeFirstPrinciplesTightBinding<{}> for strain {}.'.
+                format(cached_calc.pk, strain)
+            )
+            return cached_calc
+        calc = self.submit(OptimizeFirstPrinciplesTightBinding, **inputs)
+        _OPTIMIZATION_CACHE.set_key(calc, key)
+        return calc
+
+    @staticmethod
+    def _get_key(strain):
+        return 'tbextraction' + get_suffix(strain)
+
+    @instrumented_step
+    def setup_schedule(self):
+        """
+        Determine the order in which the strain values are optimized.
+        """
+        strains = sorted(self.inputs.strain_strengths)
+        center_idx = min(
+            range(len(strains)), key=lambda idx: abs(strains[idx])
+        )
+        strain_order = self.inputs.strain_order.value
+        if strain_order == 'center':
+            # stable sort: for equal distance, the negative side comes first
+            pending = sorted(
+                strains,
+                key=lambda strain: abs(strains.index(strain) - center_idx)
+            )
+        elif strain_order == 'input':
+            pending = list(self.inputs.strain_strengths)
+        else:
+            raise ValueError(
+                "Invalid strain_order '{}', must be 'center' or 'input'.".
+                format(strain_order)
+            )
+        self.ctx.sorted_strains = strains
+        self.ctx.center_idx = center_idx
+        self.ctx.pending_strains = pending
+        if self.inputs.warm_start:
+            self.report(
+                'Starting warm-started optimizations from strain {}.'.format(
+                    strains[center_idx]
+                )
+            )
+
+    def has_remaining_strains(self):
+        return bool(self.ctx.pending_strains)
+
+    def _get_warm_start_neighbour(self, strain):
+        """
+        Get the neighbouring strain value towards the center, or ``None`` for the center strain.
+        """
+        strains = self.ctx.sorted_strains
+        idx = strains.index(strain)
+        center_idx = self.ctx.center_idx
+        if idx == center_idx:
+            return None
+        return strains[idx + (1 if idx < center_idx else -1)]
+
+    def _is_ready(self, strain):
+        """
+        Check if the optimization for the given strain can be started.
+        """
+        if not self.inputs.warm_start:
+            return True
+        neighbour = self._get_warm_start_neighbour(strain)
+        return neighbour is None or self._get_key(neighbour) in self.ctx
+
+    def _get_optimal_window(self, strain):
+        """
+        Get the optimal window of the finished optimization for the given strain value, or ``None`` if it did not finish successfully.
+        """
+        calc = self.ctx[self._get_key(strain)]
+        if not calc.is_finished_ok:
+            return None
+        return dict(
+            calc.get_outputs(also_labels=True, link_type=LinkType.RETURN)
+        ).get('window', None)
+
+    @instrumented_step
+    def run_next_strains(self):
+        """
+        Run the tight-binding optimization for the next batch of strain values. With warm start, a strain value is only started once its neighbour towards the center is finished, from the optimal window of that neighbour.
+        """
+        max_concurrent = self.inputs.max_concurrent.value
+        ready = [
+            strain for strain in self.ctx.pending_strains
+            if self._is_ready(strain)
+        ]
+        if max_concurrent > 0:
+            ready = ready[:max_concurrent]
+        self.ctx.pending_strains = [
+            strain for strain in self.ctx.pending_strains
+            if strain not in ready
+        ]
+
         tocontext_kwargs = {}
-        for strain in self.inputs.strain_strengths:
-            key = 'tbextraction' + get_suffix(strain)
-            structure_key = get_structure_key(strain)
-            symmetries_key = get_symmetries_key(strain)
-            tocontext_kwargs[key] = self.submit(
-                OptimizeFirstPrinciplesTightBinding,
-                structure=apply_strains_outputs[structure_key],
-                symmetries=apply_strains_outputs[symmetries_key],
-                **self.exposed_inputs(OptimizeFirstPrinciplesTightBinding)
+        for strain in ready:
+            neighbour = None
+            if self.inputs.warm_start:
+                neighbour = self._get_warm_start_neighbour(strain)
+            initial_window = None
+            if neighbour is not None:
+                initial_window = self._get_optimal_window(neighbour)
+                if initial_window is None:
+                    self.report(
+                        'Optimization for strain {} has no optimal window, starting strain {} from the input window.'.
+                        format(neighbour, strain)
+                    )
+            if initial_window is None:
+                self.report(
+                    'Starting optimization for strain {}.'.format(strain)
+                )
+                calc = self._submit_optimization(strain)
+            else:
+                self.report(
+                    'Starting optimization for strain {} from the optimal window {} of strain {}.'.
+                    format(strain, initial_window.get_attr('list'), neighbour)
+                )
+                calc = self._submit_optimization(
+                    strain,
+                    initial_window=initial_window,
+                    simplex_dist=self.inputs.warm_start_simplex_dist
+                )
+            tocontext_kwargs[self._get_key(strain)] = calc
+        self.report(
+            '{} strain values remaining.'.format(
+                len(self.ctx.pending_strains)
             )
+        )
         return ToContext(**tocontext_kwargs)
 
-    @check_workchain_step
+    @instrumented_step
     def finalize(self):
         """
         Retrieve and output results.
         """
         for strain in self.inputs.strain_strengths:
             suffix = get_suffix(strain)
-            calc = self.ctx['tbextraction' + suffix]
+            calc = self.ctx[self._get_key(strain)]
             for label, node in calc.get_outputs(
                 also_labels=True, link_type=LinkType.RETURN
             ):
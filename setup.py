@@ -31,9 +31,10 @@ if __name__ == '__main__':
         setup_requires=['reentry'],
         reentry_register=True,
         install_requires=[
-            'aiida-core', 'aiida-vasp', 'aiida-wannier90',
-            'aiida-bands-inspect', 'aiida-tbmodels', 'aiida-strain',
-            'aiida-optimize', 'fsc.export', 'aiida-tools'
+            'aiida-core', 'aiida-vasp', 'aiida-quantumespresso',
+            'aiida-wannier90', 'aiida-bands-inspect', 'aiida-tbmodels',
+            'aiida-strain', 'aiida-optimize', 'fsc.export', 'aiida-tools',
+            'tbmodels', 'bands-inspect', 'symmetry-representation'
         ],
         extras_require={
             ':python_version < "3"': ['chainmap', 'singledispatch'],
@@ -42,5 +43,9 @@ if __name__ == '__main__':
                 'sphinx-rtd-theme', 'sphinx-pyreverse'
             ]
         },
-        entry_points={},
+        entry_points={
+            'aiida.data': [
+                'tbextraction.bands_view = aiida_tbextraction.data:BandsViewData'
+            ]
+        },
     )
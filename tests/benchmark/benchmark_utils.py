@@ -0,0 +1,145 @@
+"""
+Helper functions to collect and compare performance statistics of workflows.
+"""
+
+from __future__ import division, print_function
+
+import os
+import json
+from collections import defaultdict
+
+OUTPUT_ENV = 'TBEXTRACTION_BENCHMARK_OUTPUT'
+BASELINE_ENV = 'TBEXTRACTION_BENCHMARK_BASELINE'
+TIME_TOLERANCE = 1.5
+
+
+def get_max_node_id():
+    """
+    Get the largest node ID in the database, which marks the start of a benchmark.
+    """
+    from aiida.orm import Node
+    from aiida.orm.querybuilder import QueryBuilder
+    query = QueryBuilder()
+    query.append(Node, project='id')
+    query.order_by({Node: {'id': 'desc'}})
+    query.limit(1)
+    result = query.all()
+    return result[0][0] if result else 0
+
+
+def _get_descendant_processes(process):
+    """
+    Get all processes which were called (directly or indirectly) by the given process.
+    """
+    from aiida.common.links import LinkType
+    result = []
+    for child in process.get_outputs(link_type=LinkType.CALL):
+        result.append(child)
+        result.extend(_get_descendant_processes(child))
+    return result
+
+
+def _get_folder_size(path):
+    total_size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            total_size += os.path.getsize(os.path.join(dirpath, filename))
+    return total_size
+
+
+def _get_duration(process):
+    return (process.mtime - process.ctime).total_seconds()
+
+
+def collect_statistics(pk, start_node_id, num_evaluations=1):
+    """
+    Collect the statistics of a finished process and its descendants.
+
+    :param pk: PK of the process.
+    :type pk: int
+
+    :param start_node_id: Largest node ID before the process was launched. All nodes with larger IDs are counted as created by the process.
+    :type start_node_id: int
+
+    :param num_evaluations: Number of window evaluations, used to normalize the statistics.
+    :type num_evaluations: int
+    """
+    from aiida.orm import load_node, Node
+    from aiida.orm.querybuilder import QueryBuilder
+
+    process = load_node(pk)
+    descendants = _get_descendant_processes(process)
+    steps = defaultdict(lambda: dict(count=0, wall_time=0.))
+    for child in descendants:
+        label = child.get_attr('_process_label', type(child).__name__)
+        steps[label]['count'] += 1
+        steps[label]['wall_time'] += _get_duration(child)
+
+    query = QueryBuilder()
+    query.append(Node, filters={'id': {'>': start_node_id}})
+    new_nodes = [node for node, in query.iterall()]
+    repository_bytes = sum(
+        _get_folder_size(node.folder.abspath) for node in new_nodes
+    )
+    return dict(
+        wall_time=_get_duration(process) / num_evaluations,
+        num_processes=len(descendants) / num_evaluations,
+        num_nodes=len(new_nodes) / num_evaluations,
+        repository_bytes=repository_bytes / num_evaluations,
+        steps={
+            label: dict(
+                count=value['count'] / num_evaluations,
+                wall_time=value['wall_time'] / value['count']
+            )
+            for label, value in steps.items()
+        },
+    )
+
+
+def report_statistics(name, statistics):
+    """
+    Print the statistics, write them to the output file given by the ``TBEXTRACTION_BENCHMARK_OUTPUT`` environment variable, and compare them to the baseline file given by ``TBEXTRACTION_BENCHMARK_BASELINE``.
+    """
+    print('Benchmark {} (per window evaluation):'.format(name))
+    for key in ['wall_time', 'num_processes', 'num_nodes', 'repository_bytes']:
+        print('    {:<20}{:>14.2f}'.format(key, statistics[key]))
+    for label, step in sorted(statistics['steps'].items()):
+        print(
+            '    {:<40}{:>8.2f} x {:>8.2f}s'.format(
+                label, step['count'], step['wall_time']
+            )
+        )
+
+    output_file = os.environ.get(OUTPUT_ENV, None)
+    if output_file:
+        results = {}
+        if os.path.isfile(output_file):
+            with open(output_file, 'r') as in_file:
+                results = json.load(in_file)
+        results[name] = statistics
+        with open(output_file, 'w') as out_file:
+            json.dump(results, out_file, indent=4, sort_keys=True)
+
+    baseline_file = os.environ.get(BASELINE_ENV, None)
+    if baseline_file:
+        with open(baseline_file, 'r') as in_file:
+            baseline = json.load(in_file).get(name, None)
+        if baseline is not None:
+            check_regression(statistics, baseline)
+
+
+def check_regression(statistics, baseline):
+    """
+    Check that the statistics are not worse than the baseline. The counts must not increase, and the wall time must not increase by more than ``TIME_TOLERANCE``.
+    """
+    for key in ['num_processes', 'num_nodes', 'repository_bytes']:
+        assert statistics[key] <= baseline[key], (
+            "Regression in '{}': {} > {}".format(
+                key, statistics[key], baseline[key]
+            )
+        )
+    assert statistics['wall_time'] <= TIME_TOLERANCE * baseline['wall_time'], (
+        'Regression in wall time: {:.2f}s > {} * {:.2f}s'.format(
+            statistics['wall_time'], TIME_TOLERANCE, baseline['wall_time']
+        )
+    )
@@ -0,0 +1,164 @@
+"""
+Benchmarks for the window search and its sub-workflows, using the InSb sample and the locally configured codes. These benchmarks are only run if the ``TBEXTRACTION_RUN_BENCHMARKS`` environment variable is set.
+"""
+
+from __future__ import print_function
+
+import os
+import itertools
+
+import pytest
+import pymatgen
+import numpy as np
+
+from benchmark_utils import get_max_node_id, collect_statistics, report_statistics
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get('TBEXTRACTION_RUN_BENCHMARKS', None),
+    reason='Benchmarks are only run if TBEXTRACTION_RUN_BENCHMARKS is set.'
+)
+
+SAMPLES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'samples'
+)
+
+
+@pytest.fixture
+def benchmark_inputs(configure_with_daemon):  # pylint: disable=unused-argument,too-many-locals
+    """
+    Create the inputs which are common to the RunWindow and WindowSearch workflows.
+    """
+    from aiida.orm import DataFactory
+    from aiida.orm.code import Code
+    from aiida.orm.data.base import List
+    from aiida_bands_inspect.io import read_bands
+    from aiida_tbextraction.model_evaluation import BandDifferenceModelEvaluation
+
+    inputs = dict()
+    input_folder = DataFactory('folder')()
+    input_folder_path = os.path.join(SAMPLES_DIR, 'wannier_input_folder')
+    for filename in os.listdir(input_folder_path):
+        input_folder.add_path(
+            os.path.join(input_folder_path, filename), filename
+        )
+    inputs['wannier_input_folder'] = input_folder
+    inputs['wannier_code'] = Code.get_from_string('wannier90')
+    inputs['tbmodels_code'] = Code.get_from_string('tbmodels')
+    inputs['model_evaluation_workflow'] = BandDifferenceModelEvaluation
+    inputs['model_evaluation'] = {
+        'bands_inspect_code': Code.get_from_string('bands_inspect'),
+    }
+    inputs['reference_bands'] = read_bands(
+        os.path.join(SAMPLES_DIR, 'bands.hdf5')
+    )
+
+    a = 3.2395  # pylint: disable=invalid-name
+    structure = DataFactory('structure')()
+    structure.set_pymatgen_structure(
+        pymatgen.Structure(
+            lattice=[[0, a, a], [a, 0, a], [a, a, 0]],
+            species=['In', 'Sb'],
+            coords=[[0] * 3, [0.25] * 3]
+        )
+    )
+    inputs['structure'] = structure
+    inputs['wannier_parameters'] = DataFactory('parameter')(
+        dict=dict(
+            num_wann=14,
+            num_bands=36,
+            dis_num_iter=1000,
+            num_iter=0,
+            spinors=True,
+            mp_grid=[6, 6, 6],
+        )
+    )
+    inputs['wannier_calculation_kwargs'] = dict(
+        options={
+            'resources': {
+                'num_machines': 1,
+                'tot_num_mpiprocs': 1
+            },
+            'withmpi': False
+        }
+    )
+    inputs['symmetries'] = DataFactory('singlefile')(
+        file=os.path.join(SAMPLES_DIR, 'symmetries.hdf5')
+    )
+    slice_idx = List()
+    slice_idx.extend([0, 2, 3, 1, 5, 6, 4, 7, 9, 10, 8, 12, 13, 11])
+    inputs['slice_idx'] = slice_idx
+
+    k_values = [
+        x if x <= 0.5 else -1 + x
+        for x in np.linspace(0, 1, 6, endpoint=False)
+    ]
+    k_points = [
+        list(reversed(k)) for k in itertools.product(k_values, repeat=3)
+    ]
+    wannier_bands = DataFactory('array.bands')()
+    wannier_bands.set_kpoints(k_points)
+    wannier_bands.set_bands(
+        np.array(
+            [[-20] * 10 + [-0.5] * 7 + [0.5] * 7 + [20] * 12] * len(k_points)
+        )
+    )
+    inputs['wannier_bands'] = wannier_bands
+    return inputs
+
+
+@pytest.mark.parametrize(
+    'mode', ['default', 'postprocess_inline', 'evaluate_inline']
+)
+def test_benchmark_runwindow(benchmark_inputs, mode):  # pylint: disable=redefined-outer-name
+    """
+    Benchmark the evaluation of a single energy window.
+    """
+    from aiida.orm import DataFactory
+    from aiida.orm.data.base import List, Bool
+    from aiida.work.launch import run_get_pid
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    inputs = dict(benchmark_inputs)
+    kpoints = DataFactory('array.kpoints')()
+    kpoints.set_kpoints(inputs['wannier_bands'].get_kpoints())
+    inputs['wannier_kpoints'] = kpoints
+    inputs['window'] = List(list=[-4.5, -4, 6.5, 16])
+    if mode != 'default':
+        inputs[mode] = Bool(True)
+
+    start_node_id = get_max_node_id()
+    result, pid = run_get_pid(RunWindow, **inputs)
+    assert result['cost_value'] < float('inf')
+    report_statistics(
+        'runwindow_{}'.format(mode), collect_statistics(pid, start_node_id)
+    )
+
+
+@pytest.mark.parametrize('engine', ['nelder_mead', 'parallel_nelder_mead'])
+def test_benchmark_windowsearch(benchmark_inputs, engine):  # pylint: disable=redefined-outer-name
+    """
+    Benchmark a complete window search, normalized to the number of evaluated windows.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import List, Float, Str
+    from aiida.work.launch import run_get_pid
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+    from aiida_tbextraction.energy_windows.windowsearch import WindowSearch
+
+    inputs = dict(benchmark_inputs)
+    inputs['initial_window'] = List(list=[-4.5, -4, 6.5, 16])
+    inputs['window_tol'] = Float(0.5)
+    inputs['engine'] = Str(engine)
+
+    start_node_id = get_max_node_id()
+    result, pid = run_get_pid(WindowSearch, **inputs)
+    assert 'cost_value' in result
+    statistics = collect_statistics(pid, start_node_id)
+    num_evaluations = statistics['steps'][RunWindow.__name__]['count']
+    report_statistics(
+        'windowsearch_{}'.format(engine),
+        collect_statistics(
+            pid, start_node_id, num_evaluations=num_evaluations
+        )
+    )
+    assert load_node(pid).is_finished_ok
@@ -39,6 +39,21 @@ def test_bandevaluation(configure_with_daemon, band_difference_builder):  # pyli
     assert np.isclose(output['cost_value'].value, 0.)
 
 
+def test_bandevaluation_no_plot(
+    configure_with_daemon, band_difference_builder
+):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Run the band evaluation workflow without creating a plot.
+    """
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import run
+    builder = band_difference_builder
+    builder.plot = Bool(False)
+    output = run(builder)
+    assert np.isclose(output['cost_value'].value, 0.)
+    assert 'plot' not in output
+
+
 def test_bandevaluation_launchmany(
     configure_with_daemon,  # pylint: disable=unused-argument
     band_difference_builder,  # pylint: disable=redefined-outer-name
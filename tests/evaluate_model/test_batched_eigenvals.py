@@ -0,0 +1,47 @@
+"""
+Tests for the workflow which calculates the eigenvalues of multiple tight-binding models.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import numpy as np
+
+
+def test_batched_eigenvals(configure_with_daemon, sample):  # pylint: disable=unused-argument
+    """
+    Calculate the eigenvalues of multiple copies of a model, and compare them to the reference bands.
+    """
+    from aiida.orm import DataFactory
+    from aiida.work.launch import run
+    from aiida_bands_inspect.io import read_bands
+    from aiida_tbextraction.calculate_bands import BatchedEigenvals
+
+    reference_bands = read_bands(sample('silicon/bands.hdf5'))
+    tb_models = {
+        'model_{}'.format(i):
+        DataFactory('singlefile')(file=sample('silicon/model.hdf5'))
+        for i in range(3)
+    }
+    result = run(
+        BatchedEigenvals, tb_models=tb_models, kpoints=reference_bands
+    )
+    assert sorted(result.keys()) == sorted(tb_models.keys())
+    for bands in result.values():
+        assert np.allclose(bands.get_bands(), reference_bands.get_bands())
+
+
+def test_calculate_eigenvals_chunks(configure, sample):  # pylint: disable=unused-argument
+    """
+    Check that the eigenvalues do not depend on the number of k-points diagonalized at once.
+    """
+    import tbmodels
+    from aiida_tbextraction._helpers._tbmodels import calculate_eigenvals
+
+    model = tbmodels.io.load(sample('silicon/model.hdf5'))
+    kpoints = np.random.uniform(size=(50, 3))
+    reference = np.linalg.eigvalsh(np.array(model.hamilton(kpoints)))
+    for chunk_size in [None, 1, 7, 50, 100]:
+        assert np.allclose(
+            calculate_eigenvals(model, kpoints, chunk_size=chunk_size),
+            reference
+        )
@@ -0,0 +1,95 @@
+"""
+Tests for the weighted band difference model evaluation workflow.
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def weighted_difference_builder(configure, sample):  # pylint: disable=unused-argument
+    """
+    Create inputs for the weighted band difference workflow.
+    """
+    from aiida.orm import DataFactory
+    from aiida.orm.code import Code
+    from aiida_tbextraction.model_evaluation import WeightedBandDifferenceModelEvaluation
+    from aiida_bands_inspect.io import read_bands
+
+    builder = WeightedBandDifferenceModelEvaluation.get_builder()
+    builder.tbmodels_code = Code.get_from_string('tbmodels')
+    builder.tb_model = DataFactory('singlefile')(
+        file=sample('silicon/model.hdf5')
+    )
+    builder.reference_bands = read_bands(sample('silicon/bands.hdf5'))
+
+    return builder
+
+
+@pytest.mark.parametrize('band_weights', [None, [1, 2, 0, 1]])
+@pytest.mark.parametrize('reference_energy', [None, 0.])
+def test_weighted_evaluation(
+    configure_with_daemon,  # pylint: disable=unused-argument
+    weighted_difference_builder,  # pylint: disable=redefined-outer-name
+    band_weights,
+    reference_energy
+):
+    """
+    Run the weighted band evaluation workflow.
+    """
+    from aiida.orm.data.base import List, Float
+    from aiida.work.launch import run
+    builder = weighted_difference_builder
+    if band_weights is not None:
+        builder.band_weights = List(list=band_weights)
+    if reference_energy is not None:
+        builder.reference_energy = Float(reference_energy)
+    output = run(builder)
+    assert np.isclose(output['cost_value'].value, 0.)
+
+
+def test_weighted_difference():
+    """
+    Check the weighted difference for shifted eigenvalues.
+    """
+    from aiida_tbextraction.model_evaluation._weighted_difference import calculate_weighted_difference
+    reference = np.linspace(-1, 1, 12).reshape(3, 4)
+    shift = np.array([0.1, 0.2, 0.3, 0.4])
+    assert np.isclose(
+        calculate_weighted_difference(reference, reference + shift), 0.25
+    )
+    assert np.isclose(
+        calculate_weighted_difference(
+            reference, reference + shift, band_weights=[1, 1]
+        ), 0.15
+    )
+    assert np.isclose(
+        calculate_weighted_difference(
+            reference, reference + shift, reference_energy=0.
+        ),
+        calculate_weighted_difference(
+            reference,
+            reference + shift,
+            reference_energy=0.,
+            band_weights=[1, 1, 1, 1]
+        )
+    )
+
+
+def test_chunked_difference():
+    """
+    Check that the weighted difference does not depend on how the k-points are split into blocks.
+    """
+    from aiida_tbextraction._helpers._band_difference import calculate_chunked_difference
+    reference = np.random.uniform(size=(1, 100, 8))
+    calculated = np.random.uniform(size=(100, 6))
+    kwargs = dict(band_weights=[1, 2, 3], reference_energy=0.5)
+    assert np.isclose(
+        calculate_chunked_difference([(reference, calculated)], **kwargs),
+        calculate_chunked_difference(
+            [(reference[..., start:start + 7, :], calculated[start:start + 7])
+             for start in range(0, 100, 7)], **kwargs
+        )
+    )
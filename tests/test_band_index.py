@@ -0,0 +1,68 @@
+"""
+Tests for the index which counts the number of bands inside energy windows.
+"""
+
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def bands():
+    """
+    Random eigenvalues, with some duplicate values.
+    """
+    return np.round(np.random.RandomState(42).normal(size=(50, 20)) * 5, 1)
+
+
+@pytest.mark.parametrize(
+    'lower, upper', [(-3, 2), (-100, 100), (0, 0), (50, 60), (-60, -50)]
+)
+def test_count(configure, bands, lower, upper):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Check the band count against an explicit count.
+    """
+    from aiida_tbextraction._helpers._band_index import BandCountIndex
+    index = BandCountIndex(bands)
+    assert np.all(
+        index.count(lower, upper) ==
+        np.sum(np.logical_and(lower <= bands, bands <= upper), axis=-1)
+    )
+
+
+def test_count_batch(configure, bands):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Check the band count for multiple ranges at once, including limits which coincide with eigenvalues.
+    """
+    from aiida_tbextraction._helpers._band_index import BandCountIndex
+    index = BandCountIndex(bands)
+    lower = np.array([bands[3, 4], -2., 0.5])
+    upper = np.array([bands[7, 2], 2., 0.5])
+    expected = np.sum(
+        np.logical_and(
+            lower[:, np.newaxis, np.newaxis] <= bands,
+            bands <= upper[:, np.newaxis, np.newaxis]
+        ),
+        axis=-1
+    )
+    assert np.all(index.count(lower, upper) == expected)
+
+
+def test_check_windows(configure):  # pylint: disable=unused-argument
+    """
+    Check the validity of windows for the same band structure as used in the RunWindow tests.
+    """
+    from aiida_tbextraction._helpers._band_index import BandCountIndex
+    index = BandCountIndex(
+        np.array([[-20] * 10 + [-0.5] * 7 + [0.5] * 7 + [20] * 12] * 10)
+    )
+    assert index.check_windows([
+        [-4.5, -4, 6.5, 16],
+        [-4.5, 6.5, -4, 16],
+        [-30, -30, 30, 30],
+        [0, 0, 0, 0],
+    ],
+                               num_wann=14) == [
+                                   None, 'Window values not sorted.',
+                                   'Too many bands in inner window.',
+                                   'Too few bands in outer window.'
+                               ]
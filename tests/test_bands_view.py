@@ -0,0 +1,94 @@
+"""
+Tests for the bands view data class.
+"""
+
+import numpy as np
+
+
+def test_bands_view(configure):  # pylint: disable=unused-argument
+    """
+    Check that flattening, cropping and slicing a view gives the same result as the corresponding operations on the array, also after storing and re-loading the nodes.
+    """
+    from aiida.orm import DataFactory, load_node
+    from aiida.orm.data.base import List
+    from aiida_tbextraction.data import BandsViewData
+    from aiida_tbextraction.optimize_fp_tb import slice_bands_inline
+    from aiida_tbextraction.fp_run._helpers._inline_calcs import flatten_bands_inline, crop_bands_inline
+
+    kpoints_array = np.random.uniform(size=(10, 3))
+    bands_array = np.random.uniform(size=(1, 10, 6))
+    bands = DataFactory('array.bands')()
+    bands.set_kpoints(kpoints_array)
+    bands.set_bands(bands_array)
+
+    cropped_kpoints = DataFactory('array.kpoints')()
+    cropped_kpoints.set_kpoints(kpoints_array[4:])
+
+    slice_idx = List()
+    slice_idx.extend([0, 2, 3])
+
+    flattened = flatten_bands_inline(bands=bands)[1]['bands']
+    cropped = crop_bands_inline(
+        bands=flattened, kpoints=cropped_kpoints
+    )[1]['bands']
+    sliced = slice_bands_inline(bands=cropped, slice_idx=slice_idx)[1]['bands']
+
+    reference = bands_array[0, 4:][:, [0, 2, 3]]
+    for node in [sliced, load_node(sliced.pk)]:
+        assert isinstance(node, BandsViewData)
+        assert node.parent.uuid == bands.uuid
+        assert np.allclose(node.get_bands(), reference)
+        assert np.allclose(node.get_kpoints(), kpoints_array[4:])
+        assert 'bands.npy' not in node.get_folder_list()
+
+
+def test_mapped_bands(configure):  # pylint: disable=unused-argument
+    """
+    Check that the memory-mapped eigenvalues of a BandsData and of a view onto it are read-only and match the in-memory eigenvalues.
+    """
+    from aiida.orm import DataFactory
+    from aiida_tbextraction.data import BandsViewData
+    from aiida_tbextraction._helpers._mapped_array import get_mapped_bands
+
+    bands = DataFactory('array.bands')()
+    bands.set_kpoints(np.random.uniform(size=(10, 3)))
+    bands.set_bands(np.random.uniform(size=(1, 10, 6)))
+    bands.store()
+
+    view = BandsViewData.from_parent(bands)
+    view.flatten()
+    view.store()
+
+    for node in [bands, view]:
+        mapped_bands = get_mapped_bands(node)
+        assert isinstance(mapped_bands, np.memmap)
+        assert not mapped_bands.flags.writeable
+        assert np.allclose(mapped_bands, node.get_bands())
+
+
+def test_mapped_bands_chunks(configure):  # pylint: disable=unused-argument
+    """
+    Check that iterating over blocks of k-points gives the same eigenvalues for a BandsData and for a sliced and cropped view onto it.
+    """
+    from aiida.orm import DataFactory
+    from aiida_tbextraction.data import BandsViewData
+    from aiida_tbextraction._helpers._mapped_array import iter_mapped_bands_chunks
+
+    kpoints_array = np.random.uniform(size=(10, 3))
+    bands = DataFactory('array.bands')()
+    bands.set_kpoints(kpoints_array)
+    bands.set_bands(np.random.uniform(size=(1, 10, 6)))
+    bands.store()
+
+    cropped_kpoints = DataFactory('array.kpoints')()
+    cropped_kpoints.set_kpoints(kpoints_array[3:])
+    view = BandsViewData.from_parent(bands, kpoints=cropped_kpoints)
+    view.flatten()
+    view.slice_bands([4, 0, 2])
+    view.crop_kpoints(7)
+    view.store()
+
+    for node in [bands, view]:
+        chunks = list(iter_mapped_bands_chunks(node, chunk_size=3))
+        assert all(chunk.shape[-2] <= 3 for chunk in chunks)
+        assert np.allclose(np.concatenate(chunks, axis=-2), node.get_bands())
@@ -12,15 +12,18 @@ import numpy as np
 
 @pytest.mark.parametrize('slice_', [True, False])
 @pytest.mark.parametrize('symmetries', [True, False])
-def test_tbextraction(configure_with_daemon, sample, slice_, symmetries):  # pylint: disable=too-many-locals,unused-argument
+@pytest.mark.parametrize('postprocess_inline', [True, False])
+def test_tbextraction(
+    configure_with_daemon, sample, slice_, symmetries, postprocess_inline
+):  # pylint: disable=too-many-locals,unused-argument
     """
     Run the tight-binding calculation workflow, optionally including symmetrization and slicing of orbitals.
     """
-    from aiida.orm import DataFactory
+    from aiida.orm import DataFactory, load_node
     from aiida.orm.code import Code
-    from aiida.orm.data.base import List
+    from aiida.orm.data.base import List, Bool
     from aiida.orm.data.parameter import ParameterData
-    from aiida.work import run
+    from aiida.work.launch import run_get_pid
     from aiida_tbextraction.calculate_tb import TightBindingCalculation
 
     inputs = dict()
@@ -92,5 +95,14 @@ def test_tbextraction(configure_with_daemon, sample, slice_, symmetries):  # pyl
         slice_idx.extend([0, 2, 3, 1, 5, 6, 4, 7, 9, 10, 8, 12, 13, 11])
         inputs['slice_idx'] = slice_idx
 
-    result = run(TightBindingCalculation, **inputs)
+    inputs['postprocess_inline'] = Bool(postprocess_inline)
+
+    result, pid = run_get_pid(TightBindingCalculation, **inputs)
     assert 'tb_model' in result
+
+    instrumentation = load_node(pid
+                                ).get_extras()['tbextraction_instrumentation']
+    assert instrumentation['run_wannier']['num_submitted'] == 1
+    assert instrumentation['run_wannier']['num_reused'] == 0
+    assert instrumentation['run_wannier']['retrieved_bytes'] > 0
+    assert all(step['count'] == 1 for step in instrumentation.values())
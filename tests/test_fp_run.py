@@ -2,6 +2,8 @@
 Tests for running the DFT calculations needed as input for the tight-binding calculation.
 """
 
+import pytest
+
 from insb_sample import get_insb_input  # pylint: disable=unused-import
 
 
@@ -65,8 +67,9 @@ def test_split_fp_run(configure_with_daemon, assert_finished, get_insb_input):
     )
 
 
+@pytest.mark.parametrize('keep_wavecar_remote', [True, False])
 def test_combined_fp_run(
-    configure_with_daemon, assert_finished, get_insb_input
+    configure_with_daemon, assert_finished, get_insb_input, keep_wavecar_remote
 ):  # pylint: disable=unused-argument,redefined-outer-name,too-many-locals
     """
     Calculates the Wannier90 inputs from VASP with hybrid functionals.
@@ -75,6 +78,7 @@ def test_combined_fp_run(
     from aiida.orm.data.base import List, Bool
     from aiida.orm.data.parameter import ParameterData
     from aiida.orm.calculation.work import WorkCalculation
+    from aiida.orm.calculation.inline import InlineCalculation
     from aiida.work.launch import run_get_pid
     from aiida_tbextraction.fp_run import VaspFirstPrinciplesRun
     from aiida_vasp.calcs.vasp import VaspCalculation
@@ -103,6 +107,7 @@ def test_combined_fp_run(
         wannier_projections=wannier_projections,
         scf={'parameters': ParameterData(dict=dict(isym=2))},
         bands={'merge_kpoints': Bool(True)},
+        keep_wavecar_remote=Bool(keep_wavecar_remote),
         **vasp_inputs
     )
     assert_finished(pid)
@@ -120,9 +125,16 @@ def test_combined_fp_run(
     )
 
     sub_workchains = []
+    num_parameter_calcs = 0
     for label, node in load_node(pid).get_outputs(also_labels=True):
+        if label == 'CALL' and isinstance(node, InlineCalculation):
+            num_parameter_calcs += 1
         if label == 'CALL' and isinstance(node, WorkCalculation):
             sub_workchains.append(node)
+        if label == 'CALL' and isinstance(node, VaspCalculation):
+            assert ('WAVECAR' in node.get_retrieved_node().get_folder_list()
+                    ) != keep_wavecar_remote
+    assert num_parameter_calcs == 1
 
     for sub_wc in sub_workchains:
         for label, node in sub_wc.get_outputs(also_labels=True):
@@ -134,3 +146,4 @@ def test_combined_fp_run(
                     stdout = f.read()
                     assert 'WAVECAR not read' not in stdout
                     assert 'reading WAVECAR' in stdout
+                assert node.get_extras()['tbextraction_read_wavecar']
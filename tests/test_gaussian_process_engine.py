@@ -0,0 +1,38 @@
+"""
+Tests for the Gaussian process optimization engine.
+"""
+
+import numpy as np
+
+
+def test_propose_batch_close_to_evaluated(configure):  # pylint: disable=unused-argument
+    """
+    Check that a full batch is proposed when the candidate with the highest expected improvement is close to an already evaluated point.
+    """
+    from aiida_tbextraction.energy_windows._engines import _GaussianProcessImpl
+
+    points = [[0.], [1.], [2.], [3.], [4.]]
+    engine = _GaussianProcessImpl(
+        initial_points=points,
+        lower_bounds=[0.],
+        upper_bounds=[4.],
+        batch_size=3,
+        length_scale=1.,
+        num_candidates=200,
+        xtol=0.3,
+        ftol=-1.,
+        max_iter=10,
+        seed=0,
+        input_key='x',
+        result_key='result',
+        logger=None,
+        points=points,
+        values=[3., 1., 0., 1., 3.],
+        num_iter=1
+    )
+    batch = np.array(engine._propose_batch())  # pylint: disable=protected-access
+    assert len(batch) == 3
+    all_points = np.vstack([points, batch])
+    distances = np.abs(all_points[:, np.newaxis] - all_points[np.newaxis, :])
+    np.fill_diagonal(distances[:, :, 0], np.inf)
+    assert np.min(distances) >= 0.3
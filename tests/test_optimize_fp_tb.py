@@ -4,6 +4,8 @@ Test for the workflow that optimizes DFT-based tight-binding models.
 
 from __future__ import print_function
 
+import pytest
+
 from insb_sample import *  # pylint: disable=unused-wildcard-import
 
 
@@ -27,6 +29,51 @@ def test_fp_tb(
     assert all(key in result for key in ['cost_value', 'tb_model', 'window'])
 
 
+def test_fp_tb_pipeline(
+    configure_with_daemon,  # pylint: disable=unused-argument
+    get_fp_tb_input,  # pylint: disable=redefined-outer-name
+):
+    """
+    Runs the DFT tight-binding optimization workflow on an InSb sample, where the initial tight-binding models are calculated while the reference bands are running.
+    """
+    from aiida.work import run
+    from aiida.orm.data.base import Bool
+    from aiida_tbextraction.optimize_fp_tb import OptimizeFirstPrinciplesTightBinding
+
+    inputs = get_fp_tb_input
+    if 'reference_bands_workflow' not in inputs['fp_run']:
+        pytest.skip('Pipelining requires separate first-principles workflows.')
+    inputs['pipeline'] = Bool(True)
+    result = run(OptimizeFirstPrinciplesTightBinding, **inputs)
+    assert all(key in result for key in ['cost_value', 'tb_model', 'window'])
+
+
+def test_fp_tb_pipeline_restart_invalid(
+    configure_with_daemon,  # pylint: disable=unused-argument
+    get_fp_tb_input,  # pylint: disable=redefined-outer-name
+    wait_for,
+):
+    """
+    Check that the pipeline mode is rejected when restarting Wannier90 from the closest window.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import submit
+    from aiida.common.links import LinkType
+    from aiida_tbextraction.optimize_fp_tb import OptimizeFirstPrinciplesTightBinding
+
+    inputs = get_fp_tb_input
+    if 'reference_bands_workflow' not in inputs['fp_run']:
+        pytest.skip('Pipelining requires separate first-principles workflows.')
+    inputs['pipeline'] = Bool(True)
+    inputs['restart_from_closest'] = Bool(True)
+    pk = submit(OptimizeFirstPrinciplesTightBinding, **inputs).pk
+    wait_for(pk)
+    calc = load_node(pk)
+    assert not calc.is_finished_ok
+    assert not calc.get_outputs(link_type=LinkType.CALL)
+
+
 def test_fp_tb_submit(
     configure_with_daemon,  # pylint: disable=unused-argument
     get_fp_tb_input,  # pylint: disable=redefined-outer-name
@@ -4,19 +4,25 @@ Tests the workflow that optimizes a DFT-based tight-binding model for different
 
 from __future__ import print_function
 
+import pytest
+
 from insb_sample import *  # pylint: disable=unused-wildcard-import
 
 
+@pytest.mark.parametrize('warm_start', [False, True])
+@pytest.mark.parametrize('max_concurrent', [0, 1])
 def test_strained_fp_tb(
     configure_with_daemon,  # pylint: disable=unused-argument
     get_fp_tb_input,  # pylint: disable=redefined-outer-name
+    warm_start,
+    max_concurrent,
 ):
     """
     Run the DFT tight-binding optimization workflow with strain on an InSb sample for three strain values.
     """
     from aiida.work import run
     from aiida.orm.code import Code
-    from aiida.orm.data.base import Str, List
+    from aiida.orm.data.base import Str, List, Bool, Int
     from aiida_tbextraction.optimize_strained_fp_tb import OptimizeStrainedFirstPrinciplesTightBinding
     inputs = get_fp_tb_input
 
@@ -29,6 +35,8 @@ def test_strained_fp_tb(
     inputs['strain_strengths'] = strain_strengths
 
     inputs['symmetry_repr_code'] = Code.get_from_string('symmetry_repr')
+    inputs['warm_start'] = Bool(warm_start)
+    inputs['max_concurrent'] = Int(max_concurrent)
 
     result = run(OptimizeStrainedFirstPrinciplesTightBinding, **inputs)
     print(result)
@@ -38,3 +46,55 @@ def test_strained_fp_tb(
             key + suffix in result
             for key in ['cost_value', 'tb_model', 'window']
         )
+
+
+def test_strained_fp_tb_reuse(
+    configure_with_daemon,  # pylint: disable=unused-argument
+    get_fp_tb_input,  # pylint: disable=redefined-outer-name
+):
+    """
+    Run the strained DFT tight-binding optimization twice, where the second run adds a strain value. Only the new strain value is calculated in the second run.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.code import Code
+    from aiida.orm.data.base import Str, List, Bool
+    from aiida.work.launch import run_get_pid
+    from aiida.common.links import LinkType
+    from aiida_tbextraction.optimize_fp_tb import OptimizeFirstPrinciplesTightBinding
+    from aiida_tbextraction.optimize_strained_fp_tb import OptimizeStrainedFirstPrinciplesTightBinding
+    inputs = get_fp_tb_input
+
+    inputs['strain_kind'] = Str('three_five.Biaxial001')
+    inputs['strain_parameters'] = Str('InSb')
+    inputs['symmetry_repr_code'] = Code.get_from_string('symmetry_repr')
+    inputs['reuse_results'] = Bool(True)
+
+    def get_num_optimizations(pid):
+        return len([
+            calc
+            for calc in load_node(pid).get_outputs(link_type=LinkType.CALL)
+            if calc.get_attr('_process_label', None) ==
+            OptimizeFirstPrinciplesTightBinding.__name__
+        ])
+
+    strain_strengths = List()
+    strain_strengths.extend([0.])
+    inputs['strain_strengths'] = strain_strengths
+    _, pid1 = run_get_pid(
+        OptimizeStrainedFirstPrinciplesTightBinding, **inputs
+    )
+    assert get_num_optimizations(pid1) == 1
+
+    strain_strengths = List()
+    strain_strengths.extend([0., 0.1])
+    inputs['strain_strengths'] = strain_strengths
+    result, pid2 = run_get_pid(
+        OptimizeStrainedFirstPrinciplesTightBinding, **inputs
+    )
+    assert get_num_optimizations(pid2) == 1
+    for value in [0., 0.1]:
+        suffix = '_{}'.format(value).replace('.', '_dot_')
+        assert all(
+            key + suffix in result
+            for key in ['cost_value', 'tb_model', 'window']
+        )
@@ -0,0 +1,89 @@
+"""
+Tests for parsing the Wannier90 eigenvalues file.
+"""
+
+import pytest
+import numpy as np
+
+
+def test_parse_eig(configure, sample):  # pylint: disable=unused-argument
+    """
+    Compare the parsed eigenvalues to values taken from the ``.eig`` file.
+    """
+    from aiida_tbextraction.fp_run.wannier_input import VaspWannierInput
+
+    result = VaspWannierInput.parse_eig(
+        sample('wannier_input_folder/aiida.eig')
+    )
+    assert result.shape == (216, 36)
+    assert np.allclose(
+        result[0, [0, 1, 2, 35]], [
+            -12.069035640639, -12.069035637217, -12.069026853879,
+            14.397608239499
+        ]
+    )
+    assert np.isclose(result[1, 0], -12.070774279626)
+    assert np.allclose(result[215, 34:], [16.286672680430, 16.286678421904])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 100, 7776, 10000])
+def test_read_eig_chunks(configure, sample, chunk_size):  # pylint: disable=unused-argument
+    """
+    Check that the result does not depend on the number of lines parsed at once.
+    """
+    from aiida_tbextraction._helpers._wannier_io import read_eig
+
+    eig_file = sample('wannier_input_folder/aiida.eig')
+    result = read_eig(eig_file, chunk_size=chunk_size)
+    assert result.shape == (216, 36)
+    assert np.isclose(result[0, 0], -12.069035640639)
+    assert np.isclose(result[1, 0], -12.070774279626)
+    assert np.isclose(result[215, 35], 16.286678421904)
+
+
+def test_read_eig_trailing_blank_line(configure, sample, tmpdir):  # pylint: disable=unused-argument
+    """
+    Check that trailing blank lines are ignored.
+    """
+    from aiida_tbextraction._helpers._wannier_io import read_eig
+
+    eig_file = sample('wannier_input_folder/aiida.eig')
+    with open(eig_file, 'r') as in_file:
+        content = in_file.read()
+    blank_line_file = str(tmpdir.join('blank_line.eig'))
+    with open(blank_line_file, 'w') as out_file:
+        out_file.write(content + '\n\n')
+    assert np.allclose(read_eig(blank_line_file), read_eig(eig_file))
+
+
+def test_read_eig_invalid(configure, sample, tmpdir):  # pylint: disable=unused-argument
+    """
+    Check that an error is raised for wrong band or k-point indices.
+    """
+    from aiida_tbextraction._helpers._wannier_io import read_eig
+
+    with open(sample('wannier_input_folder/aiida.eig'), 'r') as in_file:
+        lines = in_file.readlines()
+    lines[40] = '{:12d}{:12d}{:22.12f}\n'.format(3, 7, 1.)
+    eig_file = str(tmpdir.join('invalid.eig'))
+    with open(eig_file, 'w') as out_file:
+        out_file.writelines(lines)
+    with pytest.raises(ValueError) as excinfo:
+        read_eig(eig_file)
+    assert 'entry 41' in str(excinfo.value)
+
+
+def test_read_eig_incomplete(configure, tmpdir):  # pylint: disable=unused-argument
+    """
+    Check that an error is raised when the last k-point block is incomplete.
+    """
+    from aiida_tbextraction._helpers._wannier_io import read_eig
+
+    eig_file = str(tmpdir.join('incomplete.eig'))
+    with open(eig_file, 'w') as out_file:
+        for band_idx, kpt_idx in [(1, 1), (2, 1), (1, 2)]:
+            out_file.write(
+                '{:12d}{:12d}{:22.12f}\n'.format(band_idx, kpt_idx, 1.)
+            )
+    with pytest.raises(ValueError):
+        read_eig(eig_file)
@@ -0,0 +1,118 @@
+"""
+Tests for running the first-principles calculations with Quantum ESPRESSO.
+"""
+
+import pytest
+from ase.io.vasp import read_vasp
+
+
+@pytest.fixture
+def get_qe_insb_input(configure, sample):  # pylint: disable=unused-argument
+    """
+    Create input for the InSb sample with Quantum ESPRESSO.
+    """
+    from aiida.orm import DataFactory
+    from aiida.orm.code import Code
+    from aiida.orm.data.parameter import ParameterData
+    from aiida.orm.data.upf import get_pseudos_from_structure
+
+    res = dict()
+
+    structure = DataFactory('structure')()
+    structure.set_ase(read_vasp(sample('InSb/POSCAR')))
+    res['structure'] = structure
+    res['potentials'] = get_pseudos_from_structure(structure, 'SSSP')
+
+    res['code'] = Code.get_from_string('pw')
+    res['parameters'] = ParameterData(
+        dict={
+            'SYSTEM': {
+                'ecutwfc': 30.,
+                'occupations': 'smearing',
+                'degauss': 0.01,
+                'nbnd': 36
+            },
+        }
+    )
+    res['calculation_kwargs'] = dict(
+        options=dict(
+            resources={
+                'num_machines': 1,
+                'num_mpiprocs_per_machine': 1
+            },
+            withmpi=False,
+        )
+    )
+    return res
+
+
+def test_qe_fp_run(configure_with_daemon, assert_finished, get_qe_insb_input):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Calculates the reference bands and Wannier90 inputs with Quantum ESPRESSO.
+    """
+    from aiida.orm import DataFactory, CalculationFactory, load_node
+    from aiida.orm.code import Code
+    from aiida.orm.data.base import List
+    from aiida.orm.calculation.work import WorkCalculation
+    from aiida.common.links import LinkType
+    from aiida.work.launch import run_get_pid
+    from aiida_tbextraction.fp_run import QEFirstPrinciplesRun
+
+    KpointsData = DataFactory('array.kpoints')
+
+    kpoints_mesh = KpointsData()
+    kpoints_mesh.set_kpoints_mesh([2, 2, 2])
+
+    kpoints = KpointsData()
+    kpoints.set_kpoints_path([('G', (0, 0, 0), 'M', (0.5, 0.5, 0.5))])
+
+    wannier_projections = List()
+    wannier_projections.extend(['In : s; px; py; pz', 'Sb : px; py; pz'])
+
+    num_wann = 7
+    result, pid = run_get_pid(
+        QEFirstPrinciplesRun,
+        kpoints=kpoints,
+        kpoints_mesh=kpoints_mesh,
+        wannier_parameters=DataFactory('parameter')(
+            dict=dict(num_wann=num_wann, num_bands=36)
+        ),
+        wannier_projections=wannier_projections,
+        to_wannier=dict(
+            wannier_code=Code.get_from_string('wannier90'),
+            pw2wannier_code=Code.get_from_string('pw2wannier90')
+        ),
+        **get_qe_insb_input
+    )
+    assert_finished(pid)
+    assert all(
+        key in result for key in [
+            'wannier_input_folder', 'wannier_parameters', 'wannier_bands',
+            'bands', 'wannier_settings'
+        ]
+    )
+    assert int(result['wannier_parameters'].get_attr('num_wann')) == num_wann
+    seedname = result['wannier_settings'].get_attr('seedname')
+    folder_list = result['wannier_input_folder'].get_folder_list()
+    assert all(
+        seedname + ext in folder_list for ext in ['.amn', '.mmn', '.eig']
+    )
+    assert result['wannier_bands'].get_bands().shape == (8, 36)
+
+    # the bands and NSCF calculations start from the SCF remote folder
+    PwCalculation = CalculationFactory('quantumespresso.pw')
+    workflow_calc = load_node(pid)
+    scf_calc = [
+        node for node in workflow_calc.get_outputs(link_type=LinkType.CALL)
+        if isinstance(node, PwCalculation)
+    ][0]
+    child_pw_calcs = [
+        node
+        for sub_workflow in workflow_calc.get_outputs(link_type=LinkType.CALL)
+        if isinstance(sub_workflow, WorkCalculation)
+        for node in sub_workflow.get_outputs(link_type=LinkType.CALL)
+        if isinstance(node, PwCalculation)
+    ]
+    assert len(child_pw_calcs) == 2
+    for calc in child_pw_calcs:
+        assert calc.inp.parent_folder.uuid == scf_calc.out.remote_folder.uuid
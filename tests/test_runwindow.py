@@ -126,6 +126,119 @@ def test_runwindow(configure_with_daemon, runwindow_input, slice_, symmetries):
     assert all(key in result for key in ['cost_value', 'tb_model', 'plot'])
 
 
+@pytest.mark.parametrize('slice_', [True, False])
+@pytest.mark.parametrize('symmetries', [True, False])
+def test_runwindow_inline(
+    configure_with_daemon, runwindow_input, slice_, symmetries
+):  # pylint:disable=unused-argument,redefined-outer-name
+    """
+    Runs the workflow which evaluates an energy window, with in-process evaluation of the tight-binding model.
+    """
+    from aiida.work import run
+    from aiida.orm.data.base import Bool
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    inputs = runwindow_input([-4.5, -4, 6.5, 16],
+                             slice_=slice_,
+                             symmetries=symmetries)
+    inputs['evaluate_inline'] = Bool(True)
+    result = run(RunWindow, **inputs)
+    assert all(key in result for key in ['cost_value', 'tb_model'])
+    assert 'plot' not in result
+
+
+def test_runwindow_weighted_difference(configure_with_daemon, runwindow_input):  # pylint:disable=unused-argument,redefined-outer-name
+    """
+    Runs the workflow which evaluates an energy window, using the weighted band difference as cost value.
+    """
+    from aiida.work import run
+    from aiida.orm.data.base import Float, List
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+    from aiida_tbextraction.model_evaluation import WeightedBandDifferenceModelEvaluation
+
+    inputs = runwindow_input([-4.5, -4, 6.5, 16], slice_=True, symmetries=True)
+    inputs['model_evaluation_workflow'] = WeightedBandDifferenceModelEvaluation
+    inputs['model_evaluation'] = {
+        'band_weights': List(list=[1.] * 8 + [2.] * 6),
+        'reference_energy': Float(0.),
+        'energy_width': Float(2.),
+    }
+    result = run(RunWindow, **inputs)
+    assert 0 <= result['cost_value'] < float('inf')
+    assert 'plot' not in result
+
+
+def test_runwindow_cache(configure_with_daemon, runwindow_input):  # pylint:disable=unused-argument,redefined-outer-name
+    """
+    Runs the workflow which evaluates an energy window twice with the same inputs, and checks that the second run re-uses the cached result.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import run_get_pid
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    inputs = runwindow_input([-4.5, -4, 6.5, 16], slice_=True, symmetries=True)
+    inputs['use_cache'] = Bool(True)
+    result1, _ = run_get_pid(RunWindow, **inputs)
+    result2, pid2 = run_get_pid(RunWindow, **inputs)
+    assert load_node(pid2).get_extra('tbextraction_window_cache_hit')
+    assert result1['cost_value'].uuid == result2['cost_value'].uuid
+    assert result1['tb_model'].uuid == result2['tb_model'].uuid
+
+
+def test_runwindow_cache_model_evaluation(
+    configure_with_daemon, runwindow_input
+):  # pylint:disable=unused-argument,redefined-outer-name
+    """
+    Checks that the cached result is not re-used when the model evaluation inputs are different.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import run_get_pid
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    inputs = runwindow_input([-4.5, -4, 6.5, 16], slice_=True, symmetries=True)
+    inputs['use_cache'] = Bool(True)
+    run_get_pid(RunWindow, **inputs)
+    inputs['model_evaluation']['plot'] = Bool(False)
+    result, pid = run_get_pid(RunWindow, **inputs)
+    assert not load_node(pid).get_extra('tbextraction_window_cache_hit')
+    assert 'plot' not in result
+
+
+@pytest.mark.parametrize('evaluate_inline', [True, False])
+def test_runwindow_restart(
+    configure_with_daemon, runwindow_input, evaluate_inline
+):  # pylint:disable=unused-argument,redefined-outer-name
+    """
+    Runs the workflow twice with nearby windows, where the second run restarts from the unitary matrices of the first.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import run_get_pid
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    inputs1 = runwindow_input([-4.5, -4, 6.5, 16],
+                              slice_=True,
+                              symmetries=True)
+    inputs1['restart_from_closest'] = Bool(True)
+    inputs1['evaluate_inline'] = Bool(evaluate_inline)
+    _, pid1 = run_get_pid(RunWindow, **inputs1)
+    folder_uuid = load_node(pid1).get_extra('tbextraction_wannier_folder_uuid')
+    assert any(
+        name.endswith('_u.mat')
+        for name in load_node(folder_uuid).get_folder_list()
+    )
+
+    inputs2 = runwindow_input([-4.4, -4, 6.6, 16],
+                              slice_=True,
+                              symmetries=True)
+    inputs2['restart_from_closest'] = Bool(True)
+    inputs2['evaluate_inline'] = Bool(evaluate_inline)
+    result2 = run_get_pid(RunWindow, **inputs2)[0]
+    assert result2['cost_value'] < float('inf')
+
+
 @pytest.mark.parametrize(
     'window_values',
     [
@@ -148,3 +261,85 @@ def test_runwindow_invalid(
         **runwindow_input(window_values, slice_=True, symmetries=True)
     )
     assert result['cost_value'] == float('inf')
+
+
+@pytest.mark.parametrize(
+    'window_values',
+    [
+        [-4.5, 6.5, -4, 16],  # unsorted
+        [-30, -30, 30, 30],  # inner window too big
+        [0, 0, 0, 0],  # outer window too small
+    ]
+)
+def test_runwindow_projected(
+    configure_with_daemon, runwindow_input, window_values
+):  # pylint:disable=unused-argument,redefined-outer-name
+    """
+    Runs the runwindow workflow with invalid window values which are projected onto valid windows.
+    """
+    from aiida.work import run
+    from aiida.orm.data.base import Bool
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    inputs = runwindow_input(window_values, slice_=True, symmetries=True)
+    inputs['project_window'] = Bool(True)
+    result = run(RunWindow, **inputs)
+    assert result['cost_value'] < float('inf')
+    projected_window = result['window'].get_attr('list')
+    assert sorted(projected_window) == projected_window
+
+
+def test_add_window_parameters_deduplicated(configure):  # pylint:disable=unused-argument
+    """
+    Check that calling the inline calculation with identical inputs returns the existing output node.
+    """
+    from aiida.orm.data.base import List
+    from aiida.orm.data.parameter import ParameterData
+    from aiida_tbextraction.energy_windows.runwindow import add_window_parameters_inline
+
+    def get_inputs():
+        window = List()
+        window.extend([-4.5, -4, 6.5, 16])
+        return dict(
+            wannier_parameters=ParameterData(dict=dict(num_wann=14)),
+            window=window
+        )
+
+    calc1, res1 = add_window_parameters_inline(**get_inputs())
+    calc2, res2 = add_window_parameters_inline(**get_inputs())
+    assert calc1.uuid == calc2.uuid
+    assert set(res1.keys()) == set(res2.keys())
+    assert res1['wannier_parameters'].uuid == res2['wannier_parameters'].uuid
+    assert res2['wannier_parameters'].get_attr('dis_win_max') == 16
+
+
+def test_cache_eviction(configure):  # pylint: disable=unused-argument
+    """
+    Check that the least recently used entries are evicted from a persistent cache with a maximum number of entries.
+    """
+    from aiida.orm.data.base import List
+    from aiida.orm.data.parameter import ParameterData
+    from aiida_tbextraction._helpers._caching import InlineCache
+    from aiida_tbextraction.energy_windows.runwindow import add_window_parameters_inline
+
+    cache = InlineCache(extra_key='test_eviction_cache_key', max_entries=2)
+    calcs = []
+    for i in range(3):
+        window = List()
+        window.extend([-4.5, -4, 6.5, 16 + i])
+        calc, _ = add_window_parameters_inline(
+            wannier_parameters=ParameterData(dict=dict(num_wann=14)),
+            window=window
+        )
+        cache.set_key(calc, 'key_{}'.format(i))
+        calcs.append(calc)
+        if i == 1:
+            # use the first entry, such that the second one is evicted
+            assert cache.get('key_0', add_window_parameters_inline
+                             ).uuid == calcs[0].uuid
+
+    assert cache.get('key_1', add_window_parameters_inline) is None
+    for i in [0, 2]:
+        assert cache.get('key_{}'.format(i),
+                         add_window_parameters_inline).uuid == calcs[i].uuid
+    assert cache.stats == dict(hits=3, misses=1)
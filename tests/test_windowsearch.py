@@ -114,6 +114,75 @@ def test_windowsearch(configure_with_daemon, windowsearch_builder):  # pylint: d
     )
 
 
+@pytest.mark.parametrize(
+    'engine', ['parallel_nelder_mead', 'gaussian_process']
+)
+def test_windowsearch_engine(
+    configure_with_daemon, windowsearch_builder, engine
+):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Run a windowsearch with different optimization engines on the sample wannier input folder.
+    """
+    from aiida.orm.data.base import Str
+    from aiida.orm.data.parameter import ParameterData
+    from aiida.work.launch import run
+
+    windowsearch_builder.engine = Str(engine)
+    if engine == 'gaussian_process':
+        windowsearch_builder.engine_parameters = ParameterData(
+            dict=dict(max_iter=3, batch_size=2)
+        )
+    result = run(windowsearch_builder)
+    assert all(
+        key in result for key in ['cost_value', 'tb_model', 'window', 'plot']
+    )
+
+
+def test_windowsearch_defer_plot(configure_with_daemon, windowsearch_builder):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Run a windowsearch where the plot is created only for the optimal model.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import run_get_pid
+    from aiida.common.links import LinkType
+    from aiida_tbextraction.energy_windows.runwindow import RunWindow
+
+    windowsearch_builder.defer_plot = Bool(True)
+    result, pid = run_get_pid(windowsearch_builder)
+    assert all(
+        key in result for key in ['cost_value', 'tb_model', 'window', 'plot']
+    )
+    for optimization in load_node(pid).get_outputs(link_type=LinkType.CALL):
+        for calc in optimization.get_outputs(link_type=LinkType.CALL):
+            if calc.get_attr('_process_label', None) == RunWindow.__name__:
+                assert 'plot' not in calc.get_outputs_dict(
+                    link_type=LinkType.RETURN
+                )
+
+
+def test_windowsearch_defer_plot_invalid(
+    configure_with_daemon, windowsearch_builder, wait_for
+):  # pylint: disable=unused-argument,redefined-outer-name
+    """
+    Check that 'defer_plot' is rejected for a model evaluation workflow without 'plot' input.
+    """
+    from aiida.orm import load_node
+    from aiida.orm.data.base import Bool
+    from aiida.work.launch import submit
+    from aiida.common.links import LinkType
+    from aiida_tbextraction.model_evaluation import WeightedBandDifferenceModelEvaluation
+
+    windowsearch_builder.defer_plot = Bool(True)
+    windowsearch_builder.model_evaluation_workflow = WeightedBandDifferenceModelEvaluation
+    windowsearch_builder.model_evaluation = {}
+    pk = submit(windowsearch_builder).pk
+    wait_for(pk)
+    calc = load_node(pk)
+    assert not calc.is_finished_ok
+    assert not calc.get_outputs(link_type=LinkType.CALL)
+
+
 def test_windowsearch_submit(
     configure_with_daemon, windowsearch_builder, wait_for, assert_finished
 ):  # pylint: disable=unused-argument,redefined-outer-name